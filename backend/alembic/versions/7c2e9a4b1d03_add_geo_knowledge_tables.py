@@ -0,0 +1,102 @@
+"""add geo knowledge tables
+
+Revision ID: 7c2e9a4b1d03
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a4b1d03'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _base_columns():
+    return [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'geo_geocodes',
+        *_base_columns(),
+        sa.Column('normalized_key', sa.String(length=300), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('address', sa.String(length=300), nullable=False),
+        sa.Column('city', sa.String(length=100), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('formatted_address', sa.Text(), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('normalized_key', 'provider', name='uq_geo_geocodes_key_provider'),
+    )
+    op.create_index(op.f('ix_geo_geocodes_id'), 'geo_geocodes', ['id'], unique=False)
+    op.create_index(op.f('ix_geo_geocodes_normalized_key'), 'geo_geocodes', ['normalized_key'], unique=False)
+    op.create_index(op.f('ix_geo_geocodes_refreshed_at'), 'geo_geocodes', ['refreshed_at'], unique=False)
+
+    op.create_table(
+        'geo_pois',
+        *_base_columns(),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('poi_key', sa.String(length=300), nullable=False),
+        sa.Column('normalized_name', sa.String(length=200), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('category', sa.String(length=200), nullable=True),
+        sa.Column('address', sa.Text(), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('provider', 'poi_key', name='uq_geo_pois_provider_key'),
+    )
+    op.create_index(op.f('ix_geo_pois_id'), 'geo_pois', ['id'], unique=False)
+    op.create_index(op.f('ix_geo_pois_normalized_name'), 'geo_pois', ['normalized_name'], unique=False)
+
+    op.create_table(
+        'geo_poi_searches',
+        *_base_columns(),
+        sa.Column('query_key', sa.String(length=64), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('location', sa.String(length=64), nullable=False),
+        sa.Column('keywords', sa.String(length=200), nullable=True),
+        sa.Column('types', sa.String(length=100), nullable=True),
+        sa.Column('radius', sa.Integer(), nullable=False),
+        sa.Column('result_count', sa.Integer(), nullable=False),
+        sa.Column('results', sa.JSON(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('query_key', 'provider', name='uq_geo_poi_searches_key_provider'),
+    )
+    op.create_index(op.f('ix_geo_poi_searches_id'), 'geo_poi_searches', ['id'], unique=False)
+    op.create_index(op.f('ix_geo_poi_searches_query_key'), 'geo_poi_searches', ['query_key'], unique=False)
+    op.create_index(op.f('ix_geo_poi_searches_refreshed_at'), 'geo_poi_searches', ['refreshed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_geo_poi_searches_refreshed_at'), table_name='geo_poi_searches')
+    op.drop_index(op.f('ix_geo_poi_searches_query_key'), table_name='geo_poi_searches')
+    op.drop_index(op.f('ix_geo_poi_searches_id'), table_name='geo_poi_searches')
+    op.drop_table('geo_poi_searches')
+
+    op.drop_index(op.f('ix_geo_pois_normalized_name'), table_name='geo_pois')
+    op.drop_index(op.f('ix_geo_pois_id'), table_name='geo_pois')
+    op.drop_table('geo_pois')
+
+    op.drop_index(op.f('ix_geo_geocodes_refreshed_at'), table_name='geo_geocodes')
+    op.drop_index(op.f('ix_geo_geocodes_normalized_key'), table_name='geo_geocodes')
+    op.drop_index(op.f('ix_geo_geocodes_id'), table_name='geo_geocodes')
+    op.drop_table('geo_geocodes')
@@ -0,0 +1,45 @@
+"""add city pair distances
+
+Revision ID: 9d41f6c8e2a7
+Revises: 7c2e9a4b1d03
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41f6c8e2a7'
+down_revision: Union[str, None] = '7c2e9a4b1d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'city_pair_distances',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('pair_key', sa.String(length=210), nullable=False),
+        sa.Column('city_a', sa.String(length=100), nullable=False),
+        sa.Column('city_b', sa.String(length=100), nullable=False),
+        sa.Column('distance_km', sa.Float(), nullable=False),
+        sa.Column('duration_minutes', sa.Float(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_city_pair_distances_id'), 'city_pair_distances', ['id'], unique=False)
+    op.create_index(op.f('ix_city_pair_distances_pair_key'), 'city_pair_distances', ['pair_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_city_pair_distances_pair_key'), table_name='city_pair_distances')
+    op.drop_index(op.f('ix_city_pair_distances_id'), table_name='city_pair_distances')
+    op.drop_table('city_pair_distances')
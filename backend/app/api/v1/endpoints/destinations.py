@@ -10,6 +10,11 @@ from loguru import logger
 from app.core.database import get_async_db
 from app.models.destination import Destination
 from app.models.travel_plan import TravelPlan
+from app.models.user import User
+from app.core.security import get_current_user, is_admin
+from app.services.cache_warmer import cache_warmer
+from app.services.destination_canonicalizer import destination_canonicalizer
+from app.tasks.background_tasks import data_refresh_task as celery_data_refresh_task
 
 router = APIRouter()
 
@@ -24,7 +29,7 @@ async def get_destinations(
 ):
     """
     获取目的地列表
-    支持从数据库和旅行计划中合并获取目的地数据
+    支持从数据库和旅行计划中合并获取目的地数据，按目的地规范标识合并（"杭州"、"杭州市"、"Hangzhou" 视为同一目的地）
     """
     from sqlalchemy import select, func
     
@@ -37,11 +42,14 @@ async def get_destinations(
     result = await db.execute(query)
     db_destinations = result.scalars().all()
     
-    # 转换为字典格式，便于合并
+    # 转换为字典格式，便于合并（键为目的地规范标识）
     destinations_map: Dict[str, Dict[str, Any]] = {}
+    canonical_ids = await destination_canonicalizer.canonicalize_many(dest.name for dest in db_destinations)
     
     for dest in db_destinations:
-        key = dest.name.lower().strip()
+        key = canonical_ids.get(dest.name) or dest.name.lower().strip()
+        if key in destinations_map:
+            continue
         destinations_map[key] = {
             "id": dest.id,
             "name": dest.name,
@@ -60,6 +68,7 @@ async def get_destinations(
             "images": dest.images,
             "videos": dest.videos,
             "plan_count": 0,  # 从旅行计划中统计的数量
+            "canonical_id": key,
             "source": "database"
         }
     
@@ -76,15 +85,21 @@ async def get_destinations(
             ).group_by(TravelPlan.destination)
             
             plans_result = await db.execute(plans_query)
-            plan_destinations = plans_result.all()
+            plan_destinations = [(name.strip(), count) for name, count in plans_result.all() if name and name.strip()]
+            plan_canonical_ids = await destination_canonicalizer.canonicalize_many(name for name, _ in plan_destinations)
+
+            # 同一规范标识的不同写法合并计数，展示名取计划数最多的写法
+            plan_counts: Dict[str, int] = {}
+            display_names: Dict[str, tuple] = {}
+            for dest_name, count in plan_destinations:
+                key = plan_canonical_ids.get(dest_name) or dest_name.lower()
+                plan_counts[key] = plan_counts.get(key, 0) + count
+                if key not in display_names or count > display_names[key][1]:
+                    display_names[key] = (dest_name, count)
             
             # 合并到目的地映射中
-            for plan_dest, count in plan_destinations:
-                if not plan_dest:
-                    continue
-                    
-                dest_name = plan_dest.strip()
-                key = dest_name.lower()
+            for key, count in plan_counts.items():
+                dest_name = display_names[key][0]
                 
                 if key in destinations_map:
                     # 更新已有目的地的计划数量
@@ -112,6 +127,7 @@ async def get_destinations(
                         "images": None,
                         "videos": None,
                         "plan_count": count,
+                        "canonical_id": key,
                         "source": "travel_plans"
                     }
         except Exception as e:
@@ -127,6 +143,64 @@ async def get_destinations(
     return paginated
 
 
+@router.get("/warm-cache")
+async def get_cache_warmer_status(
+    current_user: User = Depends(get_current_user),
+):
+    """热门目的地缓存预热状态：预热目标、上一轮结果与预热命中率（仅管理员）"""
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可访问")
+    return await cache_warmer.status()
+
+
+@router.post("/warm-cache/pinned")
+async def pin_warm_destination(
+    request_data: dict,
+    current_user: User = Depends(get_current_user),
+):
+    """固定预热目的地（仅管理员）"""
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可访问")
+    destination = str(request_data.get("destination") or "").strip()
+    if not destination:
+        raise HTTPException(status_code=400, detail="缺少destination参数")
+    try:
+        await cache_warmer.pin(destination)
+    except Exception as e:
+        logger.error(f"固定预热目的地失败: {destination}, 错误: {e}")
+        raise HTTPException(status_code=503, detail="缓存服务不可用")
+    return {"message": "已固定预热目的地", "pinned": await cache_warmer.get_pinned()}
+
+
+@router.delete("/warm-cache/pinned/{destination}")
+async def unpin_warm_destination(
+    destination: str,
+    current_user: User = Depends(get_current_user),
+):
+    """取消固定预热目的地（仅管理员）"""
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可访问")
+    try:
+        removed = await cache_warmer.unpin(destination)
+    except Exception as e:
+        logger.error(f"取消固定预热目的地失败: {destination}, 错误: {e}")
+        raise HTTPException(status_code=503, detail="缓存服务不可用")
+    if not removed:
+        raise HTTPException(status_code=404, detail="该目的地未被固定（配置文件中的固定项需修改配置）")
+    return {"message": "已取消固定预热目的地", "pinned": await cache_warmer.get_pinned()}
+
+
+@router.post("/warm-cache/run")
+async def run_cache_warmer(
+    current_user: User = Depends(get_current_user),
+):
+    """立即触发一轮缓存预热（Celery异步，仅管理员）"""
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可访问")
+    async_result = celery_data_refresh_task.delay()
+    return {"message": "缓存预热任务已启动", "task_id": async_result.id}
+
+
 @router.get("/{destination_id}")
 async def get_destination(
     destination_id: int,
@@ -10,6 +10,7 @@ from typing import Optional
 from loguru import logger
 from app.core.config import settings
 from app.core.redis import get_redis, get_cache, set_cache
+from app.tools.unified_map_service import get_map_provider_health
 
 router = APIRouter()
 
@@ -166,7 +167,9 @@ async def map_health():
             "baidu_configured": bool(BAIDU_API_KEY),
             "tianditu_configured": bool(TIANDITU_API_KEY),
             "osm_supported": True
-        }
+        },
+        # 各提供商的滚动延迟/错误率、熔断状态与当前动态排名
+        "provider_health": get_map_provider_health()
     }
 
 
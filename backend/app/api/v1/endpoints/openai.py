@@ -13,6 +13,7 @@ import json
 from app.models.user import User
 from app.core.database import get_async_db
 from app.tools.openai_client import openai_client
+from app.tools.llm_scheduler import llm_scheduler, PRIORITY_INTERACTIVE
 from app.core.config import settings
 from app.core.security import get_current_user, is_admin
 from loguru import logger
@@ -140,6 +141,14 @@ async def get_openai_config():
         raise HTTPException(status_code=500, detail=f"获取配置失败: {str(e)}")
 
 
+@router.get("/scheduler/stats")
+async def get_llm_scheduler_stats(current_user: User = Depends(get_current_user)):
+    """LLM 限速排队统计：按优先级的排队次数与等待时间（仅管理员）"""
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可访问")
+    return await llm_scheduler.snapshot()
+
+
 @router.post("/test")
 async def test_openai_connection():
     """测试OpenAI连接"""
@@ -147,7 +156,8 @@ async def test_openai_connection():
         # 测试简单的文本生成
         response = await openai_client.generate_text(
             prompt="请简单介绍一下你自己",
-            max_tokens=100
+            max_tokens=100,
+            priority=PRIORITY_INTERACTIVE,
         )
         
         return {
@@ -322,7 +332,8 @@ async def chat_with_ai(
         response = await openai_client._call_api(
             messages=messages,
             max_tokens=max_output_tokens,
-            temperature=settings.OPENAI_TEMPERATURE
+            temperature=settings.OPENAI_TEMPERATURE,
+            priority=PRIORITY_INTERACTIVE,
         )
         
         assistant_message = response.choices[0].message.content
@@ -432,7 +443,8 @@ async def chat_with_ai_stream(
                 async for chunk in openai_client._call_api_stream(
                     messages=messages,
                     max_tokens=max_output_tokens,
-                    temperature=settings.OPENAI_TEMPERATURE
+                    temperature=settings.OPENAI_TEMPERATURE,
+                    priority=PRIORITY_INTERACTIVE,
                 ):
                     if chunk.choices and len(chunk.choices) > 0:
                         delta = chunk.choices[0].delta
@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Any
 from datetime import datetime, date
 
-from app.core.database import get_async_db
+from app.core.database import get_async_db, async_session
 from app.schemas.travel_plan import (
     TravelPlanCreate, 
     TravelPlanCreateRequest,
@@ -19,12 +19,20 @@ from app.schemas.travel_plan import (
 from app.services.travel_plan_service import TravelPlanService
 from app.services.agent_service import AgentService
 from app.services.plan_generator import PlanGenerator
+from app.services.llm_response_cache import llm_response_cache
 from loguru import logger
 from fastapi.responses import HTMLResponse, JSONResponse, Response, PlainTextResponse, StreamingResponse
 import asyncio, time, json
 from app.core.config import settings
 from fastapi.encoders import jsonable_encoder
-from app.core.redis import get_cache, set_cache
+from app.core.redis import get_cache, set_cache, get_redis
+from app.core.plan_events import (
+    TERMINAL_STATUSES,
+    get_plan_event_snapshot,
+    plan_event_channel,
+    reset_plan_events,
+)
+from app.core.plan_preview import get_raw_preview
 
 # 新增导入
 from app.core.security import get_current_user, get_current_user_optional, is_admin
@@ -206,8 +214,9 @@ async def _enrich_plan_with_attraction_details(plan_data: dict, db: AsyncSession
             return plan_data
 
         # 批量加载该目的地的景点详情，按名称建立索引（小写去空格）
+        destination_names = await AttractionDetailService.destination_names(db, destination)
         result = await db.execute(
-            select(AttractionDetail).where(AttractionDetail.destination == destination)
+            select(AttractionDetail).where(AttractionDetail.destination.in_(destination_names))
         )
         details = result.scalars().all()
         if not details:
@@ -348,10 +357,12 @@ async def generate_travel_plans(
         raise HTTPException(status_code=409, detail="该计划正在生成中，请稍候")
     # 先更新状态为生成中并加锁，避免并发竞争
     await agent_service._update_plan_status(plan_id, "generating")
+    await reset_plan_events(plan_id)
     async_result = celery_generate_travel_plans_task.delay(
         plan_id,
         request.preferences,
         request.requirements,
+        bypass_cache=request.bypass_cache,
     )
     return {
         "message": "旅行方案生成任务已启动",
@@ -387,6 +398,14 @@ async def refine_travel_plan_async(
     }
 
 
+@router.get("/llm-cache/stats")
+async def get_llm_cache_stats(current_user: User = Depends(get_current_user)):
+    """方案模块 LLM 响应缓存的命中统计（仅管理员）"""
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可访问")
+    return await llm_response_cache.stats()
+
+
 @router.get("/tasks/status/{task_id}")
 async def get_task_status(task_id: str, current_user: User = Depends(get_current_user)):
     """查询Celery任务状态（需登录）"""
@@ -436,80 +455,128 @@ async def get_generation_status(
         raise HTTPException(status_code=404, detail="旅行计划不存在")
     if not (is_admin(current_user) or plan.user_id == current_user.id):
         raise HTTPException(status_code=403, detail="无权查看该计划状态")
+    generated_plans = plan.generated_plans
+    if plan.status == "generating":
+        # 生成中的原始数据预览按分段存放在 Redis，读取时合并
+        preview = await get_raw_preview(plan_id)
+        if preview:
+            generated_plans = [preview]
     return {
         "plan_id": plan_id,
         "status": plan.status,
-        "generated_plans": plan.generated_plans,
+        "generated_plans": generated_plans,
         "selected_plan": plan.selected_plan,
     }
 
 
+def _sse_data(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def _find_raw_preview(generated_plans: Any) -> Optional[dict]:
+    if isinstance(generated_plans, list):
+        for p in generated_plans:
+            if isinstance(p, dict) and p.get("is_preview") and p.get("preview_type") == "raw_data_preview":
+                return p
+    return None
+
+
+async def _poll_generation_status(plan_id: int, start_ts: float):
+    """Redis 不可用时的回退：每次使用短会话读取计划状态（进度只在终态时给出）"""
+    max_seconds = settings.PLAN_STATUS_STREAM_MAX_SECONDS
+    while True:
+        async with async_session() as session:
+            current_plan = await TravelPlanService(session).get_travel_plan(plan_id)
+            status = current_plan.status if current_plan else "failed"
+            preview = _find_raw_preview(current_plan.generated_plans) if current_plan else None
+        progress = 100 if status == "completed" else (0 if status == "failed" else None)
+        yield _sse_data({"plan_id": plan_id, "status": status, "progress": progress, "preview": preview})
+        if status in TERMINAL_STATUSES:
+            break
+        if time.time() - start_ts >= max_seconds:
+            yield _sse_data({"plan_id": plan_id, "status": "timeout", "progress": None})
+            break
+        await asyncio.sleep(settings.PLAN_STATUS_STREAM_INTERVAL)
+
+
 @router.get("/{plan_id}/status/stream")
 async def stream_generation_status(
     plan_id: int,
     db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    """SSE流式返回方案生成状态（需拥有或管理员）"""
+    """SSE流式推送方案生成状态（需拥有或管理员）
+
+    订阅 AgentService 发布的计划进度事件（Redis pub/sub），推送期间不占用数据库连接；
+    Redis 不可用时退回短会话轮询。
+    """
     service = TravelPlanService(db)
     plan = await service.get_travel_plan(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="旅行计划不存在")
     if not (is_admin(current_user) or plan.user_id == current_user.id):
         raise HTTPException(status_code=403, detail="无权查看该计划状态")
+    initial_status = plan.status
+    initial_preview = _find_raw_preview(plan.generated_plans) if initial_status == "generating" else None
+    # 权限校验后立即归还连接，依赖注入的会话要到响应结束才清理
+    await db.close()
 
-    start_ts = time.time()
     max_seconds = settings.PLAN_STATUS_STREAM_MAX_SECONDS
+    heartbeat = max(float(settings.PLAN_STATUS_STREAM_INTERVAL), 1.0)
 
     async def event_generator():
-        last_status = None
-        while True:
-            try:
-                current_plan = await service.get_travel_plan(plan_id)
-                if current_plan is not None:
-                    await db.refresh(current_plan)
-                status = current_plan.status
-                elapsed = time.time() - start_ts
-                base_progress = min(90, 10 + (elapsed / max_seconds) * 80)
-                progress = 100 if status == "completed" else (0 if status == "failed" else round(base_progress, 2))
-
-                payload = {
+        start_ts = time.time()
+        try:
+            client = await get_redis()
+            pubsub = client.pubsub()
+            await pubsub.subscribe(plan_event_channel(plan_id))
+        except Exception as e:
+            logger.warning(f"订阅计划进度事件失败，退回数据库轮询: {plan_id}, 错误: {e}")
+            async for chunk in _poll_generation_status(plan_id, start_ts):
+                yield chunk
+            return
+
+        try:
+            # 先订阅再读取最新状态，两者之间发布的事件不会丢失（重复推送对前端无影响）
+            event = await get_plan_event_snapshot(plan_id)
+            if event is None:
+                event = {
                     "plan_id": plan_id,
-                    "status": status,
-                    "progress": progress,
-                    "preview": None,
+                    "status": initial_status,
+                    "stage": None,
+                    "progress": 100 if initial_status == "completed" else 0,
+                    "preview": initial_preview,
                 }
-
-                try:
-                    gp = current_plan.generated_plans or []
-                    if isinstance(gp, list):
-                        for p in gp:
-                            if p and p.get("is_preview") and p.get("preview_type") == "raw_data_preview":
-                                payload["preview"] = p
-                                break
-                except Exception:
-                    payload["preview"] = None
-
-                yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
-
-                if status in ("completed", "failed"):
+            last_progress = 0
+            while True:
+                if event is not None:
+                    last_progress = event.get("progress", last_progress)
+                    yield _sse_data(event)
+                    if event.get("status") in TERMINAL_STATUSES:
+                        break
+                if time.time() - start_ts >= max_seconds:
+                    yield _sse_data({"plan_id": plan_id, "status": "timeout", "progress": last_progress})
                     break
-                if elapsed >= max_seconds:
-                    timeout_payload = {
-                        "plan_id": plan_id,
-                        "status": "timeout",
-                        "progress": round(base_progress, 2),
-                    }
-                    yield f"data: {json.dumps(timeout_payload, ensure_ascii=False)}\n\n"
-                    break
-
-                await asyncio.sleep(settings.PLAN_STATUS_STREAM_INTERVAL)
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                err_payload = {"plan_id": plan_id, "status": "error", "message": str(e)}
-                yield f"data: {json.dumps(err_payload, ensure_ascii=False)}\n\n"
-                break
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat)
+                if message and message.get("type") == "message":
+                    event = json.loads(message["data"])
+                    if event.get("status") not in TERMINAL_STATUSES:
+                        # 事件只携带完成的分段名（或不含分段），推送前合并当前全部分段，
+                        # 按事件整体替换状态的客户端不会在生成中途丢失预览
+                        event["preview"] = await get_raw_preview(plan_id)
+                else:
+                    event = None
+                    # SSE 注释行作为心跳，便于代理保持连接
+                    yield ": ping\n\n"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            yield _sse_data({"plan_id": plan_id, "status": "error", "message": str(e)})
+        finally:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
 
     return StreamingResponse(event_generator(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
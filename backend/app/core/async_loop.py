@@ -1,4 +1,15 @@
 import asyncio
 
 def run_coro(coro):
-    return asyncio.run(coro)
+    return asyncio.run(_run_and_release(coro))
+
+
+async def _run_and_release(coro):
+    # 任务级事件循环结束前关闭该循环上的共享HTTP/OpenAI客户端，避免连接泄漏
+    from app.core.http_clients import close_http_clients
+    from app.tools.openai_client import close_openai_clients
+    try:
+        return await coro
+    finally:
+        await close_http_clients()
+        await close_openai_clients()
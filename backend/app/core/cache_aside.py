@@ -0,0 +1,243 @@
+"""
+带防击穿保护的旁路缓存（cache-aside）
+- Redis 锁：同一个键同时只有一个调用方回源
+- 过期后在 stale 窗口内继续返回旧值，同时后台刷新
+- 概率提前刷新（XFetch）：临近过期时按计算耗时随机提前刷新，分散过期时刻
+- 预热上下文：缓存预热任务在逻辑过期前主动回源，并统计用户请求命中预热数据的比例
+"""
+
+import asyncio
+import math
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis, get_cache, set_cache, acquire_lock, release_lock, lock_exists
+
+_ENVELOPE_MARK = "__cache_aside__"
+_LOOKUP_STATS_KEY = "cache:lookup_stats"
+LOOKUP_OUTCOMES = ("hit", "warm_hit", "stale", "miss")
+
+# 预热上下文：(剩余有效期低于该秒数时回源, 回源前的限速回调)，None 表示普通读取
+_warm_context: ContextVar[Optional[Tuple[float, Optional[Callable[[str], Awaitable[None]]]]]] = ContextVar(
+    "cache_warm_context", default=None
+)
+
+# 保持后台刷新任务的引用，避免被垃圾回收
+_background_refreshes: Set[asyncio.Task] = set()
+
+
+def _lock_key(key: str) -> str:
+    return f"lock:refresh:{key}"
+
+
+def _should_refresh_early(expires_at: float, delta: float, beta: float, now: float) -> bool:
+    """XFetch: now - delta * beta * ln(rand) >= expires_at 时提前刷新"""
+    if beta <= 0 or delta <= 0:
+        return now >= expires_at
+    return now - delta * beta * math.log(max(random.random(), 1e-12)) >= expires_at
+
+
+async def _compute_and_store(
+    key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    ttl: int,
+    stale_ttl: int,
+    warmed: bool = False,
+) -> Any:
+    """回源并写入带元数据的缓存（空结果不缓存）"""
+    started = time.perf_counter()
+    value = await fetch()
+    delta = time.perf_counter() - started
+    if value:
+        envelope = {
+            _ENVELOPE_MARK: 1,
+            "value": value,
+            "expires_at": time.time() + ttl,
+            "delta": round(delta, 3),
+        }
+        if warmed:
+            envelope["warmed"] = 1
+        await set_cache(key, envelope, ttl=ttl + stale_ttl)
+    return value
+
+
+@contextmanager
+def cache_warming(lead_seconds: float, before_fetch: Optional[Callable[[str], Awaitable[None]]] = None):
+    """开启预热上下文
+
+    上下文内的 cached_fetch 在缓存缺失或剩余逻辑有效期不足 lead_seconds 时同步回源，
+    写入的数据带预热标记，不计入命中统计。before_fetch 在每次实际回源前以缓存键调用（用于限速）。
+    """
+    token = _warm_context.set((max(float(lead_seconds), 0.0), before_fetch))
+    try:
+        yield
+    finally:
+        _warm_context.reset(token)
+
+
+def is_cache_warming() -> bool:
+    """当前是否处于预热上下文"""
+    return _warm_context.get() is not None
+
+
+async def _record_lookup(key: str, outcome: str):
+    """按键前缀累计读取结果（hit / warm_hit / stale / miss）"""
+    try:
+        client = await get_redis()
+        await client.hincrby(_LOOKUP_STATS_KEY, f"{key.split(':', 1)[0]}:{outcome}", 1)
+    except Exception as e:
+        logger.debug(f"记录缓存命中统计失败: {key}, 错误: {e}")
+
+
+async def get_cache_lookup_stats() -> Dict[str, Dict[str, Any]]:
+    """各缓存前缀的读取统计及预热命中率"""
+    try:
+        client = await get_redis()
+        raw = await client.hgetall(_LOOKUP_STATS_KEY)
+    except Exception as e:
+        logger.warning(f"读取缓存命中统计失败: {e}")
+        return {}
+    stats: Dict[str, Dict[str, Any]] = {}
+    for field, value in (raw or {}).items():
+        field = field.decode() if isinstance(field, bytes) else field
+        prefix, _, outcome = field.rpartition(":")
+        if outcome in LOOKUP_OUTCOMES:
+            stats.setdefault(prefix, {name: 0 for name in LOOKUP_OUTCOMES})[outcome] = int(value)
+    for item in stats.values():
+        total = sum(item[name] for name in LOOKUP_OUTCOMES)
+        item["lookups"] = total
+        item["warm_hit_ratio"] = round(item["warm_hit"] / total, 4) if total else None
+        item["hit_ratio"] = round((total - item["miss"]) / total, 4) if total else None
+    return stats
+
+
+async def _warm(
+    key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    ttl: int,
+    stale_ttl: int,
+    lock_ttl: float,
+    lead: float,
+    before_fetch: Optional[Callable[[str], Awaitable[None]]],
+) -> Any:
+    """预热读取：剩余有效期充足时直接返回，否则持锁回源（他人正在回源时跳过）"""
+    cached = await get_cache(key)
+    value = None
+    if cached:
+        if not (isinstance(cached, dict) and cached.get(_ENVELOPE_MARK)):
+            return cached
+        value = cached.get("value")
+        if float(cached.get("expires_at", 0)) - time.time() > lead:
+            return value
+    # 先限速再持锁，避免等待期间占用回源锁
+    if before_fetch is not None:
+        await before_fetch(key)
+    token = await acquire_lock(_lock_key(key), ttl=lock_ttl)
+    if not token:
+        return value
+    try:
+        logger.debug(f"预热刷新缓存: {key}")
+        return await _compute_and_store(key, fetch, ttl, stale_ttl, warmed=True)
+    finally:
+        await release_lock(_lock_key(key), token)
+
+
+async def _background_refresh(key: str, fetch: Callable[[], Awaitable[Any]], ttl: int, stale_ttl: int, token: str):
+    try:
+        await _compute_and_store(key, fetch, ttl, stale_ttl)
+        logger.debug(f"后台刷新缓存完成: {key}")
+    except Exception as e:
+        logger.warning(f"后台刷新缓存失败: {key}, 错误: {e}")
+    finally:
+        await release_lock(_lock_key(key), token)
+
+
+async def cached_fetch(
+    key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    *,
+    ttl: int,
+    stale_ttl: Optional[int] = None,
+    lock_ttl: Optional[float] = None,
+    beta: Optional[float] = None,
+    wait_poll_interval: float = 0.2,
+) -> Any:
+    """读取缓存，必要时回源
+
+    Args:
+        key: 缓存键
+        fetch: 回源协程函数
+        ttl: 逻辑过期时间（秒），超过后进入 stale 窗口
+        stale_ttl: 过期后仍可返回旧值的时长（秒）
+        lock_ttl: 回源锁超时（秒），同时也是未命中时等待他人回源的最长时间
+        beta: 提前刷新系数，越大越倾向于提前刷新，0 表示关闭
+    """
+    stale_ttl = settings.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+    lock_ttl = settings.CACHE_REFRESH_LOCK_TTL if lock_ttl is None else lock_ttl
+    beta = settings.CACHE_EARLY_REFRESH_BETA if beta is None else beta
+
+    if not settings.MAP_CACHE_ENABLED:
+        return await fetch()
+    try:
+        await get_redis()
+    except Exception as e:
+        logger.warning(f"Redis不可用，直接回源: {key}, 错误: {e}")
+        return await fetch()
+
+    warm_context = _warm_context.get()
+    if warm_context is not None:
+        return await _warm(key, fetch, ttl, stale_ttl, lock_ttl, *warm_context)
+
+    cached = await get_cache(key)
+    if cached:
+        if not (isinstance(cached, dict) and cached.get(_ENVELOPE_MARK)):
+            # 旧格式缓存（直接存值），按新鲜数据处理
+            await _record_lookup(key, "hit")
+            return cached
+        value = cached.get("value")
+        expires_at = float(cached.get("expires_at", 0))
+        delta = float(cached.get("delta", 0))
+        if time.time() >= expires_at:
+            await _record_lookup(key, "stale")
+        else:
+            await _record_lookup(key, "warm_hit" if cached.get("warmed") else "hit")
+        if not _should_refresh_early(expires_at, delta, beta, time.time()):
+            return value
+        # 已过期或提前刷新：抢到锁的调用方在后台刷新，所有调用方先返回旧值
+        token = await acquire_lock(_lock_key(key), ttl=lock_ttl)
+        if token:
+            stage = "过期" if time.time() >= expires_at else "提前"
+            logger.info(f"缓存{stage}刷新（返回旧值，后台回源）: {key}")
+            task = asyncio.create_task(_background_refresh(key, fetch, ttl, stale_ttl, token))
+            _background_refreshes.add(task)
+            task.add_done_callback(_background_refreshes.discard)
+        return value
+
+    # 完全未命中：只有持锁方回源，其他调用方等待其结果
+    await _record_lookup(key, "miss")
+    token = await acquire_lock(_lock_key(key), ttl=lock_ttl)
+    if token:
+        try:
+            return await _compute_and_store(key, fetch, ttl, stale_ttl)
+        finally:
+            await release_lock(_lock_key(key), token)
+
+    deadline = time.monotonic() + lock_ttl
+    while time.monotonic() < deadline:
+        await asyncio.sleep(wait_poll_interval)
+        cached = await get_cache(key)
+        if cached:
+            if isinstance(cached, dict) and cached.get(_ENVELOPE_MARK):
+                return cached.get("value")
+            return cached
+        # 锁已释放但没有结果（回源失败或结果为空），不再等待
+        if not await lock_exists(_lock_key(key)):
+            break
+    return await fetch()
+
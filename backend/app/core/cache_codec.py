@@ -0,0 +1,176 @@
+"""
+缓存值编解码
+set_cache / get_cache 写入 Redis 与 L1 的值统一经过这里：orjson 或 msgpack 序列化，超过阈值时再压缩（zstd，未安装时退回 zlib）。
+编码结果以 2 字节头开头：
+  第 1 字节  格式版本（CODEC_VERSION），旧版 JSON 文本不会以该字节开头，读取时据此兼容旧条目
+  第 2 字节  低 4 位为序列化方式，高 4 位为压缩方式
+解码只依赖头部，不依赖当前配置，切换 CACHE_CODEC / CACHE_COMPRESSION 后旧条目仍可读取。
+"""
+
+import json
+import zlib
+from typing import Any, Union
+
+from loguru import logger
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+CODEC_VERSION = 0x01
+
+# 序列化方式（低 4 位）
+SERIALIZER_JSON = 0x01
+SERIALIZER_MSGPACK = 0x02
+
+# 压缩方式（高 4 位）
+COMPRESSION_NONE = 0x00
+COMPRESSION_ZLIB = 0x10
+COMPRESSION_ZSTD = 0x20
+
+_SERIALIZER_NAMES = {"json": SERIALIZER_JSON, "orjson": SERIALIZER_JSON, "msgpack": SERIALIZER_MSGPACK}
+_COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+
+def _dumps_json(value: Any) -> bytes:
+    if orjson is not None:
+        # OPT_NON_STR_KEYS 与 json.dumps 一样把非字符串键转为字符串
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def _loads_json(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_msgpack(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def _loads_msgpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+_zstd_compressor = None
+_zstd_decompressor = None
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    global _zstd_compressor
+    if _zstd_compressor is None:
+        _zstd_compressor = zstandard.ZstdCompressor(level=settings.CACHE_ZSTD_LEVEL)
+    return _zstd_compressor.compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    global _zstd_decompressor
+    if _zstd_decompressor is None:
+        _zstd_decompressor = zstandard.ZstdDecompressor()
+    return _zstd_decompressor.decompress(data)
+
+
+def _zlib_compress(data: bytes) -> bytes:
+    return zlib.compress(data, settings.CACHE_ZLIB_LEVEL)
+
+
+class CacheCodec:
+    """缓存值编解码器（序列化方式 + 压缩方式 + 压缩阈值）"""
+
+    def __init__(self, serializer: str = "orjson", compression: str = "zstd", compress_min_bytes: int = 1024):
+        self.serializer = self._resolve_serializer(serializer)
+        self.compression = self._resolve_compression(compression)
+        self.compress_min_bytes = max(int(compress_min_bytes), 0)
+
+    @staticmethod
+    def _resolve_serializer(name: str) -> int:
+        serializer = _SERIALIZER_NAMES.get((name or "").lower())
+        if serializer is None:
+            logger.warning(f"未知的缓存序列化方式 {name}，使用 json")
+            return SERIALIZER_JSON
+        if serializer == SERIALIZER_MSGPACK and msgpack is None:
+            logger.warning("未安装 msgpack，缓存序列化退回 json（pip install msgpack）")
+            return SERIALIZER_JSON
+        return serializer
+
+    @staticmethod
+    def _resolve_compression(name: str) -> int:
+        compression = _COMPRESSION_NAMES.get((name or "").lower())
+        if compression is None:
+            logger.warning(f"未知的缓存压缩方式 {name}，不压缩")
+            return COMPRESSION_NONE
+        if compression == COMPRESSION_ZSTD and zstandard is None:
+            logger.warning("未安装 zstandard，缓存压缩退回 zlib（pip install zstandard）")
+            return COMPRESSION_ZLIB
+        return compression
+
+    def encode(self, value: Any) -> bytes:
+        """序列化并按阈值压缩，返回带头部的字节串"""
+        if self.serializer == SERIALIZER_MSGPACK:
+            payload = _dumps_msgpack(value)
+        else:
+            payload = _dumps_json(value)
+        compression = COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(payload) >= self.compress_min_bytes:
+            compressed = _zstd_compress(payload) if self.compression == COMPRESSION_ZSTD else _zlib_compress(payload)
+            # 压缩后没有变小（如已压缩的图片数据）时保留原文
+            if len(compressed) < len(payload):
+                payload = compressed
+                compression = self.compression
+        return bytes((CODEC_VERSION, self.serializer | compression)) + payload
+
+    @staticmethod
+    def decode(raw: Union[bytes, str]) -> Any:
+        """解码缓存值；没有头部的值按旧版 JSON 文本解析"""
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if len(raw) < 2 or raw[0] != CODEC_VERSION:
+            return _loads_json(raw)
+        flags = raw[1]
+        payload = raw[2:]
+        compression = flags & 0xF0
+        if compression == COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise ValueError("缓存值使用 zstd 压缩，但未安装 zstandard")
+            payload = _zstd_decompress(payload)
+        elif compression == COMPRESSION_ZLIB:
+            payload = zlib.decompress(payload)
+        elif compression != COMPRESSION_NONE:
+            raise ValueError(f"未知的缓存压缩方式: {compression:#x}")
+        serializer = flags & 0x0F
+        if serializer == SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise ValueError("缓存值使用 msgpack 序列化，但未安装 msgpack")
+            return _loads_msgpack(payload)
+        if serializer == SERIALIZER_JSON:
+            return _loads_json(payload)
+        raise ValueError(f"未知的缓存序列化方式: {serializer:#x}")
+
+
+cache_codec = CacheCodec(
+    serializer=settings.CACHE_CODEC,
+    compression=settings.CACHE_COMPRESSION,
+    compress_min_bytes=settings.CACHE_COMPRESS_MIN_BYTES,
+)
+
+
+def encode_value(value: Any) -> bytes:
+    return cache_codec.encode(value)
+
+
+def decode_value(raw: Union[bytes, str]) -> Any:
+    return cache_codec.decode(raw)
@@ -3,6 +3,7 @@ Celery配置
 """
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_shutdown
 from app.core.config import settings
 from app.core.logging_config import setup_logging
 import sys
@@ -85,7 +86,7 @@ if not settings.CELERY_WORKER_POOL:
 celery_app.conf.beat_schedule = {
     "data-refresh-task": {
         "task": "app.tasks.background_tasks.data_refresh_task",
-        "schedule": 86400.0,  # 每天执行一次
+        "schedule": float(settings.CACHE_WARMER_INTERVAL),  # 热门目的地缓存预热，需短于数据缓存有效期
     },
     "cache-cleanup-task": {
         "task": "app.tasks.background_tasks.cache_cleanup_task", 
@@ -96,3 +97,27 @@ celery_app.conf.beat_schedule = {
         "schedule": 600.0,  # 每10分钟执行一次
     },
 }
+
+
+# Worker 生命周期：启动/关闭 L1 缓存失效订阅
+# solo/threads 池只触发 worker_init；prefork 子进程在 fork 后需通过 worker_process_init 重新启动订阅线程
+@worker_init.connect
+def _on_worker_init(**kwargs):
+    from app.core.local_cache import start_cache_invalidation_listener
+    start_cache_invalidation_listener()
+
+
+@worker_process_init.connect
+def _on_worker_process_init(**kwargs):
+    from app.core.local_cache import start_cache_invalidation_listener
+    from app.core.http_clients import reset_http_clients
+    from app.tools.openai_client import reset_openai_clients
+    reset_http_clients()
+    reset_openai_clients()
+    start_cache_invalidation_listener()
+
+
+@worker_shutdown.connect
+def _on_worker_shutdown(**kwargs):
+    from app.core.local_cache import stop_cache_invalidation_listener
+    stop_cache_invalidation_listener()
@@ -0,0 +1,61 @@
+"""
+熔断器
+连续失败达到阈值后熔断（OPEN），冷却后半开（HALF_OPEN）试探，试探成功次数达标后恢复（CLOSED）。
+"""
+
+import time
+
+
+class CircuitBreaker:
+    """熔断器实现"""
+    
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: int = 60, 
+                 success_threshold: int = 3):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.success_threshold = success_threshold
+        
+        self.failure_count = 0
+        self.success_count = 0
+        self.last_failure_time = None
+        self.state = "CLOSED"  # CLOSED, OPEN, HALF_OPEN
+        
+    def call_allowed(self) -> bool:
+        """检查是否允许调用"""
+        if self.state == "CLOSED":
+            return True
+        elif self.state == "OPEN":
+            if time.time() - self.last_failure_time > self.recovery_timeout:
+                self.state = "HALF_OPEN"
+                self.success_count = 0
+                return True
+            return False
+        else:  # HALF_OPEN
+            return self.success_count < self.success_threshold
+    
+    def on_success(self):
+        """调用成功时回调"""
+        if self.state == "HALF_OPEN":
+            self.success_count += 1
+            if self.success_count >= self.success_threshold:
+                self.state = "CLOSED"
+                self.failure_count = 0
+        
+    def on_failure(self):
+        """调用失败时回调"""
+        self.failure_count += 1
+        self.last_failure_time = time.time()
+        
+        if self.state == "HALF_OPEN":
+            self.state = "OPEN"
+        elif self.state == "CLOSED" and self.failure_count >= self.failure_threshold:
+            self.state = "OPEN"
+    
+    def reset_failures(self):
+        """CLOSED 状态下清零连续失败数（只按连续失败熔断时，在每次成功后调用）"""
+        if self.state == "CLOSED":
+            self.failure_count = 0
+
+    def get_state(self) -> str:
+        """获取当前状态"""
+        return self.state
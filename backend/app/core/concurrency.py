@@ -0,0 +1,152 @@
+"""
+上游服务并发控制
+按提供商（amap/baidu/tianditu/mcp/xhs 等）限制同时在途的请求数，
+替代过去依靠固定 sleep 间隔来“错峰”调用第三方接口的做法
+"""
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+# 按事件循环维护信号量（Celery 任务每次 asyncio.run 都会创建新循环，信号量不能跨循环复用）
+_semaphores_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+_limits_cache: Optional[Dict[str, int]] = None
+
+
+def _parse_limits(raw: str) -> Dict[str, int]:
+    """解析形如 "amap=3,baidu=2" 的并发配置"""
+    limits: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        name = name.strip().lower()
+        try:
+            limits[name] = max(int(value.strip()), 1)
+        except ValueError:
+            logger.warning(f"忽略无效的并发配置项: {part}")
+    return limits
+
+
+def get_provider_limit(provider: str) -> int:
+    """获取指定提供商的最大并发数"""
+    global _limits_cache
+    if _limits_cache is None:
+        _limits_cache = _parse_limits(settings.PROVIDER_CONCURRENCY_LIMITS)
+    return _limits_cache.get(provider.lower(), max(int(settings.PROVIDER_DEFAULT_CONCURRENCY), 1))
+
+
+def get_provider_semaphore(provider: str) -> asyncio.Semaphore:
+    """获取当前事件循环中指定提供商的信号量"""
+    loop = asyncio.get_running_loop()
+    semaphores = _semaphores_by_loop.get(loop)
+    if semaphores is None:
+        semaphores = {}
+        _semaphores_by_loop[loop] = semaphores
+    key = provider.lower()
+    semaphore = semaphores.get(key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_provider_limit(key))
+        semaphores[key] = semaphore
+    return semaphore
+
+
+@asynccontextmanager
+async def provider_slot(provider: str):
+    """占用一个提供商并发槽位（async with provider_slot("amap"): ...）"""
+    semaphore = get_provider_semaphore(provider)
+    async with semaphore:
+        yield
+
+
+async def run_limited(provider: str, coro: Awaitable[Any]) -> Any:
+    """在提供商并发限制内执行协程
+
+    注意：不要在已持有同一提供商槽位的代码中嵌套调用，否则并发数较小时可能互相等待。
+    """
+    try:
+        semaphore = get_provider_semaphore(provider)
+        await semaphore.acquire()
+    except BaseException:
+        # 未获得槽位（例如任务被取消）时关闭协程，避免 "never awaited" 警告
+        if hasattr(coro, "close"):
+            coro.close()
+        raise
+    try:
+        return await coro
+    finally:
+        semaphore.release()
+
+
+async def merge_as_completed(
+    sources: Dict[str, Awaitable[List[Any]]],
+    key: Callable[[Any], Any],
+    supplements: Optional[Dict[str, Callable[[], Awaitable[List[Any]]]]] = None,
+    minimum: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> List[Any]:
+    """并发执行多个子查询，按返回先后合并结果并去重
+
+    各子查询自行通过 run_limited 占用提供商槽位，这里只负责调度与合并：
+    - sources: 主要子查询 {名称: 返回列表的协程}
+    - supplements: 补充子查询 {名称: 返回协程的函数}，仅在所有主要子查询结束且结果不足 minimum 时才发起
+      （通常是按次计费的接口，结果足够时不调用）
+    - limit: 合并结果达到该数量后提前结束，取消仍在进行的子查询
+    单个子查询失败只记录日志，不影响其他子查询的结果。
+    """
+    tasks: Dict[asyncio.Task, str] = {
+        asyncio.ensure_future(coro): name for name, coro in sources.items()
+    }
+    merged: List[Any] = []
+    seen = set()
+    pending = set(tasks)
+    supplements_started = False
+    try:
+        while True:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks[task]
+                    try:
+                        items = task.result() or []
+                    except Exception as e:
+                        logger.warning(f"子查询 {name} 失败: {e}")
+                        continue
+                    added = 0
+                    for item in items:
+                        item_key = key(item)
+                        if item_key in seen:
+                            continue
+                        seen.add(item_key)
+                        merged.append(item)
+                        added += 1
+                    logger.debug(f"子查询 {name} 返回 {len(items)} 条，新增 {added} 条")
+
+                if limit is not None and len(merged) >= limit:
+                    if pending:
+                        logger.debug(f"已合并 {len(merged)} 条，达到上限 {limit}，取消其余 {len(pending)} 个子查询")
+                    return merged
+
+            if supplements_started or not supplements:
+                return merged
+            if minimum is not None and len(merged) >= minimum:
+                logger.debug(f"主要子查询已返回 {len(merged)} 条，无需补充")
+                return merged
+            supplements_started = True
+            logger.debug(f"主要子查询仅返回 {len(merged)} 条，发起补充子查询: {', '.join(supplements)}")
+            for name, factory in supplements.items():
+                task = asyncio.ensure_future(factory())
+                tasks[task] = name
+                pending.add(task)
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
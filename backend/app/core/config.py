@@ -75,6 +75,16 @@ class Settings(BaseSettings):
     OPENAI_TEMPERATURE: float = os.getenv("OPENAI_TEMPERATURE", 0.7)
     OPENAI_TIMEOUT: int = os.getenv("OPENAI_TIMEOUT", 300)  # API超时时间（秒）
     OPENAI_MAX_RETRIES: int = os.getenv("OPENAI_MAX_RETRIES", 3)  # 最大重试次数
+    # 共享 AsyncOpenAI 客户端的连接池（按 API 地址与密钥复用）
+    OPENAI_HTTP_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_HTTP_MAX_CONNECTIONS", "20"))  # 最大连接数
+    OPENAI_HTTP_MAX_KEEPALIVE: int = int(os.getenv("OPENAI_HTTP_MAX_KEEPALIVE", "10"))  # 最大空闲长连接数
+    OPENAI_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("OPENAI_HTTP_KEEPALIVE_EXPIRY", "60"))  # 空闲连接保留秒数
+    # LLM 跨进程限速（Redis 令牌桶，按 API 地址 + 模型共享；0 表示不限制该项）
+    LLM_SCHEDULER_ENABLED: bool = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true"
+    LLM_RPM_LIMIT: int = int(os.getenv("LLM_RPM_LIMIT", "120"))  # 每分钟请求数
+    LLM_TPM_LIMIT: int = int(os.getenv("LLM_TPM_LIMIT", "0"))  # 每分钟 token 数（提示词 + max_tokens 预占，按实际用量退还）
+    LLM_INTERACTIVE_RESERVE: float = float(os.getenv("LLM_INTERACTIVE_RESERVE", "0.2"))  # 为对话等交互请求保留的额度比例（上限 0.5）
+    LLM_SCHEDULER_MAX_WAIT: float = float(os.getenv("LLM_SCHEDULER_MAX_WAIT", "120"))  # 最长排队秒数，超过后直接放行
     
     # 第三方API配置
     WEATHER_API_KEY: str = os.getenv("WEATHER_API_KEY", "")  # OpenWeatherMap
@@ -84,6 +94,10 @@ class Settings(BaseSettings):
     AMADEUS_CLIENT_SECRET: str = os.getenv("AMADEUS_CLIENT_SECRET", "")
     AMADEUS_API_BASE: str = os.getenv("AMADEUS_API_BASE", "https://test.api.amadeus.com")
     AMADEUS_TOKEN_URL: str = os.getenv("AMADEUS_TOKEN_URL", "https://test.api.amadeus.com/v1/security/oauth2/token")
+    AMADEUS_TOKEN_REFRESH_MARGIN: int = int(os.getenv("AMADEUS_TOKEN_REFRESH_MARGIN", "60"))  # 令牌提前失效秒数
+    AMADEUS_TOKEN_LOCK_TTL: float = float(os.getenv("AMADEUS_TOKEN_LOCK_TTL", "15"))  # 跨进程刷新令牌的锁超时秒数
+    IATA_CODE_CACHE_TTL: int = int(os.getenv("IATA_CODE_CACHE_TTL", str(30 * 86400)))  # 城市IATA代码共享缓存秒数
+    IATA_CODE_NEGATIVE_TTL: int = int(os.getenv("IATA_CODE_NEGATIVE_TTL", "3600"))  # 识别失败的城市多久内不再调用LLM
     
     HOTEL_API_KEY: str = os.getenv("HOTEL_API_KEY", "")    # Booking.com
     MAP_API_KEY: str = os.getenv("MAP_API_KEY", "")      # Google Maps
@@ -110,9 +124,42 @@ class Settings(BaseSettings):
     MAP_TIPS_CACHE_TTL: int = int(os.getenv("MAP_TIPS_CACHE_TTL", "60"))
     MAP_CACHE_ENABLED: bool = os.getenv("MAP_CACHE_ENABLED", "true").lower() == "true"  # 全局缓存开关
 
+    # 上游服务并发配置（按提供商限制同时在途的请求数，格式: "amap=3,baidu=3"；llm 为方案生成中各模块共享的 LLM 调用上限）
+    PROVIDER_CONCURRENCY_LIMITS: str = os.getenv("PROVIDER_CONCURRENCY_LIMITS", "amap=3,baidu=3,tianditu=2,mcp=4,xhs=1,llm=6")
+    PROVIDER_DEFAULT_CONCURRENCY: int = int(os.getenv("PROVIDER_DEFAULT_CONCURRENCY", "4"))  # 未单独配置的提供商
+
+    # 地图提供商动态路由（按EWMA延迟与错误率排序，连续失败触发熔断）
+    MAP_PROVIDER_ROUTING_ENABLED: bool = os.getenv("MAP_PROVIDER_ROUTING_ENABLED", "true").lower() == "true"
+    MAP_PROVIDER_EWMA_ALPHA: float = float(os.getenv("MAP_PROVIDER_EWMA_ALPHA", "0.2"))  # EWMA平滑系数
+    MAP_PROVIDER_ERROR_PENALTY: float = float(os.getenv("MAP_PROVIDER_ERROR_PENALTY", "5.0"))  # 错误率折算的惩罚秒数
+    MAP_PROVIDER_MIN_SAMPLES: int = int(os.getenv("MAP_PROVIDER_MIN_SAMPLES", "5"))  # 参与排序所需的最少样本数
+    MAP_PROVIDER_PRIOR_LATENCY: float = float(os.getenv("MAP_PROVIDER_PRIOR_LATENCY", "1.0"))  # 样本不足时的先验延迟秒数
+    MAP_PROVIDER_LATENCY_WINDOW: int = int(os.getenv("MAP_PROVIDER_LATENCY_WINDOW", "200"))  # 分位数统计的样本窗口
+    MAP_PROVIDER_CIRCUIT_FAILURES: int = int(os.getenv("MAP_PROVIDER_CIRCUIT_FAILURES", "5"))  # 连续失败多少次熔断
+    MAP_PROVIDER_CIRCUIT_RECOVERY: int = int(os.getenv("MAP_PROVIDER_CIRCUIT_RECOVERY", "60"))  # 熔断恢复探测间隔秒数
+    # 地图请求对冲（地理编码/周边搜索：主提供商超过p90延迟未返回时并发请求下一个提供商）
+    MAP_HEDGING_ENABLED: bool = os.getenv("MAP_HEDGING_ENABLED", "false").lower() == "true"
+    MAP_HEDGE_BUDGET_PER_MINUTE: int = int(os.getenv("MAP_HEDGE_BUDGET_PER_MINUTE", "30"))  # 每分钟最多对冲次数（全局）
+    MAP_HEDGE_DEFAULT_DELAY: float = float(os.getenv("MAP_HEDGE_DEFAULT_DELAY", "1.5"))  # 样本不足时的对冲等待秒数
+    MAP_HEDGE_MIN_DELAY: float = float(os.getenv("MAP_HEDGE_MIN_DELAY", "0.2"))  # 对冲等待下限秒数
+
+    # 地理知识库（Postgres持久化地理编码与周边搜索结果，位于Redis与地图接口之间）
+    GEO_STORE_ENABLED: bool = os.getenv("GEO_STORE_ENABLED", "true").lower() == "true"
+    GEO_STORE_GEOCODE_MAX_AGE_DAYS: int = int(os.getenv("GEO_STORE_GEOCODE_MAX_AGE_DAYS", "180"))  # 地理编码刷新周期（天）
+    GEO_STORE_POI_MAX_AGE_DAYS: int = int(os.getenv("GEO_STORE_POI_MAX_AGE_DAYS", "30"))  # 周边搜索结果刷新周期（天）
+
+    # 地理编码请求合并（跨进程共享进行中的地理编码结果）
+    GEOCODE_SHARED_INFLIGHT_ENABLED: bool = os.getenv("GEOCODE_SHARED_INFLIGHT_ENABLED", "true").lower() == "true"
+    GEOCODE_SHARED_RESULT_TTL: int = int(os.getenv("GEOCODE_SHARED_RESULT_TTL", "86400"))  # 共享结果缓存秒数
+    GEOCODE_INFLIGHT_LOCK_TTL: float = float(os.getenv("GEOCODE_INFLIGHT_LOCK_TTL", "15"))  # 请求锁超时秒数
+    GEOCODE_INFLIGHT_WAIT_TIMEOUT: float = float(os.getenv("GEOCODE_INFLIGHT_WAIT_TIMEOUT", "10"))  # 等待其他进程结果的最长秒数
+    GEOCODE_BATCH_CONCURRENCY: int = int(os.getenv("GEOCODE_BATCH_CONCURRENCY", "5"))  # 批量地理编码回源并发数
+
     # 方案状态SSE流配置
     PLAN_STATUS_STREAM_INTERVAL: int = int(os.getenv("PLAN_STATUS_STREAM_INTERVAL", "2"))
     PLAN_STATUS_STREAM_MAX_SECONDS: int = int(os.getenv("PLAN_STATUS_STREAM_MAX_SECONDS", "900"))
+    PLAN_EVENT_CHANNEL_PREFIX: str = os.getenv("PLAN_EVENT_CHANNEL_PREFIX", "plan:events")  # 生成进度事件频道前缀（按计划ID划分）
+    PLAN_EVENT_STATE_TTL: int = int(os.getenv("PLAN_EVENT_STATE_TTL", "3600"))  # 最新进度事件与分段预览保留秒数（供晚到的订阅者补发）
     
     # 餐厅数据源配置
     RESTAURANT_DATA_SOURCE: str = os.getenv("RESTAURANT_DATA_SOURCE", "amap")  # 餐厅数据源: "baidu" 或 "amap" 或 "both"
@@ -151,6 +198,52 @@ class Settings(BaseSettings):
     # 缓存配置
     CACHE_TTL: int = os.getenv("CACHE_TTL", 3600)  # 1小时
     CACHE_MAX_SIZE: int = os.getenv("CACHE_MAX_SIZE", 1000)
+    # 进程内一级缓存（L1，位于Redis之前，仅缓存指定前缀的热点键，失效通过Redis pub/sub广播）
+    LOCAL_CACHE_ENABLED: bool = os.getenv("LOCAL_CACHE_ENABLED", "true").lower() == "true"
+    LOCAL_CACHE_PREFIXES: str = os.getenv("LOCAL_CACHE_PREFIXES", "amap:geocode,cache:map_tips,text_plan")
+    LOCAL_CACHE_TTL: int = int(os.getenv("LOCAL_CACHE_TTL", "30"))  # L1最长缓存秒数（不超过Redis TTL）
+    LOCAL_CACHE_MAX_BYTES: int = int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # 32MB
+    LOCAL_CACHE_MAX_ENTRIES: int = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "10000"))
+    CACHE_INVALIDATION_CHANNEL: str = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+    # 缓存值编解码（旧版 JSON 条目仍可读取）
+    CACHE_CODEC: str = os.getenv("CACHE_CODEC", "orjson")  # 序列化方式: orjson / msgpack / json
+    CACHE_COMPRESSION: str = os.getenv("CACHE_COMPRESSION", "zstd")  # 压缩方式: zstd（未安装时退回zlib）/ zlib / none
+    CACHE_COMPRESS_MIN_BYTES: int = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))  # 序列化后超过该字节数才压缩
+    CACHE_ZSTD_LEVEL: int = int(os.getenv("CACHE_ZSTD_LEVEL", "3"))
+    CACHE_ZLIB_LEVEL: int = int(os.getenv("CACHE_ZLIB_LEVEL", "6"))
+    # 数据收集缓存防击穿（过期后返回旧值并由单个调用方后台回源，临近过期时概率提前刷新）
+    CACHE_STALE_TTL: int = int(os.getenv("CACHE_STALE_TTL", "600"))  # 过期后仍可返回旧值的秒数
+    CACHE_REFRESH_LOCK_TTL: float = float(os.getenv("CACHE_REFRESH_LOCK_TTL", "60"))  # 回源锁超时秒数
+    CACHE_EARLY_REFRESH_BETA: float = float(os.getenv("CACHE_EARLY_REFRESH_BETA", "1.0"))  # 提前刷新系数，0为关闭
+    # 热门目的地缓存预热（按 travel_plans 历史统计热门目的地，在缓存过期前刷新）
+    CACHE_WARMER_ENABLED: bool = os.getenv("CACHE_WARMER_ENABLED", "true").lower() == "true"
+    CACHE_WARMER_TOP_N: int = int(os.getenv("CACHE_WARMER_TOP_N", "50"))  # 预热的热门目的地数量
+    CACHE_WARMER_TOP_PAIRS: int = int(os.getenv("CACHE_WARMER_TOP_PAIRS", "50"))  # 预热的出发地→目的地组合数量
+    CACHE_WARMER_LOOKBACK_DAYS: int = int(os.getenv("CACHE_WARMER_LOOKBACK_DAYS", "90"))  # 统计最近多少天的计划
+    CACHE_WARMER_INTERVAL: int = int(os.getenv("CACHE_WARMER_INTERVAL", "240"))  # 每轮预热间隔秒数
+    CACHE_WARMER_REFRESH_LEAD: int = int(os.getenv("CACHE_WARMER_REFRESH_LEAD", "0"))  # 剩余有效期低于该秒数时刷新，实际至少为 预热间隔 + 上一轮耗时
+    CACHE_WARMER_PROVIDER_RPM: str = os.getenv("CACHE_WARMER_PROVIDER_RPM", "amap=30,baidu=30,tianditu=20")  # 预热请求每分钟上限（按提供商）
+    CACHE_WARMER_DEFAULT_RPM: int = int(os.getenv("CACHE_WARMER_DEFAULT_RPM", "20"))  # 未单独配置的提供商
+    CACHE_WARMER_PINNED: str = os.getenv("CACHE_WARMER_PINNED", "")  # 固定预热的目的地，逗号分隔（另可通过管理接口添加）
+
+    # 数据收集分层缓存：POI 候选池与出行日期无关，日期相关部分（酒店报价、逐日天气）单独缓存
+    POI_POOL_CACHE_TTL: int = int(os.getenv("POI_POOL_CACHE_TTL", "3600"))  # 景点/餐厅/酒店候选池缓存秒数
+    POI_POOL_DAYS: int = int(os.getenv("POI_POOL_DAYS", "7"))  # 候选池按多少天行程估算数量，更短的行程从中裁剪
+    HOTEL_OFFER_CACHE_TTL: int = int(os.getenv("HOTEL_OFFER_CACHE_TTL", "300"))  # 按入住日期查询的酒店报价缓存秒数
+    WEATHER_FORECAST_DAYS: int = int(os.getenv("WEATHER_FORECAST_DAYS", "4"))  # 天气预报覆盖天数（含当天）
+    WEATHER_FORECAST_CACHE_TTL: int = int(os.getenv("WEATHER_FORECAST_CACHE_TTL", "1800"))  # 城市整段预报缓存秒数
+    WEATHER_DAY_CACHE_TTL: int = int(os.getenv("WEATHER_DAY_CACHE_TTL", "3600"))  # 按城市按日的天气条目缓存秒数
+    DESTINATION_CANONICAL_TTL: int = int(os.getenv("DESTINATION_CANONICAL_TTL", str(30 * 86400)))  # 目的地规范化结果缓存秒数
+
+    # 共享HTTP客户端配置（按上游主机复用连接池）
+    HTTP_CLIENT_TIMEOUT: float = float(os.getenv("HTTP_CLIENT_TIMEOUT", "30"))  # 请求总超时秒数
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", "10"))  # 建连超时秒数
+    HTTP_CLIENT_MAX_CONNECTIONS: int = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "20"))  # 每个主机默认最大连接数
+    HTTP_CLIENT_MAX_KEEPALIVE: int = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "10"))  # 每个主机最大空闲长连接数
+    HTTP_CLIENT_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30"))  # 空闲连接保留秒数
+    HTTP_CLIENT_HTTP2: bool = os.getenv("HTTP_CLIENT_HTTP2", "true").lower() == "true"  # 需安装 h2
+    HTTP_CLIENT_VERIFY_SSL: bool = os.getenv("HTTP_CLIENT_VERIFY_SSL", "true").lower() == "true"
+    HTTP_CLIENT_HOST_LIMITS: str = os.getenv("HTTP_CLIENT_HOST_LIMITS", "api.map.baidu.com=20,api.tianditu.gov.cn=10")
 
     # 任务配置
     TASK_TIMEOUT: int = os.getenv("TASK_TIMEOUT", 300)  # 5分钟
@@ -180,6 +273,20 @@ class Settings(BaseSettings):
     # 每次行程期望的酒店候选数量（通常 1~3 家就足够）
     PLAN_MAX_HOTELS_PER_TRIP: int = int(os.getenv("PLAN_MAX_HOTELS_PER_TRIP", "5"))
 
+    # 单个模块按天生成时同时请求的天数（1 为逐天串行；所有模块合计仍受 PROVIDER_CONCURRENCY_LIMITS 中 llm 的限制）
+    PLAN_DAILY_CONCURRENCY: int = int(os.getenv("PLAN_DAILY_CONCURRENCY", "3"))
+
+    # 按天生成时单次请求最多合并的天数（1 为每天单独请求；实际天数按 OPENAI_MAX_TOKENS、上下文窗口、提示长度与历史单日输出量自适应）
+    PLAN_DAILY_CHUNK_DAYS: int = int(os.getenv("PLAN_DAILY_CHUNK_DAYS", "3"))
+
+    # 方案模块 LLM 响应缓存（按模型+提示词+参数哈希寻址；开启后相同参数的重新生成直接复用上次响应）
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", "86400"))  # 未单独配置的模块的缓存秒数
+    LLM_CACHE_MODULE_TTLS: str = os.getenv(
+        "LLM_CACHE_MODULE_TTLS", "transport=21600,accommodation=43200,dining=86400,attractions=86400"
+    )  # 各模块缓存秒数，0 表示不缓存该模块
+    LLM_CACHE_DB_ENABLED: bool = os.getenv("LLM_CACHE_DB_ENABLED", "false").lower() == "true"  # 同时持久化到 Postgres
+
     # 在数据较少的情况下是否启用“动态降级方案数量”的逻辑
     PLAN_DYNAMIC_PLAN_COUNT_ENABLED: bool = os.getenv(
         "PLAN_DYNAMIC_PLAN_COUNT_ENABLED", "true"
@@ -0,0 +1,128 @@
+"""
+共享 HTTP 客户端注册表
+按上游主机复用 httpx.AsyncClient（长连接池、可选 HTTP/2、按主机限制连接数），
+避免每次调用都重新建立 TCP/TLS 连接。
+客户端按事件循环隔离：Web 进程在 lifespan 关闭时释放，Celery 任务在 run_coro 结束时释放。
+"""
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+
+_clients_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_host_limits: Optional[Dict[str, int]] = None
+_http2_available: Optional[bool] = None
+
+
+def _parse_host_limits(raw: str) -> Dict[str, int]:
+    """解析形如 "api.map.baidu.com=20,api.tianditu.gov.cn=10" 的按主机连接数配置"""
+    limits: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        host, value = part.split("=", 1)
+        try:
+            limits[host.strip().lower()] = max(int(value.strip()), 1)
+        except ValueError:
+            logger.warning(f"忽略无效的HTTP连接数配置项: {part}")
+    return limits
+
+
+def _get_host_limit(host: str) -> int:
+    global _host_limits
+    if _host_limits is None:
+        _host_limits = _parse_host_limits(settings.HTTP_CLIENT_HOST_LIMITS)
+    return _host_limits.get(host.lower(), settings.HTTP_CLIENT_MAX_CONNECTIONS)
+
+
+def _use_http2() -> bool:
+    """HTTP/2 需要安装 h2（httpx[http2]），未安装时自动回退到 HTTP/1.1"""
+    global _http2_available
+    if not settings.HTTP_CLIENT_HTTP2:
+        return False
+    if _http2_available is None:
+        try:
+            import h2  # noqa: F401
+            _http2_available = True
+        except ImportError:
+            logger.warning("未安装 h2，HTTP/2 已禁用（pip install httpx[http2]）")
+            _http2_available = False
+    return _http2_available
+
+
+def _build_client(host: str) -> httpx.AsyncClient:
+    max_connections = _get_host_limit(host)
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(settings.HTTP_CLIENT_MAX_KEEPALIVE, max_connections),
+            keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        ),
+        http2=_use_http2(),
+        verify=settings.HTTP_CLIENT_VERIFY_SSL,
+        proxies={},
+    )
+
+
+def get_http_client(host: str) -> httpx.AsyncClient:
+    """获取当前事件循环中指定上游主机的共享客户端
+
+    Args:
+        host: 上游主机名（例如 "api.map.baidu.com"），用于区分连接池与连接数限制
+    """
+    loop = asyncio.get_running_loop()
+    clients = _clients_by_loop.get(loop)
+    if clients is None:
+        clients = {}
+        _clients_by_loop[loop] = clients
+    client = clients.get(host)
+    if client is None or client.is_closed:
+        client = _build_client(host)
+        clients[host] = client
+        logger.debug(f"创建共享HTTP客户端: {host}")
+    return client
+
+
+@asynccontextmanager
+async def shared_http_client(host_or_url: str):
+    """以 async with 方式使用共享客户端，退出时不关闭，连接归还连接池
+
+    Args:
+        host_or_url: 上游主机名或完整 URL
+    """
+    host = urlparse(host_or_url).hostname if "://" in host_or_url else host_or_url
+    yield get_http_client(host or host_or_url)
+
+
+async def close_http_clients():
+    """关闭当前事件循环中的全部共享客户端"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    clients = _clients_by_loop.pop(loop, None) or {}
+    for host, client in clients.items():
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭共享HTTP客户端失败: {host}, 错误: {e}")
+    if clients:
+        logger.debug(f"已关闭 {len(clients)} 个共享HTTP客户端")
+
+
+def reset_http_clients():
+    """丢弃继承自父进程的客户端引用（Celery prefork 子进程启动时调用）"""
+    global _host_limits, _http2_available
+    _clients_by_loop.clear()
+    _host_limits = None
+    _http2_available = None
@@ -0,0 +1,228 @@
+"""
+进程内一级缓存（L1）
+位于 Redis（L2）之前，缓存热点键的序列化值，按条目字节数计量容量，LRU 淘汰，短 TTL。
+跨进程失效通过 Redis pub/sub 广播（delete_cache / clear_cache_pattern / set_cache 时发布）。
+"""
+
+import asyncio
+import fnmatch
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from loguru import logger
+
+from app.core.config import settings
+
+# 当前进程的实例标识，用于忽略自己发布的失效消息
+INSTANCE_ID = uuid.uuid4().hex
+
+
+class LocalCache:
+    """线程安全的 LRU 缓存（按字节数和条目数双重限制）"""
+
+    def __init__(self, max_bytes: int, max_entries: int, default_ttl: float, prefixes: List[str]):
+        self.max_bytes = max(int(max_bytes), 0)
+        self.max_entries = max(int(max_entries), 0)
+        self.default_ttl = float(default_ttl)
+        # 按长度倒序，保证更具体的前缀优先匹配
+        self.prefixes = sorted([p for p in prefixes if p], key=len, reverse=True)
+        self._data: "OrderedDict[str, Tuple[Union[str, bytes], float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def prefix_of(self, key: str) -> str:
+        """统计用的键前缀：优先匹配配置的前缀，否则取第一段"""
+        for prefix in self.prefixes:
+            if key.startswith(prefix):
+                return prefix
+        return key.split(":", 1)[0]
+
+    def is_eligible(self, key: str) -> bool:
+        """是否允许进入 L1"""
+        return any(key.startswith(prefix) for prefix in self.prefixes)
+
+    def record(self, key: str, event: str):
+        """记录命中/未命中等计数（event: l1_hit/l1_miss/redis_hit/redis_miss/evict）"""
+        prefix = self.prefix_of(key)
+        with self._lock:
+            counters = self._stats.setdefault(prefix, {})
+            counters[event] = counters.get(event, 0) + 1
+
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if expires_at <= now:
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Union[str, bytes], ttl: Optional[float] = None):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else min(float(ttl), self.default_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._data and (self._bytes > self.max_bytes or len(self._data) > self.max_entries):
+                evicted_key, _ = next(iter(self._data.items()))
+                self._remove(evicted_key)
+                counters = self._stats.setdefault(self.prefix_of(evicted_key), {})
+                counters["evict"] = counters.get("evict", 0) + 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def delete_pattern(self, pattern: str) -> int:
+        with self._lock:
+            keys = [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            prefixes = {}
+            for prefix, counters in self._stats.items():
+                item = dict(counters)
+                l1_total = item.get("l1_hit", 0) + item.get("l1_miss", 0)
+                redis_total = item.get("redis_hit", 0) + item.get("redis_miss", 0)
+                item["l1_hit_ratio"] = round(item.get("l1_hit", 0) / l1_total, 4) if l1_total else None
+                item["redis_hit_ratio"] = round(item.get("redis_hit", 0) / redis_total, 4) if redis_total else None
+                prefixes[prefix] = item
+            return {
+                "enabled": bool(settings.LOCAL_CACHE_ENABLED),
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl": self.default_ttl,
+                "prefixes": prefixes,
+            }
+
+
+local_cache = LocalCache(
+    max_bytes=settings.LOCAL_CACHE_MAX_BYTES,
+    max_entries=settings.LOCAL_CACHE_MAX_ENTRIES,
+    default_ttl=settings.LOCAL_CACHE_TTL,
+    prefixes=[p.strip() for p in settings.LOCAL_CACHE_PREFIXES.split(",")],
+)
+
+
+def get_local_cache_stats() -> Dict[str, Any]:
+    """L1 缓存统计（按键前缀的命中/未命中计数）"""
+    return local_cache.stats()
+
+
+# ---------------------------------------------------------------------------
+# 基于 Redis pub/sub 的跨进程失效
+# ---------------------------------------------------------------------------
+
+def build_invalidation_message(kind: str, target: str) -> str:
+    """构造失效消息：<实例ID>|<key|pattern>|<目标>"""
+    return f"{INSTANCE_ID}|{kind}|{target}"
+
+
+def apply_invalidation_message(message: Union[str, bytes]):
+    """处理收到的失效消息"""
+    if isinstance(message, bytes):
+        message = message.decode("utf-8", errors="ignore")
+    try:
+        origin, kind, target = message.split("|", 2)
+    except ValueError:
+        return
+    if origin == INSTANCE_ID:
+        return
+    if kind == "pattern":
+        local_cache.delete_pattern(target)
+    else:
+        local_cache.delete(target)
+
+
+_listener_thread: Optional[threading.Thread] = None
+_listener_stop = threading.Event()
+
+
+async def _listen_invalidations():
+    """订阅失效频道（断线自动重连）"""
+    from app.core.redis import get_redis
+
+    backoff = 1.0
+    while not _listener_stop.is_set():
+        pubsub = None
+        try:
+            client = await get_redis()
+            pubsub = client.pubsub()
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            logger.info(f"✅ L1缓存失效订阅已启动: {settings.CACHE_INVALIDATION_CHANNEL}")
+            backoff = 1.0
+            while not _listener_stop.is_set():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    apply_invalidation_message(message.get("data"))
+        except Exception as e:
+            # 订阅中断期间无法收到失效消息，清空 L1 以免读到过期数据
+            local_cache.clear()
+            logger.warning(f"L1缓存失效订阅中断，{backoff:.0f}s 后重连: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+
+def start_cache_invalidation_listener():
+    """在独立线程中启动失效订阅（Web 进程与 Celery worker 通用，避免依赖任务级事件循环）"""
+    global _listener_thread
+    if not settings.LOCAL_CACHE_ENABLED:
+        return
+    if _listener_thread is not None and _listener_thread.is_alive():
+        return
+    _listener_stop.clear()
+    _listener_thread = threading.Thread(
+        target=lambda: asyncio.run(_listen_invalidations()),
+        name="cache-invalidation-listener",
+        daemon=True,
+    )
+    _listener_thread.start()
+
+
+def local_cache_active() -> bool:
+    """L1 仅在失效订阅运行时启用，未订阅的进程（脚本等）直接读 Redis"""
+    return bool(settings.LOCAL_CACHE_ENABLED) and _listener_thread is not None and _listener_thread.is_alive()
+
+
+def stop_cache_invalidation_listener():
+    """停止失效订阅"""
+    global _listener_thread
+    _listener_stop.set()
+    if _listener_thread is not None:
+        _listener_thread.join(timeout=3)
+        _listener_thread = None
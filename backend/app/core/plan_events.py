@@ -0,0 +1,159 @@
+"""
+方案生成进度事件
+AgentService 在各阶段完成时（收集分段、LLM模块、组装、评分、保存）向按计划划分的 Redis 频道发布事件，
+SSE 状态流直接订阅该频道推送给前端，不再轮询数据库；进度由实际完成的阶段计算，而不是按耗时估算。
+最新事件写入带 TTL 的键，晚到的订阅者先补发当前状态；原始数据预览按分段保存（见 app.core.plan_preview），
+事件只携带完成的分段名，由读取方按需合并。
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.plan_preview import clear_raw_preview, get_raw_preview
+from app.core.redis import get_redis
+
+# 各阶段的进度区间（百分比），区间宽度即该阶段的权重；收集与LLM模块以流水线方式重叠执行，
+# 因此进度取各阶段完成比例的加权和，而不是最近一个事件所在的位置
+_STAGE_RANGES: Dict[str, Tuple[float, float]] = {
+    "queued": (0.0, 0.0),
+    "started": (0.0, 2.0),
+    "collecting": (2.0, 45.0),
+    "processing": (45.0, 50.0),
+    "llm_module": (50.0, 85.0),
+    "assembling": (85.0, 90.0),
+    "scoring": (90.0, 95.0),
+    "saved": (95.0, 98.0),
+    "completed": (98.0, 100.0),
+}
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+_plan_progress: ContextVar[Optional["PlanProgress"]] = ContextVar("plan_progress", default=None)
+
+
+def plan_event_channel(plan_id: int) -> str:
+    """计划进度事件频道"""
+    return f"{settings.PLAN_EVENT_CHANNEL_PREFIX}:{plan_id}"
+
+
+def _state_key(plan_id: int) -> str:
+    return f"{plan_event_channel(plan_id)}:latest"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+async def publish_plan_event(plan_id: int, event: Dict[str, Any]):
+    """发布进度事件并保存为最新状态"""
+    client = await get_redis()
+    message = _dumps(event)
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.set(_state_key(plan_id), message, ex=settings.PLAN_EVENT_STATE_TTL)
+        pipe.publish(plan_event_channel(plan_id), message)
+        await pipe.execute()
+
+
+async def get_plan_event_snapshot(plan_id: int) -> Optional[Dict[str, Any]]:
+    """读取最新进度事件（合并当前预览），没有记录时返回 None"""
+    try:
+        client = await get_redis()
+        latest = await client.get(_state_key(plan_id))
+        if not latest:
+            return None
+        event = json.loads(latest)
+        event["preview"] = await get_raw_preview(plan_id)
+        return event
+    except Exception as e:
+        logger.warning(f"读取计划进度事件失败: {plan_id}, 错误: {e}")
+        return None
+
+
+async def reset_plan_events(plan_id: int):
+    """重新触发生成时清除上一次的预览与终态，并发布排队事件，避免订阅者读到旧的完成状态"""
+    await clear_raw_preview(plan_id)
+    try:
+        await publish_plan_event(plan_id, _build_event(plan_id, "queued", "generating", 0.0, {}))
+    except Exception as e:
+        logger.warning(f"重置计划进度事件失败: {plan_id}, 错误: {e}")
+
+
+def _build_event(plan_id: int, stage: str, status: str, progress: float, data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "plan_id": plan_id,
+        "status": status,
+        "stage": stage,
+        "progress": round(progress, 2),
+        "timestamp": time.time(),
+        **data,
+    }
+
+
+class PlanProgress:
+    """单次方案生成的进度跟踪（进度单调不减）"""
+
+    def __init__(self, plan_id: int):
+        self.plan_id = plan_id
+        self.progress = 0.0
+        self._counts: Dict[str, int] = {}
+        self._fractions: Dict[str, float] = {}
+
+    async def emit(
+        self,
+        stage: str,
+        *,
+        total: Optional[int] = None,
+        status: str = "generating",
+        **data: Any,
+    ) -> Dict[str, Any]:
+        """记录阶段完成并发布事件
+
+        Args:
+            stage: 阶段名（见 _STAGE_RANGES），未知阶段不推进进度
+            total: 该阶段的子项总数；传入时每次调用计为完成一个子项
+            status: 计划状态，generating / completed / failed
+        """
+        if total:
+            done = self._counts[stage] = self._counts.get(stage, 0) + 1
+            self._fractions[stage] = min(done, total) / total
+            data.setdefault("done", done)
+            data.setdefault("total", total)
+        else:
+            self._fractions[stage] = 1.0
+        if status != "failed":
+            value = sum(
+                (end - start) * self._fractions.get(name, 0.0)
+                for name, (start, end) in _STAGE_RANGES.items()
+            )
+            self.progress = max(self.progress, value)
+
+        event = _build_event(self.plan_id, stage, status, self.progress, data)
+        try:
+            await publish_plan_event(self.plan_id, event)
+        except Exception as e:
+            logger.debug(f"发布计划进度事件失败: {self.plan_id} {stage}, 错误: {e}")
+        return event
+
+
+@contextmanager
+def plan_progress_scope(plan_id: int):
+    """开启方案生成进度上下文，方案生成器等下游模块通过 report_plan_progress 上报阶段完成"""
+    progress = PlanProgress(plan_id)
+    token = _plan_progress.set(progress)
+    try:
+        yield progress
+    finally:
+        _plan_progress.reset(token)
+
+
+async def report_plan_progress(stage: str, **kwargs: Any):
+    """在当前进度上下文中上报阶段完成（不在上下文中时忽略）"""
+    progress = _plan_progress.get()
+    if progress is not None:
+        await progress.emit(stage, **kwargs)
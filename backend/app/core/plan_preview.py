@@ -0,0 +1,119 @@
+"""
+原始数据预览（分段存储）
+数据收集阶段每个分段完成时只写入该分段（Redis 哈希，每个计划一个键，字段为分段名），
+不再反复重写 travel_plans.generated_plans 整列；读取方按需合并各分段为完整预览。
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+RAW_PREVIEW_TYPE = "raw_data_preview"
+
+# 各分段展示数量与排序字段：(数量, 排序字段, 是否降序)
+_SECTION_LIMITS: Dict[str, tuple] = {
+    "xiaohongshu_notes": (8, "likes", True),
+    "flights": (3, "price", False),
+    "hotels": (3, "rating", True),
+    "attractions": (6, "rating", True),
+    "restaurants": (6, "rating", True),
+}
+PREVIEW_SECTIONS = tuple(_SECTION_LIMITS) + ("weather",)
+
+_META_FIELD = "__meta__"
+
+
+def plan_preview_key(plan_id: int) -> str:
+    return f"plan:preview:{plan_id}"
+
+
+def _serialize(obj: Any) -> Any:
+    """递归处理对象，将datetime对象转换为字符串"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, dict):
+        return {key: _serialize(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_serialize(item) for item in obj]
+    return obj
+
+
+def build_preview_section(section: str, data: Any) -> Any:
+    """截取分段的展示数据（天气原样保留）"""
+    if section == "weather":
+        return _serialize(data if isinstance(data, dict) else {})
+    if not isinstance(data, list):
+        return []
+    limit, sort_key, reverse = _SECTION_LIMITS.get(section, (len(data), None, True))
+    items = data
+    if sort_key:
+        try:
+            items = sorted(data, key=lambda x: x.get(sort_key, 0), reverse=reverse)
+        except Exception:
+            items = data
+    return _serialize(items[:limit])
+
+
+def build_raw_preview(title: str, sections: Dict[str, Any], generated_at: Optional[str] = None) -> Dict[str, Any]:
+    """组装与前端约定一致的原始数据预览结构"""
+    return {
+        "id": "preview_raw_1",
+        "is_preview": True,
+        "preview_type": RAW_PREVIEW_TYPE,
+        "title": title,
+        "sections": {key: sections.get(key, {} if key == "weather" else []) for key in PREVIEW_SECTIONS},
+        "generated_at": generated_at or datetime.utcnow().isoformat(),
+    }
+
+
+async def save_preview_section(plan_id: int, section: str, data: Any, title: str = ""):
+    """只写入变化的分段（同时刷新标题与更新时间），失败时抛出异常由调用方回退"""
+    client = await get_redis()
+    key = plan_preview_key(plan_id)
+    meta = {"title": title, "generated_at": datetime.utcnow().isoformat()}
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping={
+            section: json.dumps(build_preview_section(section, data), ensure_ascii=False),
+            _META_FIELD: json.dumps(meta, ensure_ascii=False),
+        })
+        pipe.expire(key, settings.PLAN_EVENT_STATE_TTL)
+        await pipe.execute()
+
+
+async def get_raw_preview(plan_id: int) -> Optional[Dict[str, Any]]:
+    """读取并合并各分段为完整预览，没有任何分段时返回 None"""
+    try:
+        client = await get_redis()
+        fields = await client.hgetall(plan_preview_key(plan_id))
+    except Exception as e:
+        logger.warning(f"读取原始数据预览失败: {plan_id}, 错误: {e}")
+        return None
+    sections: Dict[str, Any] = {}
+    meta: Dict[str, Any] = {}
+    for field, value in (fields or {}).items():
+        name = field.decode() if isinstance(field, bytes) else field
+        try:
+            parsed = json.loads(value)
+        except (TypeError, ValueError):
+            continue
+        if name == _META_FIELD:
+            meta = parsed if isinstance(parsed, dict) else {}
+        else:
+            sections[name] = parsed
+    if not sections:
+        return None
+    return build_raw_preview(meta.get("title", ""), sections, meta.get("generated_at"))
+
+
+async def clear_raw_preview(plan_id: int):
+    """删除计划的预览分段"""
+    try:
+        client = await get_redis()
+        await client.delete(plan_preview_key(plan_id))
+    except Exception as e:
+        logger.warning(f"清除原始数据预览失败: {plan_id}, 错误: {e}")
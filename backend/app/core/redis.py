@@ -5,9 +5,13 @@ Redis配置和连接管理
 import redis.asyncio as redis
 from redis.asyncio import ConnectionPool
 from loguru import logger
+from typing import Any, Dict, List, Optional
 import asyncio
+import uuid
 
 from app.core.config import settings
+from app.core.cache_codec import encode_value, decode_value
+from app.core.local_cache import local_cache, local_cache_active, build_invalidation_message
 
 # 按事件循环维护独立的Redis连接池与客户端，避免跨循环复用
 _pools_by_loop: dict[int, ConnectionPool] = {}
@@ -103,15 +107,25 @@ def cache_key(prefix: str, *args, **kwargs):
 
 
 async def get_cache(key: str):
-    """获取缓存"""
+    """获取缓存（L1 进程内缓存 -> Redis）"""
     try:
         if not settings.MAP_CACHE_ENABLED:
             return None
+        use_l1 = local_cache_active() and local_cache.is_eligible(key)
+        if use_l1:
+            raw = local_cache.get(key)
+            if raw is not None:
+                local_cache.record(key, "l1_hit")
+                return decode_value(raw)
+            local_cache.record(key, "l1_miss")
         client = await get_redis()
         value = await client.get(key)
         if value:
-            import json
-            return json.loads(value)
+            local_cache.record(key, "redis_hit")
+            if use_l1:
+                local_cache.set(key, value)
+            return decode_value(value)
+        local_cache.record(key, "redis_miss")
         return None
     except Exception as e:
         logger.error(f"获取缓存失败: {e}")
@@ -124,24 +138,100 @@ async def set_cache(key: str, value, ttl: int = None):
         if not settings.MAP_CACHE_ENABLED:
             return False
         client = await get_redis()
-        import json
-        json_value = json.dumps(value, ensure_ascii=False)
+        encoded = encode_value(value)
         
         if ttl is None:
             ttl = settings.CACHE_TTL
         
-        await client.setex(key, ttl, json_value)
+        await client.setex(key, ttl, encoded)
+        if local_cache_active() and local_cache.is_eligible(key):
+            local_cache.set(key, encoded, ttl=ttl)
+            # 通知其他进程丢弃旧值
+            await _publish_invalidation(client, "key", key)
         return True
     except Exception as e:
         logger.error(f"设置缓存失败: {e}")
         return False
 
 
+async def get_cache_many(keys: List[str]) -> Dict[str, Any]:
+    """批量获取缓存（L1 命中的键不再访问 Redis，其余键一次 MGET）
+
+    Returns:
+        命中的 {键: 值}，未命中的键不出现在结果中
+    """
+    found: Dict[str, Any] = {}
+    try:
+        if not settings.MAP_CACHE_ENABLED or not keys:
+            return found
+        l1_active = local_cache_active()
+        remaining = []
+        for key in dict.fromkeys(keys):
+            if l1_active and local_cache.is_eligible(key):
+                raw = local_cache.get(key)
+                if raw is not None:
+                    local_cache.record(key, "l1_hit")
+                    found[key] = decode_value(raw)
+                    continue
+                local_cache.record(key, "l1_miss")
+            remaining.append(key)
+        if not remaining:
+            return found
+        client = await get_redis()
+        values = await client.mget(remaining)
+        for key, value in zip(remaining, values):
+            if value:
+                local_cache.record(key, "redis_hit")
+                try:
+                    found[key] = decode_value(value)
+                except Exception as e:
+                    # 单个无法解码的条目按未命中处理，不影响同批其他键
+                    logger.warning(f"缓存值解码失败，按未命中处理: {key}, 错误: {e}")
+                    continue
+                if l1_active and local_cache.is_eligible(key):
+                    local_cache.set(key, value)
+            else:
+                local_cache.record(key, "redis_miss")
+        return found
+    except Exception as e:
+        logger.error(f"批量获取缓存失败: {e}")
+        return found
+
+
+async def set_cache_many(items: Dict[str, Any], ttl: int = None) -> bool:
+    """批量设置缓存（一次 pipeline 往返）"""
+    try:
+        if not settings.MAP_CACHE_ENABLED or not items:
+            return False
+        if ttl is None:
+            ttl = settings.CACHE_TTL
+        client = await get_redis()
+        l1_active = local_cache_active()
+        invalidations = []
+        async with client.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                encoded = encode_value(value)
+                pipe.setex(key, ttl, encoded)
+                if l1_active and local_cache.is_eligible(key):
+                    local_cache.set(key, encoded, ttl=ttl)
+                    invalidations.append(key)
+            if settings.LOCAL_CACHE_ENABLED:
+                for key in invalidations:
+                    pipe.publish(settings.CACHE_INVALIDATION_CHANNEL, build_invalidation_message("key", key))
+            await pipe.execute()
+        return True
+    except Exception as e:
+        logger.error(f"批量设置缓存失败: {e}")
+        return False
+
+
 async def delete_cache(key: str):
     """删除缓存"""
     try:
+        local_cache.delete(key)
         client = await get_redis()
         await client.delete(key)
+        await _publish_invalidation(client, "key", key)
         return True
     except Exception as e:
         logger.error(f"删除缓存失败: {e}")
@@ -151,16 +241,69 @@ async def delete_cache(key: str):
 async def clear_cache_pattern(pattern: str):
     """清除匹配模式的缓存"""
     try:
+        local_cache.delete_pattern(pattern)
         client = await get_redis()
         keys = await client.keys(pattern)
         if keys:
             await client.delete(*keys)
+        await _publish_invalidation(client, "pattern", pattern)
         return len(keys)
     except Exception as e:
         logger.error(f"清除缓存失败: {e}")
         return 0
 
 
+async def _publish_invalidation(client: redis.Redis, kind: str, target: str):
+    """广播L1缓存失效消息"""
+    if not settings.LOCAL_CACHE_ENABLED:
+        return
+    try:
+        await client.publish(settings.CACHE_INVALIDATION_CHANNEL, build_invalidation_message(kind, target))
+    except Exception as e:
+        logger.warning(f"发布缓存失效消息失败: {e}")
+
+
+# 释放锁时校验持有者，避免误删其他进程重新获取的锁
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+async def acquire_lock(key: str, ttl: float = 10.0) -> Optional[str]:
+    """尝试获取分布式锁（SET NX PX），成功返回持有者令牌，失败返回 None"""
+    try:
+        client = await get_redis()
+        token = uuid.uuid4().hex
+        acquired = await client.set(key, token, nx=True, px=max(int(ttl * 1000), 1))
+        return token if acquired else None
+    except Exception as e:
+        logger.error(f"获取分布式锁失败: {e}")
+        return None
+
+
+async def release_lock(key: str, token: str) -> bool:
+    """释放分布式锁（仅持有者可释放）"""
+    try:
+        client = await get_redis()
+        return bool(await client.eval(_RELEASE_LOCK_SCRIPT, 1, key, token))
+    except Exception as e:
+        logger.error(f"释放分布式锁失败: {e}")
+        return False
+
+
+async def lock_exists(key: str) -> bool:
+    """检查锁是否仍被持有"""
+    try:
+        client = await get_redis()
+        return bool(await client.exists(key))
+    except Exception as e:
+        logger.error(f"检查分布式锁失败: {e}")
+        return False
+
+
 def clear_cache_pattern_sync(pattern: str):
     """清除匹配模式的缓存 (同步版本，用于Celery任务)"""
     import asyncio
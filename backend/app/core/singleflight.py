@@ -0,0 +1,114 @@
+"""
+请求合并（single-flight）
+同一个键的并发调用只向上游发起一次请求，其余调用方等待并共享结果。
+- SingleFlight: 进程内合并（按事件循环隔离）
+- redis_single_flight: 基于 Redis 锁的跨进程合并（Celery 多 worker 共享结果）
+"""
+
+import asyncio
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis, acquire_lock, release_lock, lock_exists, get_cache, set_cache
+
+
+class SingleFlight:
+    """进程内请求合并"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.leader_calls = 0
+        self.shared_calls = 0
+
+    def _inflight(self) -> Dict[str, asyncio.Task]:
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight_by_loop.get(loop)
+        if inflight is None:
+            inflight = {}
+            self._inflight_by_loop[loop] = inflight
+        return inflight
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 fn，若同键调用正在进行中则等待其结果"""
+        inflight = self._inflight()
+        task = inflight.get(key)
+        if task is None:
+            self.leader_calls += 1
+            task = asyncio.create_task(fn())
+            inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: inflight.pop(k, None))
+        else:
+            self.shared_calls += 1
+            logger.debug(f"[{self.name}] 合并进行中的请求: {key}")
+        # shield: 某个调用方被取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "leader_calls": self.leader_calls, "shared_calls": self.shared_calls}
+
+
+def single_flight_result_key(key: str) -> str:
+    """跨进程合并的共享结果键（批量读取共享结果时复用）"""
+    return f"singleflight:result:{key}"
+
+
+async def redis_single_flight(
+    key: str,
+    fn: Callable[[], Awaitable[Any]],
+    *,
+    result_ttl: int,
+    lock_ttl: float = 15.0,
+    wait_timeout: float = 10.0,
+    poll_interval: float = 0.1,
+) -> Any:
+    """跨进程请求合并
+
+    先查共享结果；未命中则抢锁，抢到锁的调用方执行 fn 并写回结果，
+    其余调用方轮询共享结果。持锁方失败（锁释放但无结果）时重新抢锁，等待超时则自行执行。
+    结果为空（None/空容器）时不写回，避免把失败结果共享出去。
+    """
+    if not settings.MAP_CACHE_ENABLED:
+        return await fn()
+    try:
+        await get_redis()
+    except Exception as e:
+        logger.warning(f"Redis不可用，跳过跨进程请求合并: {e}")
+        return await fn()
+
+    result_key = single_flight_result_key(key)
+    lock_key = f"singleflight:lock:{key}"
+
+    cached = await get_cache(result_key)
+    if cached:
+        return cached
+
+    deadline = time.monotonic() + wait_timeout
+    while True:
+        token = await acquire_lock(lock_key, ttl=lock_ttl)
+        if token:
+            try:
+                result = await fn()
+                if result:
+                    await set_cache(result_key, result, ttl=result_ttl)
+                return result
+            finally:
+                await release_lock(lock_key, token)
+
+        # 其他进程正在请求，等待其写回结果
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+            cached = await get_cache(result_key)
+            if cached:
+                return cached
+            if not await lock_exists(lock_key):
+                break
+        else:
+            logger.warning(f"等待共享请求结果超时，自行请求: {key}")
+            return await fn()
@@ -0,0 +1,63 @@
+"""
+Token 计数
+优先使用 tiktoken：按 OPENAI_MODEL 取对应编码，未知模型退回 cl100k_base。
+tiktoken 未安装或编码加载失败（如离线时无法下载 BPE 文件）时，退回按字符类别的估算：
+中日韩字符每字 1 个 token，其余字符每 4 个 1 个 token。
+"""
+
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover
+    tiktoken = None
+
+_FALLBACK_ENCODING = "cl100k_base"
+
+# 模型名 -> 编码（加载失败记为 None，不再重复尝试）
+_encodings: Dict[str, Optional[Any]] = {}
+
+
+def _load_encoding(model: str) -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as e:
+        logger.warning(f"加载模型 {model} 的 tiktoken 编码失败: {e}")
+    try:
+        return tiktoken.get_encoding(_FALLBACK_ENCODING)
+    except Exception as e:
+        logger.warning(f"加载 tiktoken 编码 {_FALLBACK_ENCODING} 失败，改用字符估算: {e}")
+        return None
+
+
+def get_encoding(model: Optional[str] = None) -> Optional[Any]:
+    """模型对应的 tiktoken 编码；不可用时返回 None"""
+    model = model or settings.OPENAI_MODEL or ""
+    if model not in _encodings:
+        _encodings[model] = _load_encoding(model)
+    return _encodings[model]
+
+
+def estimate_tokens_heuristic(text: str) -> int:
+    """按字符类别估算 token 数：中日韩字符每字 1 个，其余每 4 个字符 1 个"""
+    cjk = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff")
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """文本的 token 数（tiktoken 不可用时为估算值）"""
+    encoding = get_encoding(model)
+    if encoding is not None:
+        try:
+            return len(encoding.encode(text, disallowed_special=()))
+        except Exception as e:
+            logger.debug(f"tiktoken 编码失败，改用字符估算: {e}")
+    return estimate_tokens_heuristic(text)
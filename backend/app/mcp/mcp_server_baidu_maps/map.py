@@ -3,6 +3,7 @@ import os
 import copy
 import httpx
 from asyncio import sleep
+from contextlib import asynccontextmanager
  
 from mcp.server.fastmcp import FastMCP
 import mcp.types as types
@@ -25,6 +26,22 @@ mcp = FastMCP(
 
 api_key = os.getenv('BAIDU_MAPS_API_KEY')
 api_url = "https://api.map.baidu.com"
+
+# 进程内共享的长连接客户端，避免每次工具调用都重新建立 TCP/TLS 连接
+_shared_client = None
+
+
+@asynccontextmanager
+async def _api_client():
+    """获取共享客户端（退出时不关闭，连接归还连接池）"""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = httpx.AsyncClient(
+            proxies={},
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0),
+        )
+    yield _shared_client
  
  
 def filter_result(data) -> dict:
@@ -122,7 +139,7 @@ async def map_geocode(
             "from": "py_mcp"
         }
         
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -177,7 +194,7 @@ async def map_reverse_geocode(
             "from": "py_mcp"
         }
  
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -256,7 +273,7 @@ async def map_search_places(
             raise Exception("input `is_china` invaild, please reinput `is_china` with `true` or `false`")
 
  
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -313,7 +330,7 @@ async def map_place_details(
             "from": "py_mcp"
         }
         
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -351,7 +368,7 @@ async def map_directions_matrix(
             "from": "py_mcp"
         }
  
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -399,7 +416,7 @@ async def map_directions(
             logger.debug(f"geocode_url: {geocode_url}")
             logger.debug(f"geocode_params: {geocode_params}")
             
-            async with httpx.AsyncClient(proxies={}) as client:
+            async with _api_client() as client:
                 geocode_response = await client.get(geocode_url, params=geocode_params)
                 geocode_response.raise_for_status()
                 geocode_result = geocode_response.json()
@@ -425,7 +442,7 @@ async def map_directions(
                 "from": "py_mcp"
             }
             
-            async with httpx.AsyncClient(proxies={}) as client:
+            async with _api_client() as client:
                 geocode_response = await client.get(geocode_url, params=geocode_params)
                 geocode_response.raise_for_status()
                 geocode_result = geocode_response.json()
@@ -465,7 +482,7 @@ async def map_directions(
                 "from": "py_mcp"
             }
  
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -524,7 +541,7 @@ async def map_weather(
         else:
             params["location"] = f"{location}"
  
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -558,7 +575,7 @@ async def map_ip_location(
             "ip": ip
         }
  
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -609,7 +626,7 @@ async def map_road_traffic(
             params['road_name'] = f'{road_name}'
             params['city'] = f'{city}'
  
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -653,7 +670,7 @@ async def map_poi_extract(
         }
 
         # 异步请求
-        async with httpx.AsyncClient(proxies={}) as client:
+        async with _api_client() as client:
             # 提交任务
             submit_resp = await client.post(
                 submit_url, data=submit_body, headers=headers, timeout=10.0
@@ -6,6 +6,8 @@ from .user import User
 from .travel_plan import TravelPlan, TravelPlanItem
 from .destination import Destination
 from .attraction_detail import AttractionDetail
+from .geo_knowledge import GeoGeocode, GeoPoi, GeoPoiSearch, CityPairDistance
+from .llm_cache import LLMResponseCacheEntry
 from .base import Base
 
 __all__ = [
@@ -14,5 +16,10 @@ __all__ = [
     "TravelPlanItem",
     "Destination",
     "AttractionDetail",
+    "GeoGeocode",
+    "GeoPoi",
+    "GeoPoiSearch",
+    "CityPairDistance",
+    "LLMResponseCacheEntry",
     "Base"
 ]
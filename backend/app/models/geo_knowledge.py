@@ -0,0 +1,94 @@
+"""
+地理知识库模型
+持久化规范化后的地理编码、周边搜索结果与城市间距离，Redis 被清空或缓存清理后仍可直接复用，避免重复调用付费地图接口
+"""
+
+from sqlalchemy import Column, String, Text, Float, JSON, Integer, DateTime, UniqueConstraint
+from datetime import datetime
+from app.models.base import BaseModel
+
+
+class GeoGeocode(BaseModel):
+    """地理编码结果（按规范化地址 + 提供商唯一）"""
+    __tablename__ = "geo_geocodes"
+    __table_args__ = (
+        UniqueConstraint("normalized_key", "provider", name="uq_geo_geocodes_key_provider"),
+    )
+
+    normalized_key = Column(String(300), nullable=False, index=True)  # normalize_address(address, city)
+    provider = Column(String(20), nullable=False)  # amap / baidu / tianditu
+    address = Column(String(300), nullable=False)  # 原始查询地址
+    city = Column(String(100), nullable=True)
+
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    formatted_address = Column(Text, nullable=True)
+    payload = Column(JSON, nullable=False)  # UnifiedMapService 统一格式的完整结果
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # 最近一次从上游刷新的时间
+
+    def __repr__(self):
+        return f"<GeoGeocode(key={self.normalized_key}, provider={self.provider})>"
+
+
+class GeoPoi(BaseModel):
+    """POI（按提供商 + 规范化名称 + 坐标唯一）"""
+    __tablename__ = "geo_pois"
+    __table_args__ = (
+        UniqueConstraint("provider", "poi_key", name="uq_geo_pois_provider_key"),
+    )
+
+    provider = Column(String(20), nullable=False)
+    poi_key = Column(String(300), nullable=False)  # 提供商POI ID，缺失时为 规范化名称|经度,纬度
+    normalized_name = Column(String(200), nullable=False, index=True)
+    name = Column(String(200), nullable=False)
+    category = Column(String(200), nullable=True)
+    address = Column(Text, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    payload = Column(JSON, nullable=False)  # UnifiedMapService 统一格式的完整结果
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<GeoPoi(name={self.name}, provider={self.provider})>"
+
+
+class GeoPoiSearch(BaseModel):
+    """周边搜索结果集（按规范化查询 + 提供商唯一）"""
+    __tablename__ = "geo_poi_searches"
+    __table_args__ = (
+        UniqueConstraint("query_key", "provider", name="uq_geo_poi_searches_key_provider"),
+    )
+
+    query_key = Column(String(64), nullable=False, index=True)  # 规范化查询参数的 SHA-256
+    provider = Column(String(20), nullable=False)
+    location = Column(String(64), nullable=False)  # 中心点 "经度,纬度"
+    keywords = Column(String(200), nullable=True)
+    types = Column(String(100), nullable=True)
+    radius = Column(Integer, nullable=False)
+    result_count = Column(Integer, default=0, nullable=False)
+    results = Column(JSON, nullable=False)  # UnifiedMapService 统一格式的结果列表
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<GeoPoiSearch(key={self.query_key}, provider={self.provider})>"
+
+
+class CityPairDistance(BaseModel):
+    """城市间距离矩阵（由地图接口的真实驾车结果学习，城市对无方向）"""
+    __tablename__ = "city_pair_distances"
+
+    pair_key = Column(String(210), nullable=False, unique=True, index=True)  # 规范化城市名按字典序以 | 连接
+    city_a = Column(String(100), nullable=False)
+    city_b = Column(String(100), nullable=False)
+    distance_km = Column(Float, nullable=False)
+    duration_minutes = Column(Float, nullable=False)  # 驾车时长
+    source = Column(String(20), nullable=False)  # amap / baidu
+    samples = Column(Integer, default=1, nullable=False)  # 累计学习次数
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<CityPairDistance({self.city_a}-{self.city_b}, {self.distance_km}km)>"
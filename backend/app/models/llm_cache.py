@@ -0,0 +1,25 @@
+"""
+LLM 响应缓存模型
+持久化方案模块的 LLM 响应（按请求内容哈希寻址），作为 Redis 之后的一层，Redis 被清空后仍可复用
+"""
+
+from sqlalchemy import Column, String, Text, DateTime, UniqueConstraint
+from app.models.base import BaseModel
+
+
+class LLMResponseCacheEntry(BaseModel):
+    """LLM 响应（按内容哈希 + 模块唯一）"""
+    __tablename__ = "llm_response_cache"
+    __table_args__ = (
+        UniqueConstraint("cache_key", "module", name="uq_llm_response_cache_key_module"),
+    )
+
+    cache_key = Column(String(64), nullable=False, index=True)  # 模型、提示词、temperature、max_tokens 的 SHA-256
+    module = Column(String(50), nullable=False)  # accommodation / dining / transport / attractions
+    model = Column(String(100), nullable=True)
+    response = Column(Text, nullable=False)  # 模型原始响应文本
+
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<LLMResponseCacheEntry(key={self.cache_key}, module={self.module})>"
@@ -145,6 +145,7 @@ class TravelPlanGenerateRequest(BaseModel):
     preferences: Optional[Dict[str, Any]] = Field(None, description="生成偏好")
     requirements: Optional[Dict[str, Any]] = Field(None, description="特殊要求")
     num_plans: int = Field(3, description="生成方案数量", ge=1, le=10)
+    bypass_cache: bool = Field(False, description="跳过LLM响应缓存，强制重新生成")
 
 
 class TravelPlanListResponse(BaseModel):
@@ -11,14 +11,29 @@ import json
 from datetime import datetime
 
 from app.core.config import settings
+from app.core.plan_events import plan_progress_scope, report_plan_progress
+from app.core.plan_preview import build_preview_section, build_raw_preview, clear_raw_preview, save_preview_section
 from app.models.travel_plan import TravelPlan
 from app.services.data_collector import DataCollector
+from app.services.collection_scheduler import CollectionScheduler, SectionFeed
 from app.services.data_processor import DataProcessor
 from app.services.plan_generator import PlanGenerator
 from app.services.plan_scorer import PlanScorer
 from app.tools.mcp_client import MCPClient
+from app.tools.geocode_context import geocode_scope
 from app.tools.openai_client import openai_client
 
+# 数据收集阶段对外输出的分段
+RAW_DATA_SECTIONS = (
+    "flights",
+    "hotels",
+    "attractions",
+    "weather",
+    "restaurants",
+    "transportation",
+    "xiaohongshu_notes",
+)
+
 
 class AgentService:
     """AI Agent服务"""
@@ -31,6 +46,8 @@ class AgentService:
         self.plan_scorer = PlanScorer()
         self.mcp_client = MCPClient()
         self.openai_client = openai_client
+        # 最近一次数据收集的各任务耗时统计
+        self.collection_timings: List[Dict[str, Any]] = []
     
     async def generate_travel_plans(
         self, 
@@ -49,72 +66,86 @@ class AgentService:
         Returns:
             bool: 是否成功生成
         """
-        try:
-            logger.info(f"开始生成旅行方案，计划ID: {plan_id}")
+        with plan_progress_scope(plan_id) as progress:
+            try:
+                logger.info(f"开始生成旅行方案，计划ID: {plan_id}")
             
-            # 1. 获取旅行计划信息
-            plan = await self._get_travel_plan(plan_id)
-            if not plan:
-                logger.error(f"旅行计划不存在: {plan_id}")
-                return False
+                # 1. 获取旅行计划信息
+                plan = await self._get_travel_plan(plan_id)
+                if not plan:
+                    logger.error(f"旅行计划不存在: {plan_id}")
+                    return False
             
-            # 2. 更新状态为生成中
-            await self._update_plan_status(plan_id, "generating")
+                # 2. 更新状态为生成中
+                await self._update_plan_status(plan_id, "generating")
+                await progress.emit("started")
             
-            # 3. 数据收集阶段
-            logger.info("开始数据收集...")
-            raw_data = await self._collect_data(plan, preferences, requirements)
-            logger.info("保存原始数据预览并提前展示...")
-            await self._save_raw_preview(plan_id, raw_data, plan)
-            # 4. 数据清洗和评分
-            logger.info("开始数据清洗和评分...")
-            processed_data = await self._process_data(raw_data, plan)
+                # 3-5. 数据收集、清洗与方案生成流水线：每个分段收集并清洗后立即交付，
+                #      各LLM模块在所需分段就绪后即开始生成，不等待全部收集任务
+                logger.info("开始数据收集，并流式衔接方案生成...")
+                section_feed = SectionFeed(list(RAW_DATA_SECTIONS))
+                generation_task = asyncio.create_task(
+                    self._generate_plans(None, plan, preferences, None, section_feed=section_feed)
+                )
+                try:
+                    raw_data = await self._collect_data(plan, preferences, requirements, section_feed=section_feed)
+                except BaseException:
+                    generation_task.cancel()
+                    raise
+                processed_data, _ = await section_feed.wait_all()
+                await progress.emit("processing")
             
-            # 5. 生成多个方案
-            logger.info("开始生成旅行方案...")
-            generated_plans = await self._generate_plans(processed_data, plan, preferences, raw_data)
+                logger.info("数据收集完成，等待方案生成...")
+                generated_plans = await generation_task
             
-            # 6. 方案评分和排序
-            logger.info("开始方案评分和排序...")
-            scored_plans = await self._score_plans(generated_plans, plan, preferences)
-            if not scored_plans:
-                fallback_plans = await self.plan_generator._generate_traditional_plans(processed_data, plan, preferences, raw_data)
-                if fallback_plans:
-                    scored_plans = await self._score_plans(fallback_plans, plan, preferences)
-                else:
-                    await self._update_plan_status(plan_id, "failed")
-                    try:
-                        await self.data_collector.close()
-                    except Exception:
-                        pass
-                    return False
+                # 6. 方案评分和排序
+                logger.info("开始方案评分和排序...")
+                scored_plans = await self._score_plans(generated_plans, plan, preferences)
+                if not scored_plans:
+                    fallback_plans = await self.plan_generator._generate_traditional_plans(processed_data, plan, preferences, raw_data)
+                    if fallback_plans:
+                        scored_plans = await self._score_plans(fallback_plans, plan, preferences)
+                    else:
+                        await self._update_plan_status(plan_id, "failed")
+                        await progress.emit("failed", status="failed", message="未生成可用方案")
+                        try:
+                            await self.data_collector.close()
+                        except Exception:
+                            pass
+                        return False
 
-            # 7. 保存结果
-            await self._save_generated_plans(plan_id, scored_plans)
-            try:
-                if scored_plans:
-                    await self._set_selected_plan_default(plan_id, scored_plans[0])
-            except Exception:
-                pass
+                await progress.emit("scoring", plan_count=len(scored_plans))
+
+                # 7. 保存结果
+                await self._save_generated_plans(plan_id, scored_plans)
+                try:
+                    if scored_plans:
+                        await self._set_selected_plan_default(plan_id, scored_plans[0])
+                except Exception:
+                    pass
+                await progress.emit("saved")
             
-            # 8. 更新状态为完成
-            await self._update_plan_status(plan_id, "completed")
+                # 8. 更新状态为完成
+                await self._update_plan_status(plan_id, "completed")
+                await progress.emit("completed", status="completed")
+                await clear_raw_preview(plan_id)
             
-            logger.info(f"旅行方案生成完成，计划ID: {plan_id}")
-            try:
-                await self.data_collector.close()
-            except Exception:
-                pass
-            return True
+                logger.info(f"旅行方案生成完成，计划ID: {plan_id}")
+                try:
+                    await self.data_collector.close()
+                except Exception:
+                    pass
+                return True
             
-        except Exception as e:
-            logger.error(f"生成旅行方案失败: {e}")
-            await self._update_plan_status(plan_id, "failed")
-            try:
-                await self.data_collector.close()
-            except Exception:
-                pass
-            return False
+            except Exception as e:
+                logger.error(f"生成旅行方案失败: {e}")
+                await self._update_plan_status(plan_id, "failed")
+                await progress.emit("failed", status="failed", message=str(e))
+                try:
+                    await self.data_collector.close()
+                except Exception:
+                    pass
+                return False
     
     async def _get_travel_plan(self, plan_id: int) -> Optional[TravelPlan]:
         """获取旅行计划"""
@@ -149,89 +180,71 @@ class AgentService:
         plan, 
         preferences: Optional[Dict[str, Any]] = None,
         requirements: Optional[Dict[str, Any]] = None,
-        interval_seconds: float = 1.0  # 每个任务启动之间的时间间隔
+        section_feed: Optional[SectionFeed] = None,
     ) -> Dict[str, Any]:
-        """数据收集阶段：按间隔启动任务，并在每个任务完成后增量保存预览
-        修复：使用任务包装返回(key, result, error)，避免as_completed返回对象与原Task不一致导致映射失败"""
-        
-        logger.info(f"开始收集 {plan.destination} 的各类数据（每个任务间隔 {interval_seconds}s 启动）")
-
-        # 估算行程天数，用于动态控制原始数据量
-        try:
-            days = (plan.end_date - plan.start_date).days + 1
-        except Exception:
-            days = getattr(plan, "duration_days", None) or 1
-        days = max(int(days), 1)
-
-        # 将任务与对应的section键关联，便于增量更新（缺少出发地则跳过航班与交通）
-        task_specs = [
-            ("hotels", lambda: self.data_collector.collect_hotel_data(plan.destination, plan.start_date, plan.end_date)),
-            ("attractions", lambda: self.data_collector.collect_attraction_data(plan.destination, plan.start_date, plan.end_date)),
-            ("weather", lambda: self.data_collector.collect_weather_data(plan.destination, plan.start_date, plan.end_date)),
-            ("restaurants", lambda: self.data_collector.collect_restaurant_data(plan.destination, plan.start_date, plan.end_date)),
-            ("xiaohongshu_notes", lambda: self.data_collector.collect_xiaohongshu_data(plan.destination, plan.start_date, plan.end_date)),
-        ]
-        if plan.departure:
-            task_specs.insert(0, ("flights", lambda: self.data_collector.collect_flight_data(plan.departure, plan.destination, plan.start_date, plan.end_date)))
-            task_specs.append(("transportation", lambda: self.data_collector.collect_transportation_data(plan.departure, plan.destination, plan.transportation)))
-        else:
-            logger.info("未提供出发地，跳过航班与交通数据收集以提升速度")
+        """数据收集阶段：按依赖关系并发调度各收集任务，并在每个任务完成后增量保存预览
 
-        # 任务包装：返回(key, result, error)
-        async def run_with_key(key: str, factory):
-            try:
-                res = await factory()
-                return key, res, None
-            except Exception as e:
-                return key, None, e
-
-        tasks: List[asyncio.Task] = []
+        无依赖的任务立即启动，上游接口的并发由 app.core.concurrency 按提供商限制，
+        不再使用固定的启动间隔。传入 section_feed 时，每个分段完成后立即清洗并交付给方案生成阶段。"""
+        
+        logger.info(f"开始收集 {plan.destination} 的各类数据（依赖感知并发调度）")
 
-        # 延迟创建 + 调度任务（保证间隔生效）
-        for i, (key, factory) in enumerate(task_specs):
-            if i > 0 and interval_seconds > 0:
-                logger.debug(f"等待 {interval_seconds}s 后启动下一个任务 ({i+1}/{len(task_specs)})")
-                await asyncio.sleep(interval_seconds)
-            task = asyncio.create_task(run_with_key(key, factory))
-            tasks.append(task)
-            logger.debug(f"已启动任务 {i+1}/{len(task_specs)}: {key}")
+        scheduler = CollectionScheduler(
+            self.data_collector.build_collection_specs(
+                plan.departure,
+                plan.destination,
+                plan.start_date,
+                plan.end_date,
+                plan.transportation,
+            )
+        )
 
         # 用于聚合增量结果
         partial_raw: Dict[str, Any] = {}
+        section_total = sum(1 for spec in scheduler.specs.values() if spec.publish)
+        preview_title = f"{getattr(plan, 'destination', '')} 数据预览"
 
-        # 逐个等待任务完成，并在每次完成后保存一次预览
-        for task in asyncio.as_completed(tasks):
-            key, result, error = await task
-            if error:
-                logger.warning(f"{key} 数据收集失败: {error}")
-                # 根据类型填充合理的默认值
-                if key == "weather":
-                    result = {}
-                else:
-                    result = []
-
+        async def on_section_ready(key: str, result: Any):
             # 更新聚合结果
             if key == "weather":
                 partial_raw[key] = result if isinstance(result, dict) else {}
             else:
                 partial_raw[key] = result if isinstance(result, list) else []
 
-            # 增量保存原始数据预览（覆盖之前的预览，前端轮询可见逐步更新）
+            if section_feed is not None:
+                try:
+                    processed = await self._process_section(key, partial_raw[key], plan)
+                except Exception as process_err:
+                    logger.warning(f"清洗数据分段失败（{key}）: {process_err}")
+                    processed = partial_raw[key]
+                section_feed.publish(key, partial_raw[key], processed)
+
+            # 只保存完成的分段，读取方按需合并；Redis 不可用时回退为整体写入 generated_plans
             try:
-                await self._save_raw_preview(plan.id, partial_raw, plan)
-                logger.debug(f"已增量保存预览，section: {key}，当前可用: {list(partial_raw.keys())}")
-            except Exception as save_err:
-                logger.warning(f"保存预览失败（{key}）: {save_err}")
+                await save_preview_section(plan.id, key, partial_raw[key], title=preview_title)
+                logger.debug(f"已保存预览分段: {key}，当前可用: {list(partial_raw.keys())}")
+            except Exception as section_err:
+                logger.warning(f"保存预览分段失败（{key}），回退为整体保存: {section_err}")
+                try:
+                    await self._save_raw_preview(plan.id, partial_raw, plan)
+                except Exception as save_err:
+                    logger.warning(f"保存预览失败（{key}）: {save_err}")
+            await report_plan_progress("collecting", total=section_total, section=key)
+
+        # 请求级地理编码上下文：各收集任务共享同一目的地的地理编码结果
+        try:
+            with geocode_scope():
+                await scheduler.run(on_result=on_section_ready)
+        finally:
+            if section_feed is not None:
+                # 未完成的分段以默认值交付，避免方案生成阶段永久等待
+                section_feed.close({"weather": {}})
+        self.collection_timings = scheduler.timings_summary()
 
         # 返回最终完整结果（保证键齐全）
         return {
-            "flights": partial_raw.get("flights", []),
-            "hotels": partial_raw.get("hotels", []),
-            "attractions": partial_raw.get("attractions", []),
-            "weather": partial_raw.get("weather", {}),
-            "restaurants": partial_raw.get("restaurants", []),
-            "transportation": partial_raw.get("transportation", []),
-            "xiaohongshu_notes": partial_raw.get("xiaohongshu_notes", [])
+            key: partial_raw.get(key, {} if key == "weather" else [])
+            for key in RAW_DATA_SECTIONS
         }
 
     async def _process_data(
@@ -244,16 +257,17 @@ class AgentService:
         processed_data = {}
         
         for data_type, data in raw_data.items():
-            if data_type == "weather":
-                # 天气数据不需要清洗
-                processed_data[data_type] = data
-            else:
-                # 其他数据需要清洗和评分
-                processed_data[data_type] = await self.data_processor.process_data(
-                    data, data_type, plan
-                )
+            processed_data[data_type] = await self._process_section(data_type, data, plan)
         
         return processed_data
+
+    async def _process_section(self, data_type: str, data: Any, plan: TravelPlan) -> Any:
+        """清洗和评分单个数据分段"""
+        if data_type == "weather":
+            # 天气数据不需要清洗
+            return data
+        # 其他数据需要清洗和评分
+        return await self.data_processor.process_data(data, data_type, plan)
     
     def _clean_llm_response(self, response: str) -> str:
         """清理LLM响应，移除markdown标记等"""
@@ -274,9 +288,10 @@ class AgentService:
         processed_data: Dict[str, Any], 
         plan: TravelPlan,
         preferences: Optional[Dict[str, Any]] = None,
-        raw_data: Optional[Dict[str, Any]] = None
+        raw_data: Optional[Dict[str, Any]] = None,
+        section_feed: Optional[SectionFeed] = None,
     ) -> List[Dict[str, Any]]:
-        """生成多个旅行方案"""
+        """生成多个旅行方案（传入 section_feed 时各模块在所需数据分段就绪后即开始）"""
         
         # 使用LLM增强的方案生成
         try:
@@ -286,22 +301,22 @@ class AgentService:
             # 首先尝试使用LLM分析数据并生成方案
             if self.openai_client.api_key:
                 return await self.plan_generator.generate_plans(
-                    processed_data, plan, preferences, raw_data
+                    processed_data, plan, preferences, raw_data, section_feed=section_feed
                 )
             else:
                 logger.info("OpenAI API密钥未配置，直接使用原始数据")
                 return await self.plan_generator.generate_plans(
-                    processed_data, plan, preferences, raw_data
+                    processed_data, plan, preferences, raw_data, section_feed=section_feed
                 )
         except asyncio.TimeoutError:
             logger.warning("LLM数据增强超时，使用原始数据")
             return await self.plan_generator.generate_plans(
-                processed_data, plan, preferences, raw_data
+                processed_data, plan, preferences, raw_data, section_feed=section_feed
             )
         except Exception as e:
             logger.warning(f"LLM增强数据失败，使用原始数据: {e}")
             return await self.plan_generator.generate_plans(
-                processed_data, plan, preferences, raw_data
+                processed_data, plan, preferences, raw_data, section_feed=section_feed
             )
     
     async def _score_plans(
@@ -431,46 +446,15 @@ class AgentService:
         )
         await self.db.commit()
 
-    async def _save_raw_preview(self, plan_id: int, raw_data: Dict[str, Any], plan: TravelPlan):
-        """将数据收集阶段的原始数据保存为预览，供前端提前展示"""
+    async def _save_raw_preview(self, plan_id: int, raw_data: Dict[str, Any], plan: TravelPlan) -> Dict[str, Any]:
+        """将原始数据预览整体写入 generated_plans（分段存储不可用时的回退），返回序列化后的预览"""
         from sqlalchemy import update
         from app.models.travel_plan import TravelPlan
         from app.core.database import async_session
-        # 选择展示数量
-        MAX_XHS = 8
-        MAX_FLIGHTS = 3
-        MAX_HOTELS = 3
-        MAX_ATTRACTIONS = 6
-        MAX_RESTAURANTS = 6
-    
-        def top_n(items, n, key=None, reverse=True):
-            try:
-                if not isinstance(items, list):
-                    return []
-                if key:
-                    items = sorted(items, key=lambda x: x.get(key, 0), reverse=reverse)
-                return items[:n]
-            except Exception:
-                return items[:n] if isinstance(items, list) else []
-    
-        sections = {
-            "xiaohongshu_notes": top_n(raw_data.get("xiaohongshu_notes", []), MAX_XHS, key="likes"),
-            "flights": top_n(raw_data.get("flights", []), MAX_FLIGHTS, key="price", reverse=False),
-            "hotels": top_n(raw_data.get("hotels", []), MAX_HOTELS, key="rating"),
-            "attractions": top_n(raw_data.get("attractions", []), MAX_ATTRACTIONS, key="rating"),
-            "restaurants": top_n(raw_data.get("restaurants", []), MAX_RESTAURANTS, key="rating"),
-            "weather": raw_data.get("weather", {}),
-        }
-    
-        preview = {
-            "id": "preview_raw_1",
-            "is_preview": True,
-            "preview_type": "raw_data_preview",
-            "title": f"{getattr(plan, 'destination', '')} 数据预览",
-            "sections": sections,
-            "generated_at": datetime.utcnow().isoformat(),
-        }
-    
+
+        sections = {key: build_preview_section(key, data) for key, data in raw_data.items()}
+        preview = build_raw_preview(f"{getattr(plan, 'destination', '')} 数据预览", sections)
+
         serialized_preview = self._serialize_for_json([preview])
         async with async_session() as session:
             await session.execute(
@@ -479,4 +463,5 @@ class AgentService:
                 .values(generated_plans=serialized_preview)
             )
             await session.commit()
+        return serialized_preview[0]
             
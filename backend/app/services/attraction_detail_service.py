@@ -8,18 +8,34 @@ from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func
 from app.models.attraction_detail import AttractionDetail
+from app.services.destination_canonicalizer import destination_canonicalizer
 
 
 class AttractionDetailService:
     """景点详细信息服务"""
     
+    @staticmethod
+    async def destination_names(db: AsyncSession, destination: str) -> List[str]:
+        """与目的地规范标识相同的所有目的地写法（"杭州"、"杭州市"等手动维护时的不同写法都能匹配）"""
+        names = [destination]
+        try:
+            result = await db.execute(select(AttractionDetail.destination).distinct())
+            stored = [name for name in result.scalars().all() if name]
+            canonical_map = await destination_canonicalizer.canonicalize_many([destination, *stored])
+            target = canonical_map.get(destination)
+            names.extend(name for name in stored if name != destination and canonical_map.get(name) == target)
+        except Exception as e:
+            logger.warning(f"解析景点详情目的地写法失败: {destination}, 错误: {e}")
+        return names
+
     @staticmethod
     async def find_matching_detail(
         db: AsyncSession,
         attraction_name: str,
         destination: str,
         city: Optional[str] = None,
-        coordinates: Optional[Dict[str, float]] = None
+        coordinates: Optional[Dict[str, float]] = None,
+        destination_names: Optional[List[str]] = None
     ) -> Optional[AttractionDetail]:
         """
         查找匹配的景点详细信息
@@ -30,21 +46,25 @@ class AttractionDetailService:
             destination: 目的地
             city: 城市（可选）
             coordinates: 坐标信息 {"lat": x, "lng": y}（可选）
+            destination_names: 目的地的所有写法（可选，未传入时按规范标识查询；批量匹配时由调用方预先查询一次）
             
         Returns:
             匹配的 AttractionDetail 对象，如果未找到返回 None
         """
         try:
-            # 1. 精确匹配：名称和目的地完全一致
+            if destination_names is None:
+                destination_names = await AttractionDetailService.destination_names(db, destination)
+
+            # 1. 精确匹配：名称一致，且目的地规范标识一致
             query = select(AttractionDetail).where(
                 and_(
                     func.lower(AttractionDetail.name) == attraction_name.lower().strip(),
-                    AttractionDetail.destination == destination
+                    AttractionDetail.destination.in_(destination_names)
                 )
             ).order_by(AttractionDetail.match_priority.desc())
             
             result = await db.execute(query)
-            detail = result.scalar_one_or_none()
+            detail = result.scalars().first()
             
             if detail:
                 logger.debug(f"精确匹配到景点详情: {attraction_name} in {destination}")
@@ -56,14 +76,14 @@ class AttractionDetailService:
                     and_(
                         AttractionDetail.name.contains(attraction_name),
                         or_(
-                            AttractionDetail.destination == destination,
+                            AttractionDetail.destination.in_(destination_names),
                             AttractionDetail.city == city
                         )
                     )
                 ).order_by(AttractionDetail.match_priority.desc())
                 
                 result = await db.execute(query)
-                detail = result.scalar_one_or_none()
+                detail = result.scalars().first()
                 
                 if detail:
                     logger.debug(f"模糊匹配到景点详情: {attraction_name} in {destination}/{city}")
@@ -86,7 +106,7 @@ class AttractionDetailService:
                 ).order_by(AttractionDetail.match_priority.desc())
                 
                 result = await db.execute(query)
-                detail = result.scalar_one_or_none()
+                detail = result.scalars().first()
                 
                 if detail:
                     logger.debug(f"坐标匹配到景点详情: {attraction_name} near ({lat}, {lng})")
@@ -191,7 +211,8 @@ class AttractionDetailService:
         db: AsyncSession,
         attractions: List[Dict[str, Any]],
         destination: str,
-        city: Optional[str] = None
+        city: Optional[str] = None,
+        map_service: Optional[Any] = None
     ) -> List[Dict[str, Any]]:
         """
         批量为景点数据补充详细信息
@@ -201,11 +222,19 @@ class AttractionDetailService:
             attractions: 景点数据列表
             destination: 目的地
             city: 城市（可选）
+            map_service: 统一地图服务（可选），提供时先批量补全缺少坐标的景点，以便按坐标匹配
             
         Returns:
             补充了详细信息的景点数据列表
         """
         enriched_attractions = []
+        destination_names = await AttractionDetailService.destination_names(db, destination)
+        
+        if map_service is not None:
+            try:
+                await map_service.fill_missing_coordinates(attractions, city or destination)
+            except Exception as e:
+                logger.warning(f"批量补全景点坐标失败（不影响匹配）: {e}")
         
         for attraction in attractions:
             attraction_name = attraction.get("name", "")
@@ -217,7 +246,8 @@ class AttractionDetailService:
                 attraction_name=attraction_name,
                 destination=destination,
                 city=city,
-                coordinates=coordinates
+                coordinates=coordinates,
+                destination_names=destination_names
             )
             
             # 如果找到详细信息，合并到景点数据中
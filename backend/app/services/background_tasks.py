@@ -8,6 +8,8 @@ from loguru import logger
 from datetime import datetime, timedelta
 
 from app.core.redis import get_redis, clear_cache_pattern
+from app.core.config import settings
+from app.services.cache_warmer import CacheWarmer
 from app.services.data_collector import DataCollector
 
 
@@ -49,17 +51,11 @@ class BackgroundTaskManager:
             try:
                 logger.debug("执行缓存清理任务")
                 
-                # 清理过期的缓存
-                redis_client = await get_redis()
-                
                 # 清理过期的航班缓存
                 await clear_cache_pattern("flights:*")
                 
-                # 清理过期的酒店缓存
-                await clear_cache_pattern("hotels:*")
-                
-                # 清理过期的天气缓存
-                await clear_cache_pattern("weather:*")
+                # 酒店/天气等由 cached_fetch 管理的缓存自带过期时间与 stale 窗口，
+                # 不再整体清除，否则会抹掉预热数据
                 
                 logger.debug("缓存清理完成")
                 
@@ -72,57 +68,25 @@ class BackgroundTaskManager:
                 await asyncio.sleep(300)  # 5分钟后重试
     
     async def data_refresh_task(self):
-        """数据刷新任务"""
+        """数据刷新任务：按真实计划流量预热热门目的地缓存"""
         # 启动后先等待一段时间，避免阻塞主进程
         await asyncio.sleep(60)  # 等待1分钟后再开始
         
+        warmer = CacheWarmer(self.data_collector)
         while self.running:
             try:
                 logger.debug("执行数据刷新任务")
                 
-                # 刷新热门目的地的数据（减少数量，避免阻塞）
-                popular_destinations = [
-                ]
-                
-                for destination in popular_destinations:
-                    if not self.running:  # 检查是否仍在运行
-                        break
-                        
-                    try:
-                        # 并行刷新数据，提高效率，添加超时处理
-                        tasks = [
-                            self.data_collector.collect_attraction_data(destination),
-                            self.data_collector.collect_restaurant_data(destination),
-                            self.data_collector.collect_transportation_data("北京", destination, "mixed")  # 使用北京作为默认出发地，收集混合交通方式
-                        ]
-                        
-                        # 设置30秒超时，避免任务卡死
-                        await asyncio.wait_for(
-                            asyncio.gather(*tasks, return_exceptions=True),
-                            timeout=30.0
-                        )
-                        logger.debug(f"已刷新 {destination} 的数据")
-                        
-                        # 避免请求过于频繁
-                        await asyncio.sleep(5)
-                        
-                    except asyncio.TimeoutError:
-                        logger.warning(f"刷新 {destination} 数据超时，跳过")
-                        continue
-                    except Exception as e:
-                        logger.error(f"刷新 {destination} 数据失败: {e}")
-                        # 继续处理下一个目的地
-                        continue
-                
-                logger.debug("数据刷新完成")
+                # 跨进程互斥，Celery 定时任务正在预热时本轮跳过
+                result = await warmer.run_once()
+                logger.debug(f"数据刷新完成: {result.get('status')}")
                 
-                # 每60分钟执行一次，避免长时间阻塞
-                await asyncio.sleep(3600)
+                await asyncio.sleep(settings.CACHE_WARMER_INTERVAL)
                 
             except Exception as e:
                 logger.error(f"数据刷新任务失败: {e}")
                 # 任务失败时继续运行，避免阻塞
-                await asyncio.sleep(3600)  # 60分钟后重试
+                await asyncio.sleep(settings.CACHE_WARMER_INTERVAL)
     
     async def health_check_task(self):
         """健康检查任务"""
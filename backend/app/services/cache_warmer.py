@@ -0,0 +1,323 @@
+"""
+热门目的地缓存预热
+- 预热目标：travel_plans 近期记录中最热门的目的地与出发地→目的地组合，以及管理员固定的目的地
+- 在缓存逻辑过期前刷新景点、餐厅、酒店、天气与地理编码数据，实际回源按提供商限速，避免挤占用户请求的上游配额
+- 用户请求命中预热数据的比例由 app.core.cache_aside 统计
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import func, select
+
+from app.core.cache_aside import cache_warming, get_cache_lookup_stats
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.redis import acquire_lock, get_redis, release_lock
+from app.models.travel_plan import TravelPlan
+from app.services.data_collector import DataCollector
+from app.services.destination_canonicalizer import destination_canonicalizer
+
+_PINNED_KEY = "cache_warmer:pinned"
+_LAST_RUN_KEY = "cache_warmer:last_run"
+_RUN_LOCK_KEY = "cache_warmer:round"
+
+# 预热的数据分段（与数据收集缓存键前缀一致）
+_WARM_SECTIONS = ("attractions", "restaurants", "hotels", "weather")
+
+
+@dataclass
+class WarmTarget:
+    """预热目标"""
+
+    destination: str
+    plan_count: int = 0
+    duration_days: int = 3
+    departures: Tuple[str, ...] = ()
+    pinned: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "destination": self.destination,
+            "plan_count": self.plan_count,
+            "duration_days": self.duration_days,
+            "departures": list(self.departures),
+            "pinned": self.pinned,
+        }
+
+
+def _parse_rpm(raw: str) -> Dict[str, int]:
+    """解析形如 "amap=30,baidu=20" 的每分钟上限配置"""
+    limits: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        try:
+            limits[name.strip().lower()] = max(int(value.strip()), 1)
+        except ValueError:
+            logger.warning(f"忽略无效的预热限速配置项: {part}")
+    return limits
+
+
+def _provider_for_key(key: str) -> str:
+    prefix = key.split(":", 1)[0]
+    if prefix == "weather":
+        return settings.WEATHER_DATA_SOURCE.lower()
+    if prefix == "restaurants" and settings.RESTAURANT_DATA_SOURCE.lower() in ("amap", "baidu"):
+        return settings.RESTAURANT_DATA_SOURCE.lower()
+    return settings.MAP_PROVIDER.lower()
+
+
+class ProviderPacer:
+    """按提供商均匀间隔预热回源（每分钟上限），单轮预热内使用"""
+
+    def __init__(self, rpm_config: str, default_rpm: int):
+        self._limits = _parse_rpm(rpm_config)
+        self._default = max(int(default_rpm), 1)
+        self._next_at: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+        self.fetches: Dict[str, int] = {}
+
+    async def wait(self, key: str):
+        provider = _provider_for_key(key)
+        interval = 60.0 / self._limits.get(provider, self._default)
+        async with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at.get(provider, now))
+            self._next_at[provider] = start_at + interval
+            self.fetches[provider] = self.fetches.get(provider, 0) + 1
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+
+class CacheWarmer:
+    """热门目的地缓存预热器"""
+
+    def __init__(self, data_collector: Optional[DataCollector] = None):
+        self._data_collector = data_collector
+
+    @property
+    def data_collector(self) -> DataCollector:
+        if self._data_collector is None:
+            self._data_collector = DataCollector()
+        return self._data_collector
+
+    # ---------- 预热目标 ----------
+
+    async def get_pinned(self) -> List[str]:
+        """固定预热的目的地（配置 + 管理接口添加）"""
+        pinned = [item.strip() for item in settings.CACHE_WARMER_PINNED.split(",") if item.strip()]
+        try:
+            client = await get_redis()
+            members = await client.smembers(_PINNED_KEY)
+            for member in members or []:
+                name = member.decode() if isinstance(member, bytes) else member
+                if name not in pinned:
+                    pinned.append(name)
+        except Exception as e:
+            logger.warning(f"读取固定预热目的地失败: {e}")
+        return pinned
+
+    async def pin(self, destination: str) -> bool:
+        destination = destination.strip()
+        if not destination:
+            return False
+        client = await get_redis()
+        await client.sadd(_PINNED_KEY, destination)
+        return True
+
+    async def unpin(self, destination: str) -> bool:
+        client = await get_redis()
+        return bool(await client.srem(_PINNED_KEY, destination.strip()))
+
+    async def top_targets(self) -> List[WarmTarget]:
+        """按近期计划数统计热门目的地及其常见出发地，合并固定目的地（同一规范标识的不同写法合并为一个目标）"""
+        since = datetime.utcnow() - timedelta(days=settings.CACHE_WARMER_LOOKBACK_DAYS)
+        targets: Dict[str, WarmTarget] = {}
+        try:
+            async with async_session() as db:
+                destination_rows = (await db.execute(
+                    select(
+                        TravelPlan.destination,
+                        func.count(TravelPlan.id).label("plan_count"),
+                        func.avg(TravelPlan.duration_days).label("avg_days"),
+                    )
+                    .where(TravelPlan.created_at >= since, TravelPlan.destination.isnot(None), TravelPlan.destination != "")
+                    .group_by(TravelPlan.destination)
+                    .order_by(func.count(TravelPlan.id).desc())
+                    .limit(settings.CACHE_WARMER_TOP_N)
+                )).all()
+                pair_rows = (await db.execute(
+                    select(
+                        TravelPlan.departure,
+                        TravelPlan.destination,
+                        func.count(TravelPlan.id).label("plan_count"),
+                    )
+                    .where(TravelPlan.created_at >= since, TravelPlan.departure.isnot(None), TravelPlan.departure != "")
+                    .group_by(TravelPlan.departure, TravelPlan.destination)
+                    .order_by(func.count(TravelPlan.id).desc())
+                    .limit(settings.CACHE_WARMER_TOP_PAIRS)
+                )).all()
+        except Exception as e:
+            logger.warning(f"统计热门目的地失败: {e}")
+            destination_rows, pair_rows = [], []
+
+        pinned = await self.get_pinned()
+        canonical_ids = await destination_canonicalizer.canonicalize_many(
+            [row[0].strip() for row in destination_rows]
+            + [(row[1] or "").strip() for row in pair_rows]
+            + [row[0].strip() for row in pair_rows]
+            + pinned
+        )
+
+        def canonical(name: str) -> str:
+            return canonical_ids.get(name) or name
+
+        for destination, plan_count, avg_days in destination_rows:
+            name = canonical(destination.strip())
+            target = targets.get(name)
+            if target is None:
+                targets[name] = WarmTarget(
+                    destination=name,
+                    plan_count=int(plan_count or 0),
+                    duration_days=max(int(round(float(avg_days or 3))), 1),
+                )
+            else:
+                target.plan_count += int(plan_count or 0)
+        for departure, destination, plan_count in pair_rows:
+            if not (destination or "").strip():
+                continue
+            name = canonical(destination.strip())
+            target = targets.setdefault(name, WarmTarget(destination=name, plan_count=int(plan_count or 0)))
+            departure_id = canonical(departure.strip())
+            if departure_id != name and departure_id not in target.departures:
+                target.departures = target.departures + (departure_id,)
+
+        for name in pinned:
+            name = canonical(name)
+            target = targets.get(name)
+            if target is None:
+                targets[name] = WarmTarget(destination=name, pinned=True)
+            else:
+                target.pinned = True
+        # 固定目的地优先
+        return sorted(targets.values(), key=lambda t: (not t.pinned, -t.plan_count))
+
+    # ---------- 预热 ----------
+
+    async def _warm_target(self, target: WarmTarget) -> Dict[str, Any]:
+        """预热单个目的地：地理编码 + 各数据分段（仅在缓存缺失或即将过期时回源）"""
+        collector = self.data_collector
+        start_date = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time())
+        end_date = start_date + timedelta(days=target.duration_days - 1)
+
+        geocode_info = await collector.get_destination_geocode_info(target.destination)
+        results = await asyncio.gather(
+            collector.collect_attraction_data(target.destination, start_date, end_date, geocode_info=geocode_info),
+            collector.collect_restaurant_data(target.destination, start_date, end_date, geocode_info=geocode_info),
+            collector.collect_hotel_data(target.destination, start_date, end_date, geocode_info=geocode_info),
+            collector.collect_weather_data(target.destination, start_date, end_date),
+            *(
+                collector.collect_transportation_data(departure, target.destination)
+                for departure in target.departures
+            ),
+            return_exceptions=True,
+        )
+        summary = {"destination": target.destination, "geocode": bool(geocode_info)}
+        for name, result in zip(_WARM_SECTIONS, results):
+            summary[name] = 0 if isinstance(result, BaseException) or not result else len(result)
+        return summary
+
+    async def _refresh_lead(self) -> float:
+        """刷新提前量：至少覆盖到下一轮预热处理同一条目的时刻（预热间隔 + 一轮耗时）
+
+        同一条目两次被检查的间隔约为 预热间隔 + 一轮耗时，提前量更短时，剩余有效期落在二者之间的条目
+        会在下一轮之前过期，转由用户请求回源（不受预热限速约束）。一轮耗时取上一轮记录，没有记录时按预热间隔估计。
+        """
+        interval = max(float(settings.CACHE_WARMER_INTERVAL), 0.0)
+        duration = interval
+        try:
+            client = await get_redis()
+            raw = await client.get(_LAST_RUN_KEY)
+            if raw:
+                duration = float(json.loads(raw).get("duration") or 0.0)
+        except Exception as e:
+            logger.debug(f"读取上一轮预热耗时失败: {e}")
+        return max(float(settings.CACHE_WARMER_REFRESH_LEAD), interval + duration)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """执行一轮预热（跨进程互斥，Web 后台任务与 Celery 定时任务不会重复执行）"""
+        if not settings.CACHE_WARMER_ENABLED:
+            return {"status": "disabled"}
+        # 限速下一轮可能超过预热间隔，锁超时留足余量，结束时主动释放
+        token = await acquire_lock(_RUN_LOCK_KEY, ttl=max(settings.CACHE_WARMER_INTERVAL * 3, 600))
+        if not token:
+            return {"status": "skipped", "reason": "其他进程正在预热"}
+
+        started = time.perf_counter()
+        pacer = ProviderPacer(settings.CACHE_WARMER_PROVIDER_RPM, settings.CACHE_WARMER_DEFAULT_RPM)
+        refresh_lead = await self._refresh_lead()
+        summaries: List[Dict[str, Any]] = []
+        try:
+            targets = await self.top_targets()
+            # 出发地地理编码供城际距离估算使用，与目的地一起批量预热（Redis MGET，只回源缺失项）
+            addresses = list(dict.fromkeys(
+                [t.destination for t in targets] + [d for t in targets for d in t.departures]
+            ))
+            if addresses:
+                await self.data_collector.unified_map_service.batch_geocode(addresses)
+
+            with cache_warming(refresh_lead, before_fetch=pacer.wait):
+                for target in targets:
+                    try:
+                        summaries.append(await self._warm_target(target))
+                    except Exception as e:
+                        logger.warning(f"预热 {target.destination} 失败: {e}")
+        finally:
+            await release_lock(_RUN_LOCK_KEY, token)
+
+        report = {
+            "status": "success",
+            "targets": len(summaries),
+            "upstream_fetches": pacer.fetches,
+            "refresh_lead": round(refresh_lead, 1),
+            "duration": round(time.perf_counter() - started, 2),
+            "finished_at": datetime.utcnow().isoformat(),
+        }
+        try:
+            client = await get_redis()
+            await client.set(_LAST_RUN_KEY, json.dumps(report, ensure_ascii=False), ex=86400)
+        except Exception as e:
+            logger.debug(f"记录预热结果失败: {e}")
+        logger.info(
+            f"缓存预热完成: {report['targets']} 个目的地，回源 {sum(pacer.fetches.values())} 次，"
+            f"耗时 {report['duration']}s"
+        )
+        return report
+
+    async def status(self) -> Dict[str, Any]:
+        """预热目标、上一轮结果与预热命中率"""
+        last_run = None
+        try:
+            client = await get_redis()
+            raw = await client.get(_LAST_RUN_KEY)
+            last_run = json.loads(raw) if raw else None
+        except Exception as e:
+            logger.debug(f"读取预热结果失败: {e}")
+        lookup_stats = await get_cache_lookup_stats()
+        return {
+            "enabled": settings.CACHE_WARMER_ENABLED,
+            "pinned": await self.get_pinned(),
+            "targets": [t.to_dict() for t in await self.top_targets()],
+            "last_run": last_run,
+            "lookup_stats": {k: v for k, v in lookup_stats.items() if k in _WARM_SECTIONS},
+        }
+
+
+cache_warmer = CacheWarmer()
@@ -0,0 +1,213 @@
+"""
+数据收集调度器
+按收集任务之间的真实依赖关系调度（例如酒店/景点/餐厅依赖目的地地理编码），
+无依赖的任务立即并发启动，上游限流交给 app.core.concurrency 的按提供商并发控制
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+@dataclass
+class CollectorSpec:
+    """单个收集任务的描述"""
+
+    key: str
+    # 接收依赖任务结果字典（key -> result），返回收集结果
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+    # 失败时使用的默认值工厂
+    default_factory: Callable[[], Any] = list
+    # 是否作为数据分段对外输出（例如地理编码只作为中间依赖）
+    publish: bool = True
+
+
+@dataclass
+class CollectorTiming:
+    """单个收集任务的耗时统计（秒，相对于调度开始时间）"""
+
+    key: str
+    status: str = "pending"  # ok / failed
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    waited: float = 0.0  # 等待依赖的时间
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return max(self.finished_at - self.started_at, 0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "status": self.status,
+            "started_at": round(self.started_at, 3),
+            "duration": round(self.duration, 3),
+            "waited": round(self.waited, 3),
+            "error": self.error,
+        }
+
+
+ResultCallback = Callable[[str, Any], Awaitable[None]]
+
+
+class CollectionScheduler:
+    """依赖感知的并发收集调度器"""
+
+    def __init__(self, specs: List[CollectorSpec]):
+        self.specs: Dict[str, CollectorSpec] = {}
+        for spec in specs:
+            if spec.key in self.specs:
+                raise ValueError(f"重复的收集任务: {spec.key}")
+            self.specs[spec.key] = spec
+        self._validate()
+        self.timings: Dict[str, CollectorTiming] = {}
+
+    def _validate(self):
+        """校验依赖存在且无环"""
+        for spec in self.specs.values():
+            for dep in spec.depends_on:
+                if dep not in self.specs:
+                    raise ValueError(f"收集任务 {spec.key} 依赖未知任务: {dep}")
+
+        visiting, visited = set(), set()
+
+        def visit(key: str):
+            if key in visited:
+                return
+            if key in visiting:
+                raise ValueError(f"收集任务存在循环依赖: {key}")
+            visiting.add(key)
+            for dep in self.specs[key].depends_on:
+                visit(dep)
+            visiting.discard(key)
+            visited.add(key)
+
+        for key in self.specs:
+            visit(key)
+
+    async def run(self, on_result: Optional[ResultCallback] = None) -> Dict[str, Any]:
+        """执行全部收集任务
+
+        Args:
+            on_result: 每个对外输出的分段完成后调用（按完成顺序串行调用），用于增量保存预览
+
+        Returns:
+            对外输出分段的结果字典（失败的分段使用默认值）
+        """
+        origin = time.perf_counter()
+        futures: Dict[str, asyncio.Future] = {
+            key: asyncio.get_running_loop().create_future() for key in self.specs
+        }
+        self.timings = {key: CollectorTiming(key=key) for key in self.specs}
+
+        async def run_one(spec: CollectorSpec) -> Tuple[str, Any]:
+            timing = self.timings[spec.key]
+            wait_start = time.perf_counter()
+            deps: Dict[str, Any] = {}
+            for dep in spec.depends_on:
+                deps[dep] = await asyncio.shield(futures[dep])
+            timing.waited = time.perf_counter() - wait_start
+            timing.started_at = time.perf_counter() - origin
+            try:
+                result = await spec.run(deps)
+                timing.status = "ok"
+            except Exception as e:
+                logger.warning(f"{spec.key} 数据收集失败: {e}")
+                result = spec.default_factory()
+                timing.status = "failed"
+                timing.error = str(e)
+            timing.finished_at = time.perf_counter() - origin
+            # 依赖方拿到的是原始结果（失败时为默认值），由收集器自行处理缺失的依赖
+            if not futures[spec.key].done():
+                futures[spec.key].set_result(result)
+            return spec.key, result
+
+        tasks = [asyncio.create_task(run_one(spec)) for spec in self.specs.values()]
+        results: Dict[str, Any] = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                key, result = await next_done
+                spec = self.specs[key]
+                if not spec.publish:
+                    continue
+                results[key] = result
+                if on_result is not None:
+                    try:
+                        await on_result(key, result)
+                    except Exception as e:
+                        logger.warning(f"处理收集结果回调失败（{key}）: {e}")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        self._log_timings(time.perf_counter() - origin)
+        return results
+
+    def _log_timings(self, total: float):
+        parts = []
+        for timing in sorted(self.timings.values(), key=lambda t: t.started_at):
+            part = f"{timing.key}={timing.duration:.2f}s"
+            if timing.waited >= 0.01:
+                part += f"(等待依赖{timing.waited:.2f}s)"
+            if timing.status != "ok":
+                part += f"[{timing.status}]"
+            parts.append(part)
+        logger.info(f"数据收集完成，总耗时 {total:.2f}s: {', '.join(parts)}")
+
+    def timings_summary(self) -> List[Dict[str, Any]]:
+        """按启动顺序返回各收集任务的耗时统计"""
+        return [t.to_dict() for t in sorted(self.timings.values(), key=lambda t: t.started_at)]
+
+
+class SectionFeed:
+    """数据分段的异步交付（收集阶段 -> 方案生成阶段的流式衔接）
+
+    每个分段收集并清洗完成后立即解析对应的 future，下游的 LLM 模块只等待自己用到的分段，
+    端到端耗时由最长的依赖路径决定，而不是所有收集任务之和。
+    """
+
+    def __init__(self, sections: List[str]):
+        loop = asyncio.get_running_loop()
+        self._futures: Dict[str, asyncio.Future] = {key: loop.create_future() for key in sections}
+
+    @property
+    def sections(self) -> List[str]:
+        return list(self._futures)
+
+    def publish(self, key: str, raw: Any, processed: Any):
+        """交付一个分段（原始数据, 清洗后数据），重复交付忽略"""
+        future = self._futures.get(key)
+        if future is not None and not future.done():
+            future.set_result((raw, processed))
+
+    def close(self, defaults: Optional[Dict[str, Any]] = None):
+        """收集结束时以默认值交付所有未交付的分段，避免下游永久等待"""
+        defaults = defaults or {}
+        for key, future in self._futures.items():
+            if not future.done():
+                value = defaults.get(key, [])
+                future.set_result((value, value))
+
+    async def wait(self, keys: Tuple[str, ...]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """等待指定分段就绪
+
+        Returns:
+            (清洗后数据, 原始数据)，均只包含所请求的分段
+        """
+        processed: Dict[str, Any] = {}
+        raw: Dict[str, Any] = {}
+        for key in keys:
+            if key not in self._futures:
+                continue
+            raw[key], processed[key] = await asyncio.shield(self._futures[key])
+        return processed, raw
+
+    async def wait_all(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """等待全部分段就绪"""
+        return await self.wait(tuple(self._futures))
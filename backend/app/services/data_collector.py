@@ -5,7 +5,7 @@
 
 import asyncio
 from typing import List, Dict, Any, Optional
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from loguru import logger
 import httpx
 
@@ -14,6 +14,9 @@ from app.tools.mcp_client import MCPClient
 from app.tools.amap_mcp_client import AmapMCPClient
 from app.tools.city_resolver import CityResolver
 from app.tools.unified_map_service import UnifiedMapService
+from app.services.intercity_distance import intercity_distance_engine
+from app.services.destination_canonicalizer import destination_canonicalizer, is_spelling_variant
+from app.tools.geocode_context import geocode_scope, normalize_address
 from app.tools.baidu_maps_integration import (
     map_directions, 
     map_search_places, 
@@ -22,7 +25,10 @@ from app.tools.baidu_maps_integration import (
 )
 # from app.services.web_scraper import WebScraper  # 已移除爬虫功能
 from app.services.xhs_api_client import XHSAPIClient
-from app.core.redis import get_cache, set_cache, cache_key
+from app.core.redis import get_cache, set_cache, get_cache_many, set_cache_many, cache_key
+from app.core.cache_aside import cached_fetch, is_cache_warming
+from app.core.concurrency import run_limited, merge_as_completed
+from app.services.collection_scheduler import CollectorSpec, CollectionScheduler
 
 
 class DataCollector:
@@ -55,6 +61,40 @@ class DataCollector:
         )
 
         # asyncio.run(self.collect_xiaohongshu_data("杭州西湖"))
+
+    @staticmethod
+    def _trip_days(start_date: Optional[datetime], end_date: Optional[datetime]) -> int:
+        """行程天数（日期缺失或无效时按 1 天）"""
+        if isinstance(start_date, datetime) and isinstance(end_date, datetime):
+            days = (end_date.date() - start_date.date()).days + 1
+            if days > 0:
+                return days
+        return 1
+
+    @staticmethod
+    def _poi_pool_key(section: str, canonical: str) -> str:
+        """与出行日期无关的 POI 候选池缓存键（按规范目的地标识）"""
+        return cache_key(section, "pool", canonical)
+
+    async def canonical_destination(self, destination: str) -> str:
+        """目的地的规范城市标识（"杭州市"、"杭州西湖"、"Hangzhou" -> "杭州"），用于缓存键与候选池回源"""
+        return await destination_canonicalizer.canonicalize(destination, geocode=self.unified_map_service.geocode)
+
+    async def _pool_source(
+        self,
+        destination: str,
+        geocode_info: Optional[Dict[str, Any]],
+    ) -> tuple[str, Optional[Dict[str, Any]]]:
+        """候选池的回源标识与地理编码
+
+        目的地只是规范城市的另一种写法时（"杭州市"、"Hangzhou"）按规范标识回源，调用方传入的地理编码只在与
+        规范标识一致时复用，保证同一缓存键的内容与写法无关；景区、县城等远离所属城市中心的目的地
+        （千岛湖、阳朔）仍以目的地本身作为缓存键与搜索中心，避免取到市中心的 POI。
+        """
+        canonical = await self.canonical_destination(destination)
+        if is_spelling_variant(destination, canonical):
+            return canonical, (geocode_info if canonical == str(destination).strip() else None)
+        return normalize_address(destination), geocode_info
     
     @staticmethod
     def _parse_price_value(value: Any) -> Optional[float]:
@@ -123,7 +163,9 @@ class DataCollector:
     ) -> List[Dict[str, Any]]:
         """收集航班数据 - 使用 Amadeus API"""
         try:
-            cache_key_str = cache_key("flights", f"{departure}-{destination}", start_date.date(), end_date.date())
+            departure_id = await self.canonical_destination(departure)
+            destination_id = await self.canonical_destination(destination)
+            cache_key_str = cache_key("flights", f"{departure_id}-{destination_id}", start_date.date(), end_date.date())
             
             # 检查缓存
             cached_data = await get_cache(cache_key_str)
@@ -134,12 +176,12 @@ class DataCollector:
             logger.info(f"开始收集航班数据: {departure} -> {destination}, 出发日期: {start_date.date()}")
             
             # 使用 Amadeus API 收集航班信息
-            flight_data = await self.mcp_client.get_flights(
+            flight_data = await run_limited("mcp", self.mcp_client.get_flights(
                 origin=departure,
                 destination=destination,
                 departure_date=start_date.date(),
                 return_date=end_date.date()
-            )
+            ))
             
             # 验证和处理航班数据
             if flight_data:
@@ -192,36 +234,100 @@ class DataCollector:
         destination: str,
         start_date: datetime,
         end_date: datetime,
+        geocode_info: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """收集酒店数据
 
-        注意：这里不会依赖“精确坐标范围”来调整数量，而是基于行程天数，按配置估算
-        需要多少候选酒店，并在原始结果上做一个简单裁剪，避免数据过多或过少。
+        分两层缓存：地图周边搜索得到的酒店 POI 与出行日期无关，按目的地缓存为候选池；
+        入住/离店日期以及按日期查询的 MCP 酒店报价作为薄的日期层叠加在候选池之上，
+        不同日期规划同一目的地的请求共享候选池。
+        geocode_info 由调度器传入的目的地地理编码结果，未传入时自行查询。
         """
         try:
-            cache_key_str = cache_key("hotels", destination, start_date.date(), end_date.date())
-            
-            # 检查缓存
-            cached_data = await get_cache(cache_key_str)
-            if cached_data:
-                logger.info(f"使用缓存的酒店数据: {destination}")
-                return cached_data
-            
+            canonical, pool_geocode = await self._pool_source(destination, geocode_info)
+            pool = await cached_fetch(
+                self._poi_pool_key("hotels", canonical),
+                lambda: self._fetch_hotel_pool(canonical, pool_geocode),
+                ttl=settings.POI_POOL_CACHE_TTL,
+            )
+            return await self._apply_hotel_dates(canonical, pool or [], start_date, end_date)
+        except Exception as e:
+            logger.error(f"收集酒店数据失败: {e}")
+            return []
+
+    async def _apply_hotel_dates(
+        self,
+        canonical: str,
+        pool: List[Dict[str, Any]],
+        start_date: datetime,
+        end_date: datetime,
+    ) -> List[Dict[str, Any]]:
+        """日期层：写入入住/离店日期，候选不足时补充按日期查询的 MCP 酒店报价，并按配置裁剪"""
+        # 理论上多天行程也不需要太多酒店候选，按配置取一个上限
+        desired_hotel_count = max(self.plan_max_hotels_per_trip, 1)
+        check_in = start_date.strftime("%Y-%m-%d")
+        check_out = end_date.strftime("%Y-%m-%d")
+        hotel_data = [{**hotel, "check_in": check_in, "check_out": check_out} for hotel in pool]
+
+        # 如果数据不足，使用MCP工具补充（报价与日期相关，单独按日期缓存）
+        if len(hotel_data) < desired_hotel_count:
+            offers = await cached_fetch(
+                cache_key("hotels", "offers", canonical, start_date.date(), end_date.date()),
+                lambda: self._fetch_hotel_offers(canonical, start_date, end_date),
+                ttl=settings.HOTEL_OFFER_CACHE_TTL,
+            )
+            hotel_data.extend(offers or [])
+
+        # 最终对酒店列表做一次软裁剪，避免过多
+        if len(hotel_data) > desired_hotel_count:
+            logger.info(
+                f"根据配置裁剪酒店数量: 原始 {len(hotel_data)} 条，"
+                f"保留前 {desired_hotel_count} 条（可通过 PLAN_MAX_HOTELS_PER_TRIP 调整）"
+            )
+            hotel_data = hotel_data[:desired_hotel_count]
+
+        logger.info(f"收集到 {len(hotel_data)} 条酒店数据")
+        return hotel_data
+
+    async def _fetch_hotel_offers(
+        self,
+        destination: str,
+        start_date: datetime,
+        end_date: datetime,
+    ) -> List[Dict[str, Any]]:
+        """回源查询按日期的 MCP 酒店报价（由 _apply_hotel_dates 通过 cached_fetch 调用）"""
+        try:
+            mcp_data = await run_limited("mcp", self.mcp_client.get_hotels(
+                destination=destination,
+                check_in=start_date.date(),
+                check_out=end_date.date()
+            ))
+            logger.info(f"从MCP服务补充 {len(mcp_data)} 条酒店数据")
+        except Exception as e:
+            logger.warning(f"MCP酒店服务调用失败: {e}")
+            return []
+
+        # 批量补全缺少坐标的酒店（MCP 数据通常没有坐标）
+        try:
+            await self.unified_map_service.fill_missing_coordinates(mcp_data, destination)
+        except Exception as e:
+            logger.warning(f"批量补全酒店坐标失败: {e}")
+        return mcp_data
+
+    async def _fetch_hotel_pool(
+        self,
+        destination: str,
+        geocode_info: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """回源收集酒店候选池（与日期无关，由 collect_hotel_data 通过 cached_fetch 调用）"""
+        try:
             hotel_data: List[Dict[str, Any]] = []
 
-            # 根据行程天数和配置，估算期望的酒店候选数量
-            try:
-                days = (end_date.date() - start_date.date()).days + 1
-            except Exception:
-                days = 1
-            days = max(days, 1)
-            # 理论上多天行程也不需要太多酒店候选，按配置取一个上限
-            desired_hotel_count = max(self.plan_max_hotels_per_trip, 1)
-            
             # 使用统一地图服务获取酒店信息（支持多提供商回退）
             try:
                 # 使用统一的地理编码函数获取目的地坐标
-                geocode_info = await self.get_destination_geocode_info(destination)
+                if not geocode_info:
+                    geocode_info = await self.get_destination_geocode_info(destination)
                 if geocode_info:
                     location = geocode_info['location_string']
                     
@@ -245,8 +351,6 @@ class DataCollector:
                             "currency": "CNY",
                             "amenities": self._parse_hotel_amenities(hotel),
                             "room_types": ["标准间", "大床房"],
-                            "check_in": start_date.strftime("%Y-%m-%d"),
-                            "check_out": end_date.strftime("%Y-%m-%d"),
                             "images": [],
                             "coordinates": hotel.get("coordinates", {}),
                             "star_rating": self._estimate_star_rating(hotel),
@@ -263,31 +367,6 @@ class DataCollector:
             except Exception as e:
                 logger.warning(f"统一地图服务酒店搜索失败: {e}")
             
-            # 如果数据不足，使用MCP工具补充
-            if len(hotel_data) < desired_hotel_count:
-                try:
-                    mcp_data = await self.mcp_client.get_hotels(
-                        destination=destination,
-                        check_in=start_date.date(),
-                        check_out=end_date.date()
-                    )
-                    hotel_data.extend(mcp_data)
-                    logger.info(f"从MCP服务补充 {len(mcp_data)} 条酒店数据")
-                except Exception as e:
-                    logger.warning(f"MCP酒店服务调用失败: {e}")
-
-            # 最终对酒店列表做一次软裁剪，避免过多
-            if len(hotel_data) > desired_hotel_count:
-                logger.info(
-                    f"根据行程天数裁剪酒店数量: 原始 {len(hotel_data)} 条，"
-                    f"保留前 {desired_hotel_count} 条（可通过 PLAN_MAX_HOTELS_PER_TRIP 调整）"
-                )
-                hotel_data = hotel_data[:desired_hotel_count]
-            
-            # 缓存数据
-            await set_cache(cache_key_str, hotel_data, ttl=300)  # 5分钟缓存
-            
-            logger.info(f"收集到 {len(hotel_data)} 条酒店数据")
             return hotel_data
             
         except Exception as e:
@@ -366,124 +445,85 @@ class DataCollector:
         destination: str,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
+        geocode_info: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """收集景点数据
 
-        这里根据行程天数和配置，估算需要的“最少景点数量”，再结合地图/MCP结果做软裁剪或补充。
+        景点 POI 与出行日期无关，按目的地缓存一份足够 POI_POOL_DAYS 天行程的候选池，
+        再根据本次行程天数估算的“最少景点数量”从候选池中裁剪（日期层只做裁剪，不回源）。
         注意：暂时不做精确的“按坐标半径动态缩放”，以免受目的地定位误差影响。
+        geocode_info 由调度器传入的目的地地理编码结果，未传入时自行查询。
         """
         try:
-            cache_key_str = cache_key(
-                "attractions",
-                destination,
-                (start_date.date() if isinstance(start_date, datetime) else None),
-                (end_date.date() if isinstance(end_date, datetime) else None),
+            canonical, pool_geocode = await self._pool_source(destination, geocode_info)
+            pool = await cached_fetch(
+                self._poi_pool_key("attractions", canonical),
+                lambda: self._fetch_attraction_pool(canonical, pool_geocode),
+                ttl=settings.POI_POOL_CACHE_TTL,
             )
-            
-            # 检查缓存
-            cached_data = await get_cache(cache_key_str)
-            if cached_data:
-                logger.info(f"使用缓存的景点数据: {destination}")
-                return cached_data
-            
-            attraction_data: List[Dict[str, Any]] = []
+            days = self._trip_days(start_date, end_date)
+            # 上限取"理论最少需求"的 2 倍，避免 LLM 提示太长
+            max_attractions = max(self.plan_min_attractions_per_day * days, 1) * 2
+            attraction_data = (pool or [])[:max_attractions]
+            logger.info(
+                f"收集到 {len(attraction_data)} 条景点数据（行程天数 {days} 天，候选池 {len(pool or [])} 条）"
+            )
+            return attraction_data
+        except Exception as e:
+            logger.error(f"收集景点数据失败: {e}")
+            return []
 
-            # 估算行程天数，用于决定“期望最少景点数量”
-            days = None
-            if start_date and end_date:
-                try:
-                    days = (end_date.date() - start_date.date()).days + 1
-                    if days <= 0:
-                        days = None
-                except Exception:
-                    days = None
-            if days is None:
-                days = 1
-            days = max(days, 1)
+    async def _fetch_attraction_pool(
+        self,
+        destination: str,
+        geocode_info: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """回源收集景点候选池（与日期无关，由 collect_attraction_data 通过 cached_fetch 调用）"""
+        try:
+            attraction_data: List[Dict[str, Any]] = []
 
+            # 候选池按 POI_POOL_DAYS 天行程估算“期望最少景点数量”，较短的行程从中裁剪
+            days = max(settings.POI_POOL_DAYS, 1)
             desired_min_attractions = max(self.plan_min_attractions_per_day * days, 1)
             
-            # 使用统一地图服务收集景点数据（支持多提供商回退）
+            # 周边搜索（景点、博物馆）并发进行，按返回先后合并去重，数据达到软裁剪上限时提前结束；
+            # 两项周边搜索结束后仍不足时才调用 MCP 补充（按次计费）
+            geocode_task = asyncio.ensure_future(self._resolve_geocode(destination, geocode_info))
             try:
-                logger.info(f"使用统一地图服务收集景点数据: {destination}")
-                
-                # 先获取目的地坐标
-                geocode_info = await self.get_destination_geocode_info(destination)
-                if geocode_info:
-                    center_location = geocode_info['location_string']
-                    
-                    # 使用统一地图服务进行周边搜索
-                    # 搜索景点
-                    places = await self.unified_map_service.search_places_around(
-                        location=center_location,
-                        keywords="景点",
-                        types="110000",  # 风景名胜
-                        radius=20000,    # 20公里半径
-                        count=20
-                    )
-                    
-                    for place in places:
-                        attraction_item = {
-                            "name": place.get("name", "景点"),
-                            "category": place.get("category", "风景名胜"),
-                            "description": place.get("description", "热门景点"),
-                            "price": "免费",  # 默认值，实际应从place数据中提取
-                            "rating": place.get("rating", 4.5),
-                            "address": place.get("address", ""),
-                            "coordinates": place.get("coordinates", {}),
-                            "opening_hours": "全天开放",
-                            "source": place.get("source", "地图API")
-                        }
-                        attraction_data.append(attraction_item)
-                    
-                    # 搜索博物馆
-                    museums = await self.unified_map_service.search_places_around(
-                        location=center_location,
-                        keywords="博物馆",
-                        types="140700",  # 科教文化服务
-                        radius=20000,
-                        count=10
-                    )
-                    
-                    for museum in museums:
-                        attraction_item = {
-                            "name": museum.get("name", "博物馆"),
-                            "category": "博物馆",
-                            "description": museum.get("description", "文化景点"),
-                            "price": "免费",
-                            "rating": museum.get("rating", 4.3),
-                            "address": museum.get("address", ""),
-                            "coordinates": museum.get("coordinates", {}),
-                            "opening_hours": "09:00-17:00",
-                            "source": museum.get("source", "地图API")
-                        }
-                        attraction_data.append(attraction_item)
-                    
-                    logger.info(f"从统一地图服务获取到 {len(attraction_data)} 条景点数据")
-                else:
-                    logger.warning(f"无法获取 {destination} 的坐标，跳过周边搜索")
-                
-            except Exception as e:
-                logger.warning(f"统一地图服务景点搜索失败: {e}")
-            
-            # 如果数据不足，使用MCP工具补充
-            if len(attraction_data) < desired_min_attractions:
-                try:
-                    mcp_data = await self.mcp_client.get_attractions(destination)
-                    attraction_data.extend(mcp_data)
-                    logger.info(f"从MCP服务补充 {len(mcp_data)} 条景点数据")
-                except Exception as e:
-                    logger.warning(f"MCP景点服务调用失败: {e}")
+                attraction_data = await merge_as_completed(
+                    {
+                        "景点周边搜索": self._search_attractions_around(
+                            destination, geocode_task,
+                            keywords="景点", types="110000", count=20,  # 风景名胜
+                            defaults={"category": "风景名胜", "description": "热门景点", "rating": 4.5},
+                            overrides={"opening_hours": "全天开放"},
+                        ),
+                        "博物馆周边搜索": self._search_attractions_around(
+                            destination, geocode_task,
+                            keywords="博物馆", types="140700", count=10,  # 科教文化服务
+                            defaults={"description": "文化景点", "rating": 4.3},
+                            overrides={"category": "博物馆", "opening_hours": "09:00-17:00"},
+                        ),
+                    },
+                    key=self._attraction_key,
+                    supplements={"MCP景点": lambda: self._fetch_mcp_attractions(destination)},
+                    minimum=desired_min_attractions,
+                    limit=desired_min_attractions * 2,
+                )
+            finally:
+                if not geocode_task.done():
+                    geocode_task.cancel()
+            if geocode_task.done() and not geocode_task.cancelled() and not geocode_task.exception():
+                geocode_info = geocode_task.result()
             
             # 已移除爬虫功能，只使用百度地图和MCP数据
             
-            # 根据行程天数对景点列表做一次软裁剪，避免数据过多或过少
+            # 对候选池做一次软裁剪，避免数据过多
             if len(attraction_data) > desired_min_attractions * 2:
-                # 上限取"理论最少需求"的 2 倍，避免 LLM 提示太长
                 new_len = desired_min_attractions * 2
                 logger.info(
-                    f"根据行程天数裁剪景点数量: 原始 {len(attraction_data)} 条，"
-                    f"保留前 {new_len} 条（可通过 PLAN_MIN_ATTRACTIONS_PER_DAY 调整基数）"
+                    f"裁剪景点候选池: 原始 {len(attraction_data)} 条，"
+                    f"保留前 {new_len} 条（可通过 PLAN_MIN_ATTRACTIONS_PER_DAY / POI_POOL_DAYS 调整）"
                 )
                 attraction_data = attraction_data[:new_len]
 
@@ -505,7 +545,8 @@ class DataCollector:
                             db=db,
                             attractions=attraction_data,
                             destination=destination,
-                            city=city
+                            city=city,
+                            map_service=self.unified_map_service
                         )
                         logger.info("✅ 已为景点数据补充手动维护的详细信息")
                     except Exception as e:
@@ -514,11 +555,8 @@ class DataCollector:
                 # 如果没有数据库连接或服务不可用，继续使用原始数据
                 logger.debug(f"无法补充景点详细信息（数据库不可用）: {e}")
 
-            # 缓存数据
-            await set_cache(cache_key_str, attraction_data, ttl=300)  # 5分钟缓存
-
             logger.info(
-                f"收集到 {len(attraction_data)} 条景点数据（行程天数 {days} 天，"
+                f"收集到 {len(attraction_data)} 条景点候选数据（按 {days} 天估算，"
                 f"期望最少 {desired_min_attractions} 条）"
             )
             return attraction_data
@@ -527,22 +565,133 @@ class DataCollector:
             logger.error(f"收集景点数据失败: {e}")
             return []
     
+    @staticmethod
+    def _attraction_key(item: Dict[str, Any]) -> str:
+        """景点去重键：同一目的地内景点名称基本唯一（周边搜索“景点”与“博物馆”常返回同一场馆）"""
+        return "".join(str(item.get("name") or "").split())
+
+    @staticmethod
+    def _restaurant_key(item: Dict[str, Any]) -> tuple:
+        """餐厅去重键：连锁店同名不同址，按名称 + 地址区分"""
+        return (
+            "".join(str(item.get("name") or "").split()),
+            "".join(str(item.get("address") or "").split()),
+        )
+
+    async def _resolve_geocode(
+        self,
+        destination: str,
+        geocode_info: Optional[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """供多个并发子查询共享的目的地地理编码（已传入时直接返回）"""
+        if geocode_info:
+            return geocode_info
+        return await self.get_destination_geocode_info(destination)
+
+    async def _search_attractions_around(
+        self,
+        destination: str,
+        geocode_task: "asyncio.Future",
+        keywords: str,
+        types: str,
+        count: int,
+        defaults: Dict[str, Any],
+        overrides: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """以目的地为中心的景点类周边搜索（20 公里半径）；defaults 为地点缺少字段时的默认值，overrides 为固定值"""
+        geocode_info = await asyncio.shield(geocode_task)
+        if not geocode_info:
+            logger.warning(f"无法获取 {destination} 的坐标，跳过{keywords}周边搜索")
+            return []
+        places = await self.unified_map_service.search_places_around(
+            location=geocode_info['location_string'],
+            keywords=keywords,
+            types=types,
+            radius=20000,
+            count=count
+        )
+        items = []
+        for place in places:
+            item = {
+                "name": place.get("name", keywords),
+                "category": place.get("category", defaults.get("category")),
+                "description": place.get("description", defaults.get("description")),
+                "price": "免费",  # 默认值，实际应从place数据中提取
+                "rating": place.get("rating", defaults.get("rating")),
+                "address": place.get("address", ""),
+                "coordinates": place.get("coordinates", {}),
+                "source": place.get("source", "地图API")
+            }
+            item.update(overrides)
+            items.append(item)
+        logger.info(f"从统一地图服务获取到 {len(items)} 条{keywords}数据")
+        return items
+
+    async def _fetch_mcp_attractions(self, destination: str) -> List[Dict[str, Any]]:
+        mcp_data = await run_limited("mcp", self.mcp_client.get_attractions(destination))
+        logger.info(f"从MCP服务获取到 {len(mcp_data)} 条景点数据")
+        return mcp_data
+
     async def collect_weather_data(
         self, 
         destination: str, 
         start_date: datetime, 
         end_date: datetime
     ) -> Dict[str, Any]:
-        """收集天气数据"""
+        """收集天气数据
+
+        天气按城市按预报日缓存（weather:{城市}:{日期}，另有一份实况/建议的 meta），
+        行程重叠的请求复用同一天的条目；行程内（预报范围内）任一天缺失时，
+        才通过 cached_fetch 回源整段城市预报并拆分写回。缓存预热时总是经过 cached_fetch，
+        由其按剩余有效期提前刷新整段预报，并重写按天条目。
+        """
+        try:
+            city_key = await self.canonical_destination(destination)
+            today = datetime.now().date()
+            horizon_end = today + timedelta(days=max(settings.WEATHER_FORECAST_DAYS, 1) - 1)
+            trip_days = [
+                (start_date.date() + timedelta(days=offset)).isoformat()
+                for offset in range((end_date.date() - start_date.date()).days + 1)
+                if today <= start_date.date() + timedelta(days=offset) <= horizon_end
+            ]
+            meta_key = cache_key("weather", city_key, "meta")
+            day_keys = [cache_key("weather", city_key, day) for day in trip_days]
+
+            # 预热时不走按天条目的捷径：按天条目比整段预报活得久，否则整段预报过期前不会被预热刷新
+            if day_keys and not is_cache_warming():
+                cached = await get_cache_many([meta_key, *day_keys])
+                if len(cached) == len(day_keys) + 1:
+                    return {**cached[meta_key], "forecast": [cached[key] for key in day_keys]}
+
+            forecast = await cached_fetch(
+                cache_key("weather", city_key),
+                lambda: self._fetch_weather_data(city_key, today, horizon_end),
+                ttl=settings.WEATHER_FORECAST_CACHE_TTL,
+            )
+            if not forecast:
+                return {}
+            meta = {key: value for key, value in forecast.items() if key != "forecast"}
+            casts = {item.get("date"): item for item in forecast.get("forecast", []) if item.get("date")}
+            entries = {cache_key("weather", city_key, day): item for day, item in casts.items()}
+            entries[meta_key] = meta
+            await set_cache_many(entries, ttl=settings.WEATHER_DAY_CACHE_TTL)
+
+            if not trip_days:
+                # 行程不在预报范围内，返回城市当前的整段预报供参考
+                return forecast
+            return {**meta, "forecast": [casts[day] for day in trip_days if day in casts]}
+        except Exception as e:
+            logger.error(f"收集天气数据失败: {e}")
+            return {}
+
+    async def _fetch_weather_data(
+        self, 
+        destination: str, 
+        start_date: date, 
+        end_date: date
+    ) -> Dict[str, Any]:
+        """回源收集城市整段天气预报（不经过缓存，由 collect_weather_data 通过 cached_fetch 调用）"""
         try:
-            cache_key_str = cache_key("weather", destination, start_date.date(), end_date.date())
-            
-            # 检查缓存
-            cached_data = await get_cache(cache_key_str)
-            if cached_data:
-                logger.info(f"使用缓存的天气数据: {destination}")
-                return cached_data
-            
             weather_data = {}
             
             # 根据环境变量配置选择天气数据源
@@ -552,10 +701,10 @@ class DataCollector:
             if weather_source == "amap":
                 # 使用高德地图天气API
                 try:
-                    weather_data = await self.amap_client.get_weather(
+                    weather_data = await run_limited("amap", self.amap_client.get_weather(
                         city=destination,
                         extensions="all"  # 获取预报天气
-                    )
+                    ))
                     if weather_data:
                         logger.info(f"从高德地图获取到天气数据: {destination}")
                     else:
@@ -574,11 +723,11 @@ class DataCollector:
             elif weather_source == "openweather":
                 # 使用OpenWeather API (通过MCP客户端)
                 try:
-                    weather_data = await self.mcp_client.get_weather(
+                    weather_data = await run_limited("mcp", self.mcp_client.get_weather(
                         destination=destination,
-                        start_date=start_date.date(),
-                        end_date=end_date.date()
-                    )
+                        start_date=start_date,
+                        end_date=end_date
+                    ))
                     if weather_data:
                         logger.info(f"从OpenWeather获取到天气数据: {destination}")
                     else:
@@ -590,10 +739,10 @@ class DataCollector:
             if not weather_data and weather_source != "amap":
                 try:
                     logger.info(f"主要天气数据源失败，尝试高德地图备用数据源: {destination}")
-                    weather_data = await self.amap_client.get_weather(
+                    weather_data = await run_limited("amap", self.amap_client.get_weather(
                         city=destination,
                         extensions="all"
-                    )
+                    ))
                     if weather_data:
                         logger.info(f"从高德地图备用数据源获取到天气数据: {destination}")
                 except Exception as e:
@@ -604,9 +753,6 @@ class DataCollector:
                 logger.warning(f"无法获取 {destination} 的天气数据")
                 weather_data = {}
             
-            # 缓存数据
-            await set_cache(cache_key_str, weather_data, ttl=300)  # 5分钟缓存
-            
             logger.info(f"收集到天气数据: {destination}")
             return weather_data
             
@@ -619,189 +765,84 @@ class DataCollector:
         destination: str,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
+        geocode_info: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """收集餐厅数据
 
-        同样根据行程天数估算需要的餐厅数量：大致「天数 × 每天用餐次数」，并据此控制
-        百度/高德/MCP 返回的数量，避免行程很长但餐厅数据太少或太多。
+        餐厅 POI 与出行日期无关，按目的地缓存一份足够 POI_POOL_DAYS 天行程的候选池；
+        再按本次行程估算的数量（大致「天数 × 每天用餐次数」）从候选池中裁剪，
+        避免行程很长但餐厅数据太少或太多。
+        geocode_info 由调度器传入的目的地地理编码结果，未传入时自行查询。
         """
         try:
-            cache_key_str = cache_key(
-                "restaurants",
-                destination,
-                (start_date.date() if isinstance(start_date, datetime) else None),
-                (end_date.date() if isinstance(end_date, datetime) else None),
+            canonical, pool_geocode = await self._pool_source(destination, geocode_info)
+            pool = await cached_fetch(
+                self._poi_pool_key("restaurants", canonical),
+                lambda: self._fetch_restaurant_pool(canonical, pool_geocode),
+                ttl=settings.POI_POOL_CACHE_TTL,
             )
-            
-            # 检查缓存
-            cached_data = await get_cache(cache_key_str)
-            if cached_data:
-                logger.info(f"使用缓存的餐厅数据: {destination}")
-                return cached_data
-            
-            restaurant_data: List[Dict[str, Any]] = []
+            days = self._trip_days(start_date, end_date)
+            max_restaurants = max(self.plan_min_meals_per_day * days, 3) * 2
+            restaurant_data = (pool or [])[:max_restaurants]
+            logger.info(
+                f"收集到 {len(restaurant_data)} 条餐厅数据（行程天数 {days} 天，候选池 {len(pool or [])} 条）"
+            )
+            return restaurant_data
+        except Exception as e:
+            logger.error(f"收集餐厅数据失败: {e}")
+            return []
 
-            # 根据行程天数估算需要的餐厅数量（粗略：天数 × 每天用餐次数）
-            days = None
-            if start_date and end_date:
-                try:
-                    days = (end_date.date() - start_date.date()).days + 1
-                    if days <= 0:
-                        days = None
-                except Exception:
-                    days = None
-            if days is None:
-                days = 1
-            days = max(days, 1)
+    async def _fetch_restaurant_pool(
+        self,
+        destination: str,
+        geocode_info: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """回源收集餐厅候选池（与日期无关，由 collect_restaurant_data 通过 cached_fetch 调用）"""
+        try:
+            restaurant_data: List[Dict[str, Any]] = []
 
+            # 候选池按 POI_POOL_DAYS 天行程估算需要的餐厅数量（粗略：天数 × 每天用餐次数）
+            days = max(settings.POI_POOL_DAYS, 1)
             desired_min_restaurants = max(self.plan_min_meals_per_day * days, 3)
             
-            # 根据配置选择餐厅数据源
+            # 根据配置选择餐厅数据源；各子查询并发进行，按返回先后合并去重，数据达到软裁剪上限时提前结束；
+            # 地图数据在所有子查询结束后仍不足时才调用 MCP 补充
             restaurant_source = settings.RESTAURANT_DATA_SOURCE
-            
+            sources = {}
             if restaurant_source in ["baidu", "both"]:
-                # 使用内置百度地图功能
-                try:
-                    logger.info(f"使用内置百度地图功能收集餐厅数据: {destination}")
-                    
-                    # 搜索餐厅
-                    restaurants_result = await map_search_places(
-                        query="餐厅",
-                        region=destination,
-                        tag="美食",
-                        is_china="true"
-                    )
-                    
-                    if restaurants_result.get("status") == 0:
-                        restaurants = restaurants_result.get("result", {}).get("items", [])
-                        for restaurant in restaurants:  # 不提前裁剪
-                            restaurant_item = {
-                                "name": restaurant.get("name", "餐厅"),
-                                "cuisine": restaurant.get("detail_info", {}).get("tag", "中餐"),
-                                "rating": restaurant.get("detail_info", {}).get("overall_rating", "4.2"),
-                                "address": restaurant.get("address", ""),
-                                "coordinates": {
-                                    "lat": restaurant.get("location", {}).get("lat"),
-                                    "lng": restaurant.get("location", {}).get("lng")
-                                },
-                                "opening_hours": restaurant.get("detail_info", {}).get("open_time", "10:00-22:00"),
-                                "specialties": restaurant.get("detail_info", {}).get("tag", "").split(",") if restaurant.get("detail_info", {}).get("tag") else ["特色菜"],
-                                "source": "百度地图API"
-                            }
-                            restaurant_data.append(self._apply_price_metadata(
-                                restaurant_item,
-                                restaurant.get("detail_info", {}).get("price")
-                            ))
-                    
-                    # 搜索特色小吃
-                    snack_result = await map_search_places(
-                        query="小吃",
-                        region=destination,
-                        tag="美食",
-                        is_china="true"
-                    )
-                    
-                    if snack_result.get("status") == 0:
-                        snacks = snack_result.get("result", {}).get("items", [])
-                        for snack in snacks:  # 不提前裁剪
-                            restaurant_item = {
-                                "name": snack.get("name", "小吃店"),
-                                "cuisine": "小吃",
-                                "rating": snack.get("detail_info", {}).get("overall_rating", "4.0"),
-                                "address": snack.get("address", ""),
-                                "coordinates": {
-                                    "lat": snack.get("location", {}).get("lat"),
-                                    "lng": snack.get("location", {}).get("lng")
-                                },
-                                "opening_hours": snack.get("detail_info", {}).get("open_time", "08:00-20:00"),
-                                "specialties": ["特色小吃"],
-                                "source": "百度地图API"
-                            }
-                            restaurant_data.append(self._apply_price_metadata(restaurant_item))
-                    
-                    logger.info(f"从百度地图API获取到 {len(restaurant_data)} 条餐厅数据")
-                    
-                except Exception as e:
-                    logger.warning(f"百度地图餐厅API调用失败: {e}")
-            
+                logger.info(f"使用内置百度地图功能收集餐厅数据: {destination}")
+                sources["百度餐厅搜索"] = self._search_baidu_restaurants(destination)
+                sources["百度小吃搜索"] = self._search_baidu_snacks(destination)
             if restaurant_source in ["amap", "both"]:
-                # 使用统一地图服务周边搜索（支持多提供商回退）
-                try:
-                    logger.info(f"使用统一地图服务收集餐厅数据: {destination}")
-                    
-                    # 使用统一的地理编码函数获取中心点坐标
-                    geocode_info = await self.get_destination_geocode_info(destination)
-                    
-                    center_location = None
-                    if geocode_info:
-                        # 使用统一格式的坐标字符串
-                        center_location = geocode_info['location_string']
-                    
-                    if center_location:
-                        # 使用统一地图服务周边搜索获取餐厅数据
-                        restaurants = await self.unified_map_service.search_places_around(
-                            location=center_location,
-                            keywords="餐厅",
-                            types="050000",  # 餐饮服务
-                            radius=10000,    # 10公里半径
-                            count=20
-                        )
-                        
-                        for restaurant in restaurants:
-                            restaurant_item = {
-                                "name": restaurant.get("name", "餐厅"),
-                                "cuisine": restaurant.get("category", "中餐"),
-                                "rating": restaurant.get("rating", 4.0),
-                                "cost": "",  # 统一格式中可能没有cost字段
-                                "address": restaurant.get("address", ""),
-                                "coordinates": restaurant.get("coordinates", {}),
-                                "location": restaurant.get("location", ""),
-                                "phone": restaurant.get("phone", ""),
-                                "business_area": "",
-                                "cityname": "",
-                                "adname": "",
-                                "opening_hours": "10:00-22:00",
-                                "specialties": [],
-                                "photos": [],
-                                "typecode": "",
-                                "distance": restaurant.get("distance", ""),
-                                "source": restaurant.get("source", "地图API")
-                            }
-                            restaurant_data.append(self._apply_price_metadata(restaurant_item))
-                        
-                        logger.info(f"从统一地图服务获取到 {len(restaurants)} 条餐厅数据")
-                    else:
-                        logger.warning(f"无法获取 {destination} 的坐标，跳过餐厅搜索")
-                    
-                except Exception as e:
-                    logger.warning(f"统一地图服务餐厅搜索失败: {e}")
-            
-            # 如果数据仍然不足，使用MCP工具补充
-            if len(restaurant_data) < desired_min_restaurants:
-                try:
-                    mcp_data = await self.mcp_client.get_restaurants(destination)
-                    for item in mcp_data:
-                        restaurant_data.append(self._apply_price_metadata(item))
-                    logger.info(f"从MCP服务补充 {len(mcp_data)} 条餐厅数据")
-                except Exception as e:
-                    logger.warning(f"MCP餐厅服务调用失败: {e}")
+                logger.info(f"使用统一地图服务收集餐厅数据: {destination}")
+                sources["餐厅周边搜索"] = self._search_restaurants_around(destination, geocode_info)
+            restaurant_data = await merge_as_completed(
+                sources,
+                key=self._restaurant_key,
+                supplements={"MCP餐厅": lambda: self._fetch_mcp_restaurants(destination)},
+                minimum=desired_min_restaurants,
+                limit=desired_min_restaurants * 2,
+            )
             
             # 已移除爬虫功能，只使用百度地图和MCP数据
             
-            # 根据行程天数对餐厅列表做一次软裁剪，避免过多
+            # 对候选池做一次软裁剪，避免过多
             max_restaurants = desired_min_restaurants * 2
             if len(restaurant_data) > max_restaurants:
                 logger.info(
-                    f"根据行程天数裁剪餐厅数量: 原始 {len(restaurant_data)} 条，"
-                    f"保留前 {max_restaurants} 条（可通过 PLAN_MIN_MEALS_PER_DAY 调整基数）"
+                    f"裁剪餐厅候选池: 原始 {len(restaurant_data)} 条，"
+                    f"保留前 {max_restaurants} 条（可通过 PLAN_MIN_MEALS_PER_DAY / POI_POOL_DAYS 调整）"
                 )
                 restaurant_data = restaurant_data[:max_restaurants]
 
-            # 缓存数据
-            await set_cache(cache_key_str, restaurant_data, ttl=300)  # 5分钟缓存
+            # 批量补全缺少坐标的餐厅（MCP 数据通常没有坐标）
+            try:
+                await self.unified_map_service.fill_missing_coordinates(restaurant_data, destination)
+            except Exception as e:
+                logger.warning(f"批量补全餐厅坐标失败: {e}")
 
             logger.info(
-                f"收集到 {len(restaurant_data)} 条餐厅数据（行程天数 {days} 天，"
+                f"收集到 {len(restaurant_data)} 条餐厅候选数据（按 {days} 天估算，"
                 f"期望最少 {desired_min_restaurants} 条）"
             )
             return restaurant_data
@@ -810,12 +851,123 @@ class DataCollector:
             logger.error(f"收集餐厅数据失败: {e}")
             return []
     
+    async def _search_baidu_restaurants(self, destination: str) -> List[Dict[str, Any]]:
+        """百度地图搜索餐厅"""
+        restaurants_result = await run_limited("baidu", map_search_places(
+            query="餐厅",
+            region=destination,
+            tag="美食",
+            is_china="true"
+        ))
+        items = []
+        if restaurants_result.get("status") == 0:
+            restaurants = restaurants_result.get("result", {}).get("items", [])
+            for restaurant in restaurants:  # 不提前裁剪
+                restaurant_item = {
+                    "name": restaurant.get("name", "餐厅"),
+                    "cuisine": restaurant.get("detail_info", {}).get("tag", "中餐"),
+                    "rating": restaurant.get("detail_info", {}).get("overall_rating", "4.2"),
+                    "address": restaurant.get("address", ""),
+                    "coordinates": {
+                        "lat": restaurant.get("location", {}).get("lat"),
+                        "lng": restaurant.get("location", {}).get("lng")
+                    },
+                    "opening_hours": restaurant.get("detail_info", {}).get("open_time", "10:00-22:00"),
+                    "specialties": restaurant.get("detail_info", {}).get("tag", "").split(",") if restaurant.get("detail_info", {}).get("tag") else ["特色菜"],
+                    "source": "百度地图API"
+                }
+                items.append(self._apply_price_metadata(
+                    restaurant_item,
+                    restaurant.get("detail_info", {}).get("price")
+                ))
+        logger.info(f"从百度地图API获取到 {len(items)} 条餐厅数据")
+        return items
+
+    async def _search_baidu_snacks(self, destination: str) -> List[Dict[str, Any]]:
+        """百度地图搜索特色小吃"""
+        snack_result = await run_limited("baidu", map_search_places(
+            query="小吃",
+            region=destination,
+            tag="美食",
+            is_china="true"
+        ))
+        items = []
+        if snack_result.get("status") == 0:
+            snacks = snack_result.get("result", {}).get("items", [])
+            for snack in snacks:  # 不提前裁剪
+                restaurant_item = {
+                    "name": snack.get("name", "小吃店"),
+                    "cuisine": "小吃",
+                    "rating": snack.get("detail_info", {}).get("overall_rating", "4.0"),
+                    "address": snack.get("address", ""),
+                    "coordinates": {
+                        "lat": snack.get("location", {}).get("lat"),
+                        "lng": snack.get("location", {}).get("lng")
+                    },
+                    "opening_hours": snack.get("detail_info", {}).get("open_time", "08:00-20:00"),
+                    "specialties": ["特色小吃"],
+                    "source": "百度地图API"
+                }
+                items.append(self._apply_price_metadata(restaurant_item))
+        logger.info(f"从百度地图API获取到 {len(items)} 条小吃数据")
+        return items
+
+    async def _search_restaurants_around(
+        self,
+        destination: str,
+        geocode_info: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """统一地图服务周边搜索餐厅（支持多提供商回退，10 公里半径）"""
+        # 使用统一的地理编码函数获取中心点坐标
+        geocode_info = await self._resolve_geocode(destination, geocode_info)
+        if not geocode_info:
+            logger.warning(f"无法获取 {destination} 的坐标，跳过餐厅搜索")
+            return []
+        restaurants = await self.unified_map_service.search_places_around(
+            location=geocode_info['location_string'],
+            keywords="餐厅",
+            types="050000",  # 餐饮服务
+            radius=10000,    # 10公里半径
+            count=20
+        )
+        items = []
+        for restaurant in restaurants:
+            restaurant_item = {
+                "name": restaurant.get("name", "餐厅"),
+                "cuisine": restaurant.get("category", "中餐"),
+                "rating": restaurant.get("rating", 4.0),
+                "cost": "",  # 统一格式中可能没有cost字段
+                "address": restaurant.get("address", ""),
+                "coordinates": restaurant.get("coordinates", {}),
+                "location": restaurant.get("location", ""),
+                "phone": restaurant.get("phone", ""),
+                "business_area": "",
+                "cityname": "",
+                "adname": "",
+                "opening_hours": "10:00-22:00",
+                "specialties": [],
+                "photos": [],
+                "typecode": "",
+                "distance": restaurant.get("distance", ""),
+                "source": restaurant.get("source", "地图API")
+            }
+            items.append(self._apply_price_metadata(restaurant_item))
+        logger.info(f"从统一地图服务获取到 {len(items)} 条餐厅数据")
+        return items
+
+    async def _fetch_mcp_restaurants(self, destination: str) -> List[Dict[str, Any]]:
+        mcp_data = await run_limited("mcp", self.mcp_client.get_restaurants(destination))
+        logger.info(f"从MCP服务获取到 {len(mcp_data)} 条餐厅数据")
+        return [self._apply_price_metadata(item) for item in mcp_data]
+
     async def collect_transportation_data(self, departure: str, destination: str, transportation_mode: Optional[str] = None) -> List[Dict[str, Any]]:
         """收集交通数据"""
         try:
             # 为不同出行方式生成不同的缓存键
             mode_key = transportation_mode if transportation_mode else "mixed"
-            cache_key_str = cache_key("transportation", f"{departure}-{destination}-{mode_key}")
+            departure_id = await self.canonical_destination(departure)
+            destination_id = await self.canonical_destination(destination)
+            cache_key_str = cache_key("transportation", f"{departure_id}-{destination_id}-{mode_key}")
             
             # 检查缓存
             cached_data = await get_cache(cache_key_str)
@@ -866,7 +1018,7 @@ class DataCollector:
             # 如果高德地图数据不足，使用MCP工具补充
             if len(transport_data) < 5 and self.map_provider != "amap":
                 try:
-                    mcp_data = await self.mcp_client.get_transportation(departure, destination)
+                    mcp_data = await run_limited("mcp", self.mcp_client.get_transportation(departure, destination))
                     transport_data.extend(mcp_data)
                     logger.info(f"从MCP服务补充 {len(mcp_data)} 条交通数据")
                 except Exception as e:
@@ -899,6 +1051,71 @@ class DataCollector:
         return f"{total_cost:.1f}元"
     
     
+    def build_collection_specs(
+        self,
+        departure: Optional[str],
+        destination: str,
+        start_date: datetime,
+        end_date: datetime,
+        transportation_mode: Optional[str] = None
+    ) -> List[CollectorSpec]:
+        """构建数据收集任务及其依赖关系
+
+        - 酒店/景点/餐厅依赖目的地地理编码，地理编码完成后立即并发启动
+        - 天气、小红书无依赖，调度开始即启动
+        - 航班与交通依赖出发地，缺少出发地时不调度
+        """
+        specs = [
+            CollectorSpec(
+                key="geocode",
+                run=lambda deps: self.get_destination_geocode_info(destination),
+                default_factory=lambda: None,
+                publish=False,
+            ),
+            CollectorSpec(
+                key="hotels",
+                run=lambda deps: self.collect_hotel_data(
+                    destination, start_date, end_date, geocode_info=deps.get("geocode")
+                ),
+                depends_on=("geocode",),
+            ),
+            CollectorSpec(
+                key="attractions",
+                run=lambda deps: self.collect_attraction_data(
+                    destination, start_date, end_date, geocode_info=deps.get("geocode")
+                ),
+                depends_on=("geocode",),
+            ),
+            CollectorSpec(
+                key="weather",
+                run=lambda deps: self.collect_weather_data(destination, start_date, end_date),
+                default_factory=dict,
+            ),
+            CollectorSpec(
+                key="restaurants",
+                run=lambda deps: self.collect_restaurant_data(
+                    destination, start_date, end_date, geocode_info=deps.get("geocode")
+                ),
+                depends_on=("geocode",),
+            ),
+            CollectorSpec(
+                key="xiaohongshu_notes",
+                run=lambda deps: self.collect_xiaohongshu_data(destination, start_date, end_date),
+            ),
+        ]
+        if departure:
+            specs.append(CollectorSpec(
+                key="flights",
+                run=lambda deps: self.collect_flight_data(departure, destination, start_date, end_date),
+            ))
+            specs.append(CollectorSpec(
+                key="transportation",
+                run=lambda deps: self.collect_transportation_data(departure, destination, transportation_mode),
+            ))
+        else:
+            logger.info("未提供出发地，跳过航班与交通数据收集以提升速度")
+        return specs
+
     async def collect_all_data(
         self, 
         departure: str,
@@ -907,73 +1124,33 @@ class DataCollector:
         end_date: datetime,
         transportation_mode: Optional[str] = None
     ) -> Dict[str, Any]:
-        """收集所有类型的数据"""
-        logger.info(f"开始顺序收集 {destination} 的所有数据")
-        data = {}
-
-        interval_seconds = 1
-
-        # 并发启动小红书数据收集任务（不受 MCP 并发限制）
-        xhs_task = asyncio.create_task(self.collect_xiaohongshu_data(destination, start_date, end_date))
-
-        try:
-            data["flights"] = await self.collect_flight_data(departure, destination, start_date, end_date)
-        except Exception as e:
-            logger.exception("航班数据失败")
-            data["flights"] = []
-        await asyncio.sleep(interval_seconds)
-
-        try:
-            data["hotels"] = await self.collect_hotel_data(destination, start_date, end_date)
-        except Exception:
-            data["hotels"] = []
-        await asyncio.sleep(interval_seconds)
-
-        try:
-            data["attractions"] = await self.collect_attraction_data(destination)
-        except Exception:
-            data["attractions"] = []
-        await asyncio.sleep(interval_seconds)
-
-        try:
-            data["weather"] = await self.collect_weather_data(destination, start_date, end_date)
-        except Exception:
-            data["weather"] = {}
-        await asyncio.sleep(interval_seconds)
-
-        try:
-            data["restaurants"] = await self.collect_restaurant_data(destination)
-        except Exception:
-            data["restaurants"] = []
-        await asyncio.sleep(interval_seconds)
-
-        try:
-            data["transportation"] = await self.collect_transportation_data(departure, destination, transportation_mode)
-        except Exception:
-            data["transportation"] = []
-        await asyncio.sleep(interval_seconds)
-
-        # 等待小红书并发任务完成
-        try:
-            data["xiaohongshu_notes"] = await xhs_task
-        except Exception as e:
-            logger.exception(f"小红书数据收集失败: {e}")
-            data["xiaohongshu_notes"] = []
-
-        return data
+        """收集所有类型的数据（按依赖关系并发调度，上游并发由提供商限流控制）"""
+        logger.info(f"开始并发收集 {destination} 的所有数据")
+        scheduler = CollectionScheduler(
+            self.build_collection_specs(departure, destination, start_date, end_date, transportation_mode)
+        )
+        with geocode_scope():
+            data = await scheduler.run()
+        return {
+            "flights": data.get("flights", []),
+            "hotels": data.get("hotels", []),
+            "attractions": data.get("attractions", []),
+            "weather": data.get("weather", {}),
+            "restaurants": data.get("restaurants", []),
+            "transportation": data.get("transportation", []),
+            "xiaohongshu_notes": data.get("xiaohongshu_notes", [])
+        }
     
     async def _collect_driving_data(self, departure: str, destination: str, transport_data: List[Dict[str, Any]]):
         """收集自驾交通数据"""
         try:
             # 使用内置百度地图功能
-            from app.tools.baidu_maps_integration import map_directions
-            
-            directions_result = await map_directions(
+            directions_result = await run_limited("baidu", map_directions(
                 origin=departure,
                 destination=destination,
                 model="driving",
                 is_china="true"
-            )
+            ))
             
             # 解析百度地图返回结果
             if directions_result and directions_result.get("status") == 0:
@@ -1023,12 +1200,12 @@ class DataCollector:
             from app.tools.baidu_maps_integration import map_search_places
             
             airport_query = f"{destination}机场"
-            places_result = await map_search_places(
+            places_result = await run_limited("baidu", map_search_places(
                 query=airport_query,
                 region=destination,
                 tag="交通设施服务",
                 is_china="true"
-            )
+            ))
             
             # 解析百度地图返回结果
             if places_result and places_result.get("status") == 0:
@@ -1062,12 +1239,12 @@ class DataCollector:
             from app.tools.baidu_maps_integration import map_search_places
             
             station_query = f"{destination}火车站"
-            places_result = await map_search_places(
+            places_result = await run_limited("baidu", map_search_places(
                 query=station_query,
                 region=destination,
                 tag="交通设施服务",
                 is_china="true"
-            )
+            ))
             
             # 解析百度地图返回结果
             if places_result and places_result.get("status") == 0:
@@ -1101,12 +1278,12 @@ class DataCollector:
             from app.tools.baidu_maps_integration import map_search_places
             
             bus_station_query = f"{destination}汽车站"
-            places_result = await map_search_places(
+            places_result = await run_limited("baidu", map_search_places(
                 query=bus_station_query,
                 region=destination,
                 tag="交通设施服务",
                 is_china="true"
-            )
+            ))
             
             # 解析百度地图返回结果
             if places_result and places_result.get("status") == 0:
@@ -1147,14 +1324,12 @@ class DataCollector:
             await asyncio.gather(*tasks, return_exceptions=True)
             
             # 添加公共交通信息
-            from app.tools.baidu_maps_integration import map_directions
-            
-            directions_result = await map_directions(
+            directions_result = await run_limited("baidu", map_directions(
                 origin=departure,
                 destination=destination,
                 model="transit",
                 is_china="true"
-            )
+            ))
             
             # 解析百度地图返回结果
             if directions_result and directions_result.get("status") == 0:
@@ -1182,16 +1357,52 @@ class DataCollector:
             logger.warning(f"收集混合交通数据失败: {e}")
     
     async def _calculate_intercity_distance(self, departure: str, destination: str) -> tuple[int, int]:
-        """计算跨城距离和时间"""
+        """计算跨城距离和时间
+
+        优先使用离线城际距离引擎（已学习的城市对矩阵 -> 大圆距离 × 道路系数估算），不等待路线接口；
+        估算结果由后台调用地图接口得到的真实驾车距离校正并写入矩阵。离线引擎无结果时才同步调用地图接口。
+        """
+        try:
+            estimate = await intercity_distance_engine.estimate(
+                departure,
+                destination,
+                geocode=self.unified_map_service.geocode,
+            )
+            if estimate:
+                distance_km, duration_minutes, source = estimate
+                if source != "matrix":
+                    intercity_distance_engine.refine_in_background(
+                        departure,
+                        destination,
+                        lambda: self._fetch_intercity_distance(departure, destination),
+                    )
+                logger.info(f"离线估算{departure}到{destination}的距离({source}): {distance_km}公里, 时间: {duration_minutes}分钟")
+                return distance_km, duration_minutes
+            
+            answer = await self._fetch_intercity_distance(departure, destination)
+            if answer:
+                await intercity_distance_engine.record(departure, destination, *answer)
+                return answer[0], answer[1]
+            
+            # 默认估算：0公里，0小时
+            logger.warning(f"无法获取{departure}到{destination}的准确距离，使用默认值0公里")
+            return 0, 0
+            
+        except Exception as e:
+            logger.warning(f"计算跨城距离失败: {e}，使用默认值")
+            return 0, 0
+
+    async def _fetch_intercity_distance(self, departure: str, destination: str) -> Optional[tuple[int, int, str]]:
+        """调用地图路线接口获取跨城驾车距离（公里）、时长（分钟）和数据来源"""
         try:
             # 根据环境变量选择地图API
             if self.map_provider == "amap":
                 # 使用高德地图API获取实际距离
-                amap_routes = await self.amap_client.get_directions(
+                amap_routes = await run_limited("amap", self.amap_client.get_directions(
                     origin=departure,
                     destination=destination,
                     mode="driving"
-                )
+                ))
                 
                 if amap_routes and len(amap_routes) > 0:
                     route = amap_routes[0]  # 取第一条路线
@@ -1200,17 +1411,15 @@ class DataCollector:
                     
                     if distance_km > 0 and duration_minutes > 0:
                         logger.info(f"从高德地图获取到{departure}到{destination}的实际距离: {distance_km}公里, 时间: {duration_minutes}分钟")
-                        return int(distance_km), int(duration_minutes)
+                        return int(distance_km), int(duration_minutes), "amap"
             else:
                 # 使用百度地图API获取实际距离
-                from app.tools.baidu_maps_integration import map_directions
-                
-                directions_result = await map_directions(
+                directions_result = await run_limited("baidu", map_directions(
                     origin=departure,
                     destination=destination,
                     model="driving",
                     is_china="true"
-                )
+                ))
                 
                 if directions_result and directions_result.get("status") == 0:
                     routes = directions_result.get("result", {}).get("routes", [])
@@ -1219,34 +1428,14 @@ class DataCollector:
                         distance_meters = route.get("distance", 0)
                         duration_seconds = route.get("duration", 0)
                         
-                        distance_km = distance_meters // 1000 if distance_meters > 0 else 500  # 默认500公里
-                        duration_minutes = duration_seconds // 60 if duration_seconds > 0 else distance_km * 1.2  # 默认每公里1.2分钟
-                        
-                        logger.info(f"从百度地图获取到{departure}到{destination}的实际距离: {distance_km}公里, 时间: {duration_minutes}分钟")
-                        return int(distance_km), int(duration_minutes)
-            
-            # 如果API调用失败，使用城市间距离估算
-            city_distances = {
-                ("西安", "杭州"): (1200, 720),  # 1200公里, 12小时
-                ("北京", "上海"): (1200, 720),
-                ("广州", "深圳"): (120, 120),
-                ("成都", "重庆"): (300, 180),
-                ("武汉", "长沙"): (350, 210),
-            }
-            
-            # 尝试匹配城市对
-            for (dep, dest), (dist, dur) in city_distances.items():
-                if (dep in departure and dest in destination) or (dest in departure and dep in destination):
-                    logger.info(f"使用预设距离: {departure}到{destination} = {dist}公里")
-                    return dist, dur
-            
-            # 默认估算：0公里，0小时
-            logger.warning(f"无法获取{departure}到{destination}的准确距离，使用默认值0公里")
-            return 0, 0
-            
+                        if distance_meters > 0 and duration_seconds > 0:
+                            distance_km = distance_meters // 1000
+                            duration_minutes = duration_seconds // 60
+                            logger.info(f"从百度地图获取到{departure}到{destination}的实际距离: {distance_km}公里, 时间: {duration_minutes}分钟")
+                            return int(distance_km), int(duration_minutes), "baidu"
         except Exception as e:
-            logger.warning(f"计算跨城距离失败: {e}，使用默认值")
-            return 0, 0
+            logger.warning(f"地图接口获取跨城距离失败: {e}")
+        return None
 
     async def _add_intercity_alternatives(self, departure: str, destination: str, transport_data: List[Dict[str, Any]]):
         """为跨城路线添加替代交通方案"""
@@ -1342,11 +1531,11 @@ class DataCollector:
                 mode = "transit"  # 默认使用公共交通
             
             # 获取路线规划数据
-            amap_routes = await self.amap_client.get_directions(
+            amap_routes = await run_limited("amap", self.amap_client.get_directions(
                 origin=departure,
                 destination=destination,
                 mode=mode
-            )
+            ))
             
             if amap_routes:
                 transport_data.extend(amap_routes)
@@ -1409,7 +1598,7 @@ class DataCollector:
                 logger.info(f"🔍 开始收集小红书数据: {destination}，检索内容：{destination}旅游攻略（默认数量: {limit}条）")
             
             # 使用小红书API客户端搜索笔记
-            response = await self.xhs_client.search_notes(f"{destination}旅游攻略", limit=limit)
+            response = await run_limited("xhs", self.xhs_client.search_notes(f"{destination}旅游攻略", limit=limit))
             
             if not response or response.get("status") != "success":
                 logger.error(f"❌ 小红书API调用失败: {response}")
@@ -0,0 +1,235 @@
+"""
+目的地规范化
+把用户输入的自由格式目的地（"杭州"、"杭州市"、"杭州西湖"、"Hangzhou"）映射为规范城市标识（"杭州"），
+数据收集缓存键、景点详情匹配与目的地聚合统一使用该标识，不同写法的请求可以共享缓存。
+解析顺序：拼音/英文别名 -> 行政区划写法 -> 地名映射（精确） -> 地理编码结果中的城市 -> 地名映射（包含），
+均失败时退回规范化后的原始输入。解析结果进程内缓存一份并写入 Redis，回退结果只在进程内缓存。
+景区、县城归到所属城市只适用于城市级数据；依赖位置的数据（周边 POI）用 is_spelling_variant 判断能否按城市共享。
+"""
+
+import re
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import cache_key, get_cache_many, set_cache_many
+from app.services.geo_knowledge_store import geo_knowledge_store
+from app.tools.city_resolver import resolve_landmark_city
+from app.tools.geocode_context import normalize_address
+
+GeocodeFunc = Callable[[str], Awaitable[Optional[Dict]]]
+
+# 常见城市的拼音/英文写法
+_ROMANIZED_CITIES: Dict[str, str] = {
+    "beijing": "北京",
+    "peking": "北京",
+    "shanghai": "上海",
+    "guangzhou": "广州",
+    "canton": "广州",
+    "shenzhen": "深圳",
+    "hangzhou": "杭州",
+    "chengdu": "成都",
+    "chongqing": "重庆",
+    "xian": "西安",
+    "nanjing": "南京",
+    "suzhou": "苏州",
+    "wuhan": "武汉",
+    "changsha": "长沙",
+    "xiamen": "厦门",
+    "qingdao": "青岛",
+    "tianjin": "天津",
+    "jinan": "济南",
+    "kunming": "昆明",
+    "lijiang": "丽江",
+    "dali": "大理",
+    "guilin": "桂林",
+    "sanya": "三亚",
+    "haikou": "海口",
+    "harbin": "哈尔滨",
+    "dalian": "大连",
+    "ningbo": "宁波",
+    "fuzhou": "福州",
+    "zhengzhou": "郑州",
+    "lhasa": "拉萨",
+    "hongkong": "香港",
+    "macau": "澳门",
+    "macao": "澳门",
+    "taipei": "台北",
+}
+
+_PROVINCE_PREFIX_RE = re.compile(r"^.{2,}?(?:省|自治区|特别行政区)")
+_CITY_RE = re.compile(r"^(.{2,}?)(?:市|地区)")
+_ROMAN_NOISE_RE = re.compile(r"[\s'’\-_.]+|city$")
+
+# 进程内缓存上限，超过后整体清空（目的地写法数量有限，正常不会触发）
+_LOCAL_CACHE_MAX = 10000
+
+
+def _strip_city_suffix(name: str) -> str:
+    """去掉省份前缀与“市/地区”后缀：浙江省杭州市西湖区 -> 杭州"""
+    name = name.strip()
+    without_province = _PROVINCE_PREFIX_RE.sub("", name)
+    if without_province:
+        name = without_province
+    match = _CITY_RE.match(name)
+    return match.group(1) if match else name
+
+
+def _city_from_geocode(payload: Optional[Dict]) -> Optional[str]:
+    """地理编码结果中的城市（直辖市的 city 字段为空时取省份）"""
+    if not payload:
+        return None
+    for field in ("city", "province"):
+        value = payload.get(field)
+        if isinstance(value, str) and value.strip():
+            return _strip_city_suffix(value)
+    return None
+
+
+def resolve_offline(destination: str) -> Tuple[Optional[str], str]:
+    """不访问外部服务的解析（别名、行政区划写法、地名精确映射）
+
+    Returns:
+        (规范标识, 来源)；无法确定时规范标识为 None
+    """
+    text = str(destination or "").strip()
+    if not text:
+        return None, "empty"
+    if text.isascii():
+        roman = _ROMAN_NOISE_RE.sub("", text.lower())
+        if roman in _ROMANIZED_CITIES:
+            return _ROMANIZED_CITIES[roman], "alias"
+        return None, "unknown"
+    landmark = resolve_landmark_city(text, allow_contains=False)
+    if landmark:
+        return landmark, "landmark"
+    stripped = _strip_city_suffix(text)
+    if stripped != text:
+        return stripped, "admin"
+    return None, "unknown"
+
+
+def is_spelling_variant(destination: str, canonical: str) -> bool:
+    """规范标识是否只是目的地本身的另一种写法（别名、城市的行政区划写法或原文）
+
+    景区、县城等通过地名映射或地理编码归到所属城市的目的地（千岛湖 -> 杭州、阳朔 -> 桂林）返回 False：
+    二者共享城市级缓存没有问题，但不能以城市中心代替目的地本身的位置。
+    """
+    text = str(destination or "").strip()
+    if not text or not canonical:
+        return False
+    if normalize_address(text) == canonical:
+        return True
+    _, source = resolve_offline(text)
+    if source == "alias":
+        return True
+    name = _PROVINCE_PREFIX_RE.sub("", text) or text
+    match = _CITY_RE.match(name)
+    if match:
+        # "浙江省杭州市" 是城市本身，"湖州市安吉县" 则是下辖的县
+        return match.end() == len(name) and match.group(1) == canonical
+    return name == canonical
+
+
+def _fallback(destination: str) -> str:
+    text = str(destination or "").strip()
+    if text.isascii():
+        return _ROMAN_NOISE_RE.sub("", text.lower()) or normalize_address(text)
+    return normalize_address(text)
+
+
+class DestinationCanonicalizer:
+    """目的地规范化（进程内缓存 + Redis）"""
+
+    def __init__(self):
+        # 规范化输入 -> (规范标识, 是否为确定结果)
+        self._local: Dict[str, Tuple[str, bool]] = {}
+
+    @staticmethod
+    def _redis_key(normalized: str) -> str:
+        return cache_key("destination:canonical", normalized)
+
+    def _remember(self, normalized: str, canonical: str, confident: bool):
+        if len(self._local) >= _LOCAL_CACHE_MAX:
+            self._local.clear()
+        self._local[normalized] = (canonical, confident)
+
+    async def _resolve(self, destination: str, geocode: Optional[GeocodeFunc]) -> Tuple[str, bool]:
+        canonical, source = resolve_offline(destination)
+        if canonical:
+            return canonical, True
+
+        # 地理编码：优先读地理知识库中已持久化的结果，再使用调用方提供的地理编码函数
+        payload = None
+        try:
+            payload, _ = await geo_knowledge_store.get_geocode(destination)
+            if not payload and geocode is not None:
+                payload = await geocode(destination)
+        except Exception as e:
+            logger.debug(f"目的地规范化地理编码失败: {destination}, 错误: {e}")
+        city = _city_from_geocode(payload)
+        if city:
+            return city, True
+
+        landmark = resolve_landmark_city(str(destination).strip())
+        if landmark:
+            return landmark, True
+        return _fallback(destination), False
+
+    async def canonicalize(self, destination: str, geocode: Optional[GeocodeFunc] = None) -> str:
+        """返回目的地的规范城市标识
+
+        Args:
+            destination: 用户输入的目的地
+            geocode: 可选的地理编码函数（如 UnifiedMapService.geocode），离线规则与地理知识库都无法确定时调用
+        """
+        normalized = normalize_address(destination)
+        if not normalized:
+            return ""
+        cached = self._local.get(normalized)
+        if cached and (cached[1] or geocode is None):
+            return cached[0]
+        if not cached:
+            stored = (await get_cache_many([self._redis_key(normalized)])).get(self._redis_key(normalized))
+            if stored:
+                self._remember(normalized, stored, True)
+                return stored
+
+        canonical, confident = await self._resolve(destination, geocode)
+        self._remember(normalized, canonical, confident)
+        if confident:
+            await set_cache_many({self._redis_key(normalized): canonical}, ttl=settings.DESTINATION_CANONICAL_TTL)
+        if canonical != normalized:
+            logger.debug(f"目的地规范化: {destination} -> {canonical}")
+        return canonical
+
+    async def canonicalize_many(self, destinations: Iterable[str]) -> Dict[str, str]:
+        """批量规范化（一次 MGET 读取已缓存的结果，其余逐个离线解析，不调用地图接口）
+
+        Returns:
+            {原始目的地: 规范标识}
+        """
+        originals = [d for d in dict.fromkeys(destinations) if normalize_address(d)]
+        result: Dict[str, str] = {}
+        pending = []
+        for destination in originals:
+            cached = self._local.get(normalize_address(destination))
+            if cached:
+                result[destination] = cached[0]
+            else:
+                pending.append(destination)
+        if pending:
+            keys = {d: self._redis_key(normalize_address(d)) for d in pending}
+            stored = await get_cache_many(list(keys.values()))
+            for destination in pending:
+                value = stored.get(keys[destination])
+                if value:
+                    self._remember(normalize_address(destination), value, True)
+                    result[destination] = value
+                else:
+                    result[destination] = await self.canonicalize(destination)
+        return result
+
+
+destination_canonicalizer = DestinationCanonicalizer()
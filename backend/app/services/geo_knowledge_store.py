@@ -0,0 +1,264 @@
+"""
+地理知识库存储
+在 Postgres 中持久化规范化后的地理编码与周边搜索结果，作为 Redis 之后、付费地图接口之前的一层。
+- 新鲜数据直接返回，零上游调用
+- 过期数据仍保留，上游失败时作为兜底返回
+- 数据库不可用时静默降级（只记录日志），不影响主流程
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import select, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.core.database import async_session
+from app.models.geo_knowledge import GeoGeocode, GeoPoi, GeoPoiSearch
+from app.tools.geocode_context import normalize_address
+
+_KNOWN_PROVIDERS = ("amap", "baidu", "tianditu")
+
+
+def _normalize_location(location: str) -> str:
+    """坐标保留4位小数（约11米），提高相近中心点的复用率"""
+    try:
+        lng, lat = [float(v) for v in str(location).split(",")[:2]]
+        return f"{lng:.4f},{lat:.4f}"
+    except (ValueError, TypeError):
+        return str(location or "").strip()
+
+
+def poi_search_key(location: str, keywords: str, types: str, radius: int, count: int) -> str:
+    """周边搜索的规范化查询键"""
+    raw = "|".join([
+        _normalize_location(location),
+        normalize_address(keywords or ""),
+        str(types or "").strip(),
+        str(int(radius)),
+        str(int(count)),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _provider_of_place(place: Dict[str, Any]) -> str:
+    """从统一格式的 POI ID（如 amap_xxx）中取提供商"""
+    prefix = str(place.get("id", "")).split("_", 1)[0]
+    return prefix if prefix in _KNOWN_PROVIDERS else "unknown"
+
+
+def _coordinates_of_place(place: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    coordinates = place.get("coordinates") or {}
+    try:
+        lat = float(coordinates.get("lat")) if coordinates.get("lat") is not None else None
+        lng = float(coordinates.get("lng")) if coordinates.get("lng") is not None else None
+        return lat, lng
+    except (TypeError, ValueError):
+        return None, None
+
+
+def _poi_key(place: Dict[str, Any], normalized_name: str, lat: Optional[float], lng: Optional[float]) -> str:
+    raw_id = str(place.get("id", "")).split("_", 1)
+    if len(raw_id) == 2 and raw_id[1]:
+        return raw_id[1][:300]
+    if lat is not None and lng is not None:
+        return f"{normalized_name}|{lng:.5f},{lat:.5f}"[:300]
+    return normalized_name[:300]
+
+
+class GeoKnowledgeStore:
+    """地理知识库（Postgres）"""
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.GEO_STORE_ENABLED)
+
+    @staticmethod
+    def _is_fresh(refreshed_at: Optional[datetime], max_age_days: int) -> bool:
+        if refreshed_at is None:
+            return False
+        return datetime.utcnow() - refreshed_at <= timedelta(days=max_age_days)
+
+    async def get_geocode(self, address: str, city: str = "") -> Tuple[Optional[Dict[str, Any]], bool]:
+        """读取地理编码
+
+        Returns:
+            (结果, 是否新鲜)；未命中时结果为 None
+        """
+        if not self.enabled():
+            return None, False
+        key = normalize_address(address, city)
+        try:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(GeoGeocode)
+                    .where(and_(GeoGeocode.normalized_key == key, GeoGeocode.is_active == True))  # noqa: E712
+                    .order_by(GeoGeocode.refreshed_at.desc())
+                    .limit(1)
+                )
+                row = result.scalar_one_or_none()
+                if row is None:
+                    return None, False
+                return row.payload, self._is_fresh(row.refreshed_at, settings.GEO_STORE_GEOCODE_MAX_AGE_DAYS)
+        except Exception as e:
+            logger.warning(f"读取地理知识库（地理编码）失败: {address}, 错误: {e}")
+            return None, False
+
+    async def save_geocode(self, address: str, city: str, payload: Dict[str, Any]):
+        """写入/刷新地理编码"""
+        if not self.enabled() or not payload:
+            return
+        now = datetime.utcnow()
+        values = {
+            "normalized_key": normalize_address(address, city),
+            "provider": payload.get("provider") or "unknown",
+            "address": str(address)[:300],
+            "city": (city or None),
+            "latitude": payload.get("latitude"),
+            "longitude": payload.get("longitude"),
+            "formatted_address": payload.get("formatted_address"),
+            "payload": payload,
+            "refreshed_at": now,
+        }
+        try:
+            async with async_session() as db:
+                stmt = pg_insert(GeoGeocode).values(**values)
+                stmt = stmt.on_conflict_do_update(
+                    constraint="uq_geo_geocodes_key_provider",
+                    set_={
+                        "latitude": stmt.excluded.latitude,
+                        "longitude": stmt.excluded.longitude,
+                        "formatted_address": stmt.excluded.formatted_address,
+                        "payload": stmt.excluded.payload,
+                        "refreshed_at": now,
+                        "updated_at": now,
+                        "is_active": True,
+                    },
+                )
+                await db.execute(stmt)
+        except Exception as e:
+            logger.warning(f"写入地理知识库（地理编码）失败: {address}, 错误: {e}")
+
+    async def get_poi_search(
+        self,
+        location: str,
+        keywords: str,
+        types: str,
+        radius: int,
+        count: int,
+    ) -> Tuple[Optional[List[Dict[str, Any]]], bool]:
+        """读取周边搜索结果集
+
+        Returns:
+            (结果列表, 是否新鲜)；未命中时结果为 None
+        """
+        if not self.enabled():
+            return None, False
+        key = poi_search_key(location, keywords, types, radius, count)
+        try:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(GeoPoiSearch)
+                    .where(and_(GeoPoiSearch.query_key == key, GeoPoiSearch.is_active == True))  # noqa: E712
+                    .order_by(GeoPoiSearch.refreshed_at.desc())
+                    .limit(1)
+                )
+                row = result.scalar_one_or_none()
+                if row is None:
+                    return None, False
+                return row.results, self._is_fresh(row.refreshed_at, settings.GEO_STORE_POI_MAX_AGE_DAYS)
+        except Exception as e:
+            logger.warning(f"读取地理知识库（周边搜索）失败: {keywords}@{location}, 错误: {e}")
+            return None, False
+
+    async def save_poi_search(
+        self,
+        location: str,
+        keywords: str,
+        types: str,
+        radius: int,
+        count: int,
+        places: List[Dict[str, Any]],
+    ):
+        """写入/刷新周边搜索结果集，并按提供商 + POI 键更新 POI 表"""
+        if not self.enabled() or not places:
+            return
+        now = datetime.utcnow()
+        provider = _provider_of_place(places[0])
+
+        poi_rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for place in places:
+            name = str(place.get("name") or "").strip()
+            if not name:
+                continue
+            normalized_name = normalize_address(name)[:200]
+            lat, lng = _coordinates_of_place(place)
+            place_provider = _provider_of_place(place)
+            poi_key = _poi_key(place, normalized_name, lat, lng)
+            # 同一语句内不能重复更新同一行，先按唯一键去重
+            poi_rows[(place_provider, poi_key)] = {
+                "provider": place_provider,
+                "poi_key": poi_key,
+                "normalized_name": normalized_name,
+                "name": name[:200],
+                "category": (str(place.get("category") or "")[:200] or None),
+                "address": place.get("address") or None,
+                "latitude": lat,
+                "longitude": lng,
+                "payload": place,
+                "refreshed_at": now,
+                "created_at": now,
+                "updated_at": now,
+                "is_active": True,
+            }
+
+        try:
+            async with async_session() as db:
+                stmt = pg_insert(GeoPoiSearch).values(
+                    query_key=poi_search_key(location, keywords, types, radius, count),
+                    provider=provider,
+                    location=_normalize_location(location)[:64],
+                    keywords=(keywords or None),
+                    types=(types or None),
+                    radius=int(radius),
+                    result_count=len(places),
+                    results=places,
+                    refreshed_at=now,
+                )
+                stmt = stmt.on_conflict_do_update(
+                    constraint="uq_geo_poi_searches_key_provider",
+                    set_={
+                        "result_count": stmt.excluded.result_count,
+                        "results": stmt.excluded.results,
+                        "refreshed_at": now,
+                        "updated_at": now,
+                        "is_active": True,
+                    },
+                )
+                await db.execute(stmt)
+
+                if poi_rows:
+                    poi_stmt = pg_insert(GeoPoi).values(list(poi_rows.values()))
+                    poi_stmt = poi_stmt.on_conflict_do_update(
+                        constraint="uq_geo_pois_provider_key",
+                        set_={
+                            "normalized_name": poi_stmt.excluded.normalized_name,
+                            "name": poi_stmt.excluded.name,
+                            "category": poi_stmt.excluded.category,
+                            "address": poi_stmt.excluded.address,
+                            "latitude": poi_stmt.excluded.latitude,
+                            "longitude": poi_stmt.excluded.longitude,
+                            "payload": poi_stmt.excluded.payload,
+                            "refreshed_at": now,
+                            "updated_at": now,
+                            "is_active": True,
+                        },
+                    )
+                    await db.execute(poi_stmt)
+        except Exception as e:
+            logger.warning(f"写入地理知识库（周边搜索）失败: {keywords}@{location}, 错误: {e}")
+
+
+geo_knowledge_store = GeoKnowledgeStore()
@@ -0,0 +1,212 @@
+"""
+离线城际距离引擎
+- 城市对矩阵：由地图接口返回的真实驾车距离/时长学习并持久化（city_pair_distances），进程内再缓存一份
+- 大圆距离估算：基于已缓存的地理编码，用 NumPy 计算球面距离并乘以道路系数，按距离段估算驾车时长
+两者都不需要调用地图路线接口，跨城替代方案可以立即得到非零估算。
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.database import async_session
+from app.models.geo_knowledge import CityPairDistance
+from app.services.geo_knowledge_store import geo_knowledge_store
+from app.tools.geocode_context import normalize_address
+
+EARTH_RADIUS_KM = 6371.0088
+
+# 道路系数（实际道路里程 / 大圆距离）与平均车速（km/h），按大圆距离分段
+_DISTANCE_BANDS = (
+    (100.0, 1.35, 65.0),
+    (500.0, 1.25, 85.0),
+    (float("inf"), 1.20, 95.0),
+)
+
+GeocodeFunc = Callable[[str], Awaitable[Optional[Dict]]]
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """球面大圆距离（公里），参数可为标量或可广播的数组"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def estimate_road_trip(great_circle_km: float) -> Tuple[int, int]:
+    """由大圆距离估算道路里程（公里）与驾车时长（分钟）"""
+    for upper, road_factor, speed_kmh in _DISTANCE_BANDS:
+        if great_circle_km < upper:
+            road_km = great_circle_km * road_factor
+            return int(round(road_km)), int(round(road_km / speed_kmh * 60))
+    return 0, 0
+
+
+def city_pair_key(city_a: str, city_b: str) -> str:
+    """城市对键（无方向）"""
+    return "|".join(sorted([normalize_address(city_a), normalize_address(city_b)]))
+
+
+class IntercityDistanceEngine:
+    """城际距离引擎"""
+
+    def __init__(self):
+        self._pairs: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._refining: Set[str] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    async def lookup_learned(self, departure: str, destination: str) -> Optional[Tuple[int, int]]:
+        """查询已学习的城市对距离（进程内缓存 -> Postgres）"""
+        key = city_pair_key(departure, destination)
+        with self._lock:
+            cached = self._pairs.get(key)
+        if cached:
+            return cached
+        try:
+            async with async_session() as db:
+                result = await db.execute(select(CityPairDistance).where(CityPairDistance.pair_key == key))
+                row = result.scalar_one_or_none()
+        except Exception as e:
+            logger.warning(f"读取城市距离矩阵失败: {departure}-{destination}, 错误: {e}")
+            return None
+        if row is None or row.distance_km <= 0:
+            return None
+        value = (int(round(row.distance_km)), int(round(row.duration_minutes)))
+        with self._lock:
+            self._pairs[key] = value
+        return value
+
+    async def record(self, departure: str, destination: str, distance_km: float, duration_minutes: float, source: str):
+        """记录地图接口返回的真实驾车距离（多次学习取滑动平均）"""
+        if distance_km <= 0 or duration_minutes <= 0:
+            return
+        key = city_pair_key(departure, destination)
+        city_a, city_b = sorted([str(departure).strip(), str(destination).strip()], key=normalize_address)
+        now = datetime.utcnow()
+        with self._lock:
+            self._pairs[key] = (int(round(distance_km)), int(round(duration_minutes)))
+        try:
+            async with async_session() as db:
+                stmt = pg_insert(CityPairDistance).values(
+                    pair_key=key,
+                    city_a=city_a[:100],
+                    city_b=city_b[:100],
+                    distance_km=float(distance_km),
+                    duration_minutes=float(duration_minutes),
+                    source=source,
+                    samples=1,
+                    refreshed_at=now,
+                )
+                table = CityPairDistance.__table__
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["pair_key"],
+                    set_={
+                        # 新样本权重 1/(n+1)，避免单次异常路线覆盖历史结果
+                        "distance_km": (table.c.distance_km * table.c.samples + stmt.excluded.distance_km) / (table.c.samples + 1),
+                        "duration_minutes": (table.c.duration_minutes * table.c.samples + stmt.excluded.duration_minutes) / (table.c.samples + 1),
+                        "samples": table.c.samples + 1,
+                        "source": stmt.excluded.source,
+                        "refreshed_at": now,
+                        "updated_at": now,
+                    },
+                )
+                await db.execute(stmt)
+        except Exception as e:
+            logger.warning(f"写入城市距离矩阵失败: {departure}-{destination}, 错误: {e}")
+
+    async def _coordinates(self, city: str, geocode: Optional[GeocodeFunc]) -> Optional[Tuple[float, float]]:
+        """城市坐标：优先取地理知识库中已缓存的地理编码（不区分新旧），否则使用调用方提供的地理编码函数"""
+        payload, _ = await geo_knowledge_store.get_geocode(city)
+        if not payload and geocode is not None:
+            try:
+                payload = await geocode(city)
+            except Exception as e:
+                logger.debug(f"城际距离估算地理编码失败: {city}, 错误: {e}")
+                payload = None
+        if not payload:
+            return None
+        try:
+            lat = float(payload.get("latitude"))
+            lng = float(payload.get("longitude"))
+        except (TypeError, ValueError):
+            return None
+        if lat == 0 and lng == 0:
+            return None
+        return lat, lng
+
+    async def estimate_great_circle(
+        self,
+        departure: str,
+        destination: str,
+        geocode: Optional[GeocodeFunc] = None,
+    ) -> Optional[Tuple[int, int]]:
+        """大圆距离 × 道路系数估算"""
+        origin, target = await asyncio.gather(
+            self._coordinates(departure, geocode),
+            self._coordinates(destination, geocode),
+        )
+        if not origin or not target:
+            return None
+        great_circle = float(haversine_km(origin[0], origin[1], target[0], target[1]))
+        if great_circle <= 0:
+            return None
+        return estimate_road_trip(great_circle)
+
+    async def estimate(
+        self,
+        departure: str,
+        destination: str,
+        geocode: Optional[GeocodeFunc] = None,
+    ) -> Optional[Tuple[int, int, str]]:
+        """离线估算城际驾车距离（公里）与时长（分钟）
+
+        Returns:
+            (距离, 时长, 来源)，来源为 matrix（已学习）或 great_circle（估算）；均不可用时返回 None
+        """
+        learned = await self.lookup_learned(departure, destination)
+        if learned:
+            return learned[0], learned[1], "matrix"
+        estimated = await self.estimate_great_circle(departure, destination, geocode)
+        if estimated:
+            return estimated[0], estimated[1], "great_circle"
+        return None
+
+    def refine_in_background(
+        self,
+        departure: str,
+        destination: str,
+        fetch: Callable[[], Awaitable[Optional[Tuple[int, int, str]]]],
+    ):
+        """后台调用地图接口获取真实距离并写入矩阵（同一城市对在进程内只刷新一次）"""
+        key = city_pair_key(departure, destination)
+        with self._lock:
+            if key in self._refining:
+                return
+            self._refining.add(key)
+
+        async def _refine():
+            try:
+                answer = await fetch()
+                if answer:
+                    await self.record(departure, destination, answer[0], answer[1], answer[2])
+            except Exception as e:
+                logger.debug(f"后台学习城际距离失败: {departure}-{destination}, 错误: {e}")
+            finally:
+                with self._lock:
+                    self._refining.discard(key)
+
+        task = asyncio.create_task(_refine())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+
+intercity_distance_engine = IntercityDistanceEngine()
@@ -0,0 +1,215 @@
+"""
+LLM 响应缓存（按内容寻址）
+方案各模块的提示词完全由目的地、日期、预算、偏好与采集数据决定，参数相同的重新生成/多用户请求可以直接复用上次的响应。
+- 缓存键：模型、系统提示词、用户提示词、temperature、max_tokens 的 SHA-256
+- Redis 为主存储，可选 Postgres 作为持久层（Redis 清空后仍可命中，并回填 Redis）
+- 各模块单独配置 TTL；生成请求可通过 bypass 标记跳过读取（仍写入新结果）
+- 命中统计按模块累计在 Redis 哈希中
+默认关闭（LLM_CACHE_ENABLED），开启后 temperature > 0 的请求也会返回相同结果。
+"""
+
+import hashlib
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.redis import get_cache, get_redis, set_cache
+from app.models.llm_cache import LLMResponseCacheEntry
+
+_KEY_PREFIX = "llm:resp"
+_STATS_KEY = "llm:cache:stats"
+STAT_OUTCOMES = ("hit", "db_hit", "miss", "bypass", "store")
+
+# 当前生成任务是否跳过缓存读取（由生成请求的 bypass_cache 决定）
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def llm_cache_bypass(enabled: bool = True):
+    """上下文内的 LLM 请求不读取缓存，新响应照常写入"""
+    token = _bypass.set(bool(enabled))
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def llm_cache_key(model: str, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> str:
+    """请求内容的 SHA-256（各字段以 JSON 数组编码，避免拼接歧义）"""
+    raw = json.dumps(
+        [model or "", system_prompt or "", user_prompt or "", round(float(temperature), 4), int(max_tokens)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _parse_module_ttls(raw: str) -> Dict[str, int]:
+    ttls: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        try:
+            ttls[name.strip().lower()] = max(int(value.strip()), 0)
+        except ValueError:
+            logger.warning(f"忽略无效的LLM缓存TTL配置项: {part}")
+    return ttls
+
+
+class LLMResponseCache:
+    """方案模块 LLM 响应缓存"""
+
+    def __init__(self):
+        self._module_ttls: Optional[Dict[str, int]] = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.LLM_CACHE_ENABLED)
+
+    @staticmethod
+    def db_enabled() -> bool:
+        return bool(settings.LLM_CACHE_DB_ENABLED)
+
+    @staticmethod
+    def bypassed() -> bool:
+        return _bypass.get()
+
+    def ttl_for(self, module: str) -> int:
+        if self._module_ttls is None:
+            self._module_ttls = _parse_module_ttls(settings.LLM_CACHE_MODULE_TTLS)
+        return self._module_ttls.get((module or "").lower(), int(settings.LLM_CACHE_TTL))
+
+    @staticmethod
+    def _redis_key(module: str, key: str) -> str:
+        return f"{_KEY_PREFIX}:{module}:{key}"
+
+    async def _record(self, module: str, outcome: str):
+        try:
+            client = await get_redis()
+            await client.hincrby(_STATS_KEY, f"{module}:{outcome}", 1)
+        except Exception as e:
+            logger.debug(f"记录LLM缓存统计失败: {module}:{outcome}, 错误: {e}")
+
+    async def get(self, module: str, key: str) -> Optional[str]:
+        """读取缓存的响应文本；未开启、被跳过或未命中时返回 None"""
+        if not self.enabled():
+            return None
+        if self.bypassed():
+            await self._record(module, "bypass")
+            return None
+        try:
+            cached = await get_cache(self._redis_key(module, key))
+        except Exception as e:
+            logger.warning(f"读取LLM响应缓存失败: {module}, 错误: {e}")
+            cached = None
+        if isinstance(cached, dict) and isinstance(cached.get("text"), str):
+            await self._record(module, "hit")
+            return cached["text"]
+        text = await self._get_from_db(module, key)
+        await self._record(module, "db_hit" if text is not None else "miss")
+        return text
+
+    async def set(self, module: str, key: str, model: str, text: str):
+        """写入响应文本（Redis 与可选的 Postgres）"""
+        ttl = self.ttl_for(module)
+        if not self.enabled() or not text or ttl <= 0:
+            return
+        try:
+            await set_cache(self._redis_key(module, key), {"text": text}, ttl=ttl)
+        except Exception as e:
+            logger.warning(f"写入LLM响应缓存失败: {module}, 错误: {e}")
+        await self._save_to_db(module, key, model, text, ttl)
+        await self._record(module, "store")
+
+    async def _get_from_db(self, module: str, key: str) -> Optional[str]:
+        if not self.db_enabled():
+            return None
+        now = datetime.utcnow()
+        try:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(LLMResponseCacheEntry)
+                    .where(LLMResponseCacheEntry.cache_key == key)
+                    .where(LLMResponseCacheEntry.module == module)
+                    .where(LLMResponseCacheEntry.expires_at > now)
+                    .where(LLMResponseCacheEntry.is_active == True)  # noqa: E712
+                    .limit(1)
+                )
+                row = result.scalar_one_or_none()
+                if row is None:
+                    return None
+                text, expires_at = row.response, row.expires_at
+        except Exception as e:
+            logger.warning(f"读取LLM响应缓存（数据库）失败: {module}, 错误: {e}")
+            return None
+        # 以剩余有效期回填 Redis
+        remaining = int((expires_at - now).total_seconds())
+        if remaining > 0:
+            try:
+                await set_cache(self._redis_key(module, key), {"text": text}, ttl=remaining)
+            except Exception as e:
+                logger.debug(f"回填LLM响应缓存失败: {module}, 错误: {e}")
+        return text
+
+    async def _save_to_db(self, module: str, key: str, model: str, text: str, ttl: int):
+        if not self.db_enabled():
+            return
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+        try:
+            async with async_session() as db:
+                stmt = pg_insert(LLMResponseCacheEntry).values(
+                    cache_key=key,
+                    module=module,
+                    model=(model or "")[:100],
+                    response=text,
+                    expires_at=expires_at,
+                )
+                stmt = stmt.on_conflict_do_update(
+                    constraint="uq_llm_response_cache_key_module",
+                    set_={
+                        "model": stmt.excluded.model,
+                        "response": stmt.excluded.response,
+                        "expires_at": expires_at,
+                        "updated_at": now,
+                        "is_active": True,
+                    },
+                )
+                await db.execute(stmt)
+        except Exception as e:
+            logger.warning(f"写入LLM响应缓存（数据库）失败: {module}, 错误: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        """各模块的命中统计与命中率"""
+        try:
+            client = await get_redis()
+            raw = await client.hgetall(_STATS_KEY)
+        except Exception as e:
+            logger.warning(f"读取LLM缓存统计失败: {e}")
+            raw = {}
+        modules: Dict[str, Dict[str, Any]] = {}
+        for field, value in (raw or {}).items():
+            field = field.decode() if isinstance(field, bytes) else field
+            module, _, outcome = field.rpartition(":")
+            if outcome in STAT_OUTCOMES:
+                modules.setdefault(module, {name: 0 for name in STAT_OUTCOMES})[outcome] = int(value)
+        for item in modules.values():
+            lookups = item["hit"] + item["db_hit"] + item["miss"]
+            item["lookups"] = lookups
+            item["hit_ratio"] = round((item["hit"] + item["db_hit"]) / lookups, 4) if lookups else None
+        return {
+            "enabled": self.enabled(),
+            "db_enabled": self.db_enabled(),
+            "modules": modules,
+        }
+
+
+llm_response_cache = LLMResponseCache()
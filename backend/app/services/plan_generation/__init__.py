@@ -7,6 +7,7 @@ from .budget_calculator import BudgetCalculator
 from .data_processor import DataProcessor
 
 from .daily import (
+    DayScope,
     generate_daily_entries,
     build_simple_attraction_plan,
     build_simple_dining_plan,
@@ -23,6 +24,7 @@ __all__ = [
     'CircuitBreaker',
     'BudgetCalculator',
     'DataProcessor',
+    'DayScope',
     'generate_daily_entries',
     'build_simple_attraction_plan',
     'build_simple_dining_plan',
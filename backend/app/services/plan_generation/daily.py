@@ -2,18 +2,89 @@
 
 from __future__ import annotations
 
+import asyncio
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import copy
+import json
 import math
 import re
 
 from loguru import logger
 
+from app.core.tokens import estimate_tokens
+
 LLMRequester = Callable[..., Awaitable[Optional[Any]]]
-PromptBuilder = Callable[[int, str, Optional[float]], Tuple[str, str, int, float]]
+PromptBuilder = Callable[[int, str, Optional[float], "DayScope"], Tuple[str, str, int, float]]
 FallbackBuilder = Callable[[int, str], Dict[str, Any]]
 DayEntryExtractor = Callable[[Any, int, str], Optional[Dict[str, Any]]]
+DayDescriber = Callable[[int, str, Optional[float]], str]
+
+# Safety factor applied to the expected output size of a multi-day chunk.
+CHUNK_OUTPUT_MARGIN = 1.3
+# Weight of the newest observation in the per-module output-size average.
+_OUTPUT_EWMA_ALPHA = 0.3
+# module_name -> moving average of output tokens per generated day
+_output_tokens_per_day: Dict[str, float] = {}
+
+
+@dataclass(frozen=True)
+class DayScope:
+    """The day, or the consecutive days of a chunk, that a prompt asks for.
+
+    Prompt builders use it for every line that differs between a single-day
+    request (one JSON object) and a chunk request (a JSON array of days).
+    """
+
+    days: Tuple[Tuple[int, str], ...]
+
+    @classmethod
+    def single(cls, day: int, date_str: str) -> "DayScope":
+        return cls(((day, date_str),))
+
+    @property
+    def is_chunk(self) -> bool:
+        return len(self.days) > 1
+
+    @property
+    def subject(self) -> str:
+        """What the system prompt plans for ("某一天" or every day of the range)."""
+        if self.is_chunk:
+            return f"连续 {len(self.days)} 天中的每一天分别"
+        return "某一天"
+
+    @property
+    def label(self) -> str:
+        """The requested day(s) with their dates."""
+        (first, first_date), (last, last_date) = self.days[0], self.days[-1]
+        if self.is_chunk:
+            return (
+                f"第 {first} 天至第 {last} 天"
+                f"（日期：{first_date or '未提供'} 至 {last_date or '未提供'}）"
+            )
+        return f"第 {first} 天（日期：{first_date or '未提供'}）"
+
+    @property
+    def day_value(self) -> str:
+        """The ``day`` field of the output example."""
+        return "该元素对应的天数" if self.is_chunk else str(self.days[0][0])
+
+    @property
+    def date_value(self) -> str:
+        """The ``date`` field of the output example."""
+        return "该元素对应的日期" if self.is_chunk else self.days[0][1]
+
+    def per_day(self, value: str) -> str:
+        """``value`` for a single day; a chunk lists per-day details separately."""
+        return "见下方逐天安排" if self.is_chunk else value
+
+    def json_intro(self, strict: bool = False) -> str:
+        """Lead-in of the output format line: one JSON object or an array of them."""
+        if not self.is_chunk:
+            return "请输出严格的JSON对象（禁止附加说明文字）" if strict else "请返回JSON对象"
+        lead = "请输出严格的JSON数组（禁止附加说明文字）" if strict else "请返回JSON数组（不要附加说明文字）"
+        return f"{lead}，按天数顺序包含 {len(self.days)} 个元素，每个元素是一个JSON对象"
 
 
 def calculate_date(start_date: Optional[Any], days_offset: int) -> str:
@@ -38,13 +109,28 @@ def calculate_date(start_date: Optional[Any], days_offset: int) -> str:
     return target.strftime("%Y-%m-%d")
 
 
+def _entry_day(entry: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(str(entry.get("day")).strip())
+    except (TypeError, ValueError):
+        return None
+
+
 def extract_day_entry(parsed: Any, day: int, date_str: str) -> Optional[Dict[str, Any]]:
-    """Normalize the structure returned by the LLM into a per-day dictionary."""
+    """Normalize the structure returned by the LLM into a per-day dictionary.
+
+    A list response yields the element for ``day``; when no element carries a
+    ``day`` field the first element is used.
+    """
     day_plan: Optional[Dict[str, Any]] = None
     if isinstance(parsed, dict):
         day_plan = parsed
     elif isinstance(parsed, list) and parsed:
-        if isinstance(parsed[0], dict):
+        entries = [item for item in parsed if isinstance(item, dict)]
+        day_plan = next((item for item in entries if _entry_day(item) == day), None)
+        if day_plan is None and isinstance(parsed[0], dict) and all(
+            _entry_day(item) is None for item in entries
+        ):
             day_plan = parsed[0]
     if not isinstance(day_plan, dict):
         return None
@@ -54,6 +140,98 @@ def extract_day_entry(parsed: Any, day: int, date_str: str) -> Optional[Dict[str
     return day_plan
 
 
+def record_output_tokens(module_name: str, entries: List[Dict[str, Any]]) -> None:
+    """Update the moving average of output tokens per day for ``module_name``."""
+    if not entries:
+        return
+    size = estimate_tokens(json.dumps(entries, ensure_ascii=False)) / len(entries)
+    previous = _output_tokens_per_day.get(module_name)
+    _output_tokens_per_day[module_name] = (
+        size if previous is None else previous + _OUTPUT_EWMA_ALPHA * (size - previous)
+    )
+
+
+def choose_chunk_size(
+    module_name: str,
+    prompt_tokens: int,
+    per_day_max_tokens: int,
+    output_budget: Optional[int],
+    max_days: int,
+    context_window: Optional[int] = None,
+) -> int:
+    """Pick how many consecutive days to request in one call.
+
+    The expected output per day is the module's observed average (or its
+    per-day ``max_tokens`` before any observation). The chunk's expected
+    output must fit in ``output_budget`` (the max_tokens cap) and, together
+    with the prompt, in ``context_window``.
+    """
+    if max_days <= 1:
+        return 1
+    per_day = _output_tokens_per_day.get(module_name) or per_day_max_tokens
+    per_day = max(per_day * CHUNK_OUTPUT_MARGIN, 1)
+    size = max_days
+    if output_budget:
+        size = min(size, int(output_budget // per_day))
+    if context_window:
+        size = min(size, int((context_window - prompt_tokens) // per_day))
+    return max(1, size)
+
+
+def split_day_entries(
+    parsed: Any,
+    days: List[Tuple[int, str]],
+    extractor: DayEntryExtractor,
+) -> Dict[int, Dict[str, Any]]:
+    """Split a multi-day response into ``{day: entry}``.
+
+    Elements are matched by their ``day`` field; when none carries one they
+    are matched by position. Days missing from the response are omitted.
+    """
+    items: List[Any]
+    if isinstance(parsed, list):
+        items = parsed
+    elif isinstance(parsed, dict) and isinstance(parsed.get("days"), list):
+        items = parsed["days"]
+    elif isinstance(parsed, dict):
+        items = [parsed]
+    else:
+        return {}
+    items = [item for item in items if isinstance(item, dict)]
+    by_day = {_entry_day(item): item for item in items if _entry_day(item) is not None}
+    if not by_day:
+        by_day = {day: item for (day, _), item in zip(days, items)}
+
+    entries: Dict[int, Dict[str, Any]] = {}
+    for day, date_str in days:
+        item = by_day.get(day)
+        if item is None:
+            continue
+        entry = extractor(item, day, date_str)
+        if entry:
+            entry["day"] = day
+            entries[day] = entry
+    return entries
+
+
+def append_day_list(
+    user_prompt: str,
+    days: List[Tuple[int, str]],
+    per_day_budget: Optional[float],
+    describe_day: Optional[DayDescriber] = None,
+) -> str:
+    """Append the per-day details of a chunk to its (chunk-mode) user prompt."""
+    lines = []
+    for day, date_str in days:
+        detail = describe_day(day, date_str, per_day_budget) if describe_day else ""
+        line = f"- 第 {day} 天（日期：{date_str or '未提供'}）"
+        lines.append(f"{line}：{detail}" if detail else line)
+    return f"""{user_prompt}
+
+【逐天安排】数组中每个元素对应以下一天，"day" 与 "date" 字段填写该天的天数与日期：
+{chr(10).join(lines)}"""
+
+
 async def generate_daily_entries(
     *,
     module_name: str,
@@ -65,15 +243,34 @@ async def generate_daily_entries(
     fallback_builder: FallbackBuilder,
     post_process: Optional[Callable[[Dict[str, Any], int, str], Dict[str, Any]]] = None,
     day_entry_extractor: Optional[DayEntryExtractor] = None,
+    concurrency: int = 1,
+    chunk_days: int = 1,
+    token_budget: Optional[int] = None,
+    context_window: Optional[int] = None,
+    describe_day: Optional[DayDescriber] = None,
 ) -> List[Dict[str, Any]]:
-    """Generate structured daily entries with graceful fallback handling."""
+    """Generate structured daily entries with graceful fallback handling.
+
+    With ``concurrency`` > 1 up to that many requests are in flight at once;
+    the result stays in day order and each day falls back independently. The
+    overall LLM load across modules is bounded by ``llm_requester`` itself.
+
+    With ``chunk_days`` > 1 consecutive days are requested together as one
+    JSON array (see ``choose_chunk_size``; ``token_budget`` is the max_tokens
+    cap of a single request); days missing from a chunk response are retried
+    one by one. ``build_prompts`` receives a ``DayScope`` and words the prompt
+    for that scope; ``describe_day`` supplies the per-day details of a chunk.
+    """
     extractor = day_entry_extractor or extract_day_entry
-    results: List[Dict[str, Any]] = []
-    for day in range(1, max(total_days, 0) + 1):
+
+    def finish(day_plan: Dict[str, Any], day: int, date_str: str) -> Dict[str, Any]:
+        return post_process(day_plan, day, date_str) if post_process else day_plan
+
+    async def generate_day(day: int) -> Dict[str, Any]:
         date_str = calculate_date(start_date, day - 1)
         try:
             system_prompt, user_prompt, max_tokens, temperature = build_prompts(
-                day, date_str, per_day_budget
+                day, date_str, per_day_budget, DayScope.single(day, date_str)
             )
             parsed = await llm_requester(
                 system_prompt,
@@ -85,14 +282,82 @@ async def generate_daily_entries(
             if parsed is not None:
                 day_plan = extractor(parsed, day, date_str)
                 if day_plan:
-                    if post_process:
-                        day_plan = post_process(day_plan, day, date_str)
-                    results.append(day_plan)
-                    continue
+                    record_output_tokens(module_name, [day_plan])
+                    return finish(day_plan, day, date_str)
             logger.warning(f"{module_name} 第{day}天LLM返回无效，启用降级方案")
         except Exception as exc:  # pragma: no cover - defensive log only
             logger.error(f"{module_name} 第{day}天生成异常: {exc}")
-        results.append(fallback_builder(day, date_str))
+        return fallback_builder(day, date_str)
+
+    async def generate_chunk(chunk: List[int]) -> List[Dict[str, Any]]:
+        if len(chunk) == 1:
+            return [await generate_day(chunk[0])]
+        days = [(day, calculate_date(start_date, day - 1)) for day in chunk]
+        label = f"{module_name} 第{chunk[0]}-{chunk[-1]}天"
+        entries: Dict[int, Dict[str, Any]] = {}
+        try:
+            system_prompt, user_prompt, max_tokens, temperature = build_prompts(
+                chunk[0], days[0][1], per_day_budget, DayScope(tuple(days))
+            )
+            user_prompt = append_day_list(user_prompt, days, per_day_budget, describe_day)
+            chunk_max_tokens = max_tokens * len(chunk)
+            if token_budget:
+                chunk_max_tokens = min(chunk_max_tokens, token_budget)
+            parsed = await llm_requester(
+                system_prompt,
+                user_prompt,
+                max_tokens=chunk_max_tokens,
+                temperature=temperature,
+                log_context=label,
+            )
+            if parsed is not None:
+                entries = split_day_entries(parsed, days, extractor)
+                record_output_tokens(module_name, list(entries.values()))
+        except Exception as exc:  # pragma: no cover - defensive log only
+            logger.error(f"{label}合并生成异常: {exc}")
+
+        missing = [day for day in chunk if day not in entries]
+        if missing:
+            logger.warning(f"{label}合并生成缺少第{missing}天，逐天重试")
+        retried = dict(zip(missing, await asyncio.gather(*(generate_day(day) for day in missing))))
+        return [
+            finish(entries[day], day, date_str) if day in entries else retried[day]
+            for day, date_str in days
+        ]
+
+    days = list(range(1, max(total_days, 0) + 1))
+    size = 1
+    if chunk_days > 1 and len(days) > 1:
+        try:
+            first_date = calculate_date(start_date, 0)
+            system_prompt, user_prompt, max_tokens, _ = build_prompts(
+                1, first_date, per_day_budget, DayScope.single(1, first_date)
+            )
+            size = choose_chunk_size(
+                module_name,
+                estimate_tokens(system_prompt + user_prompt),
+                max_tokens,
+                token_budget,
+                min(chunk_days, len(days)),
+                context_window,
+            )
+        except Exception as exc:  # pragma: no cover - defensive log only
+            logger.error(f"{module_name} 合并生成天数估算失败，逐天生成: {exc}")
+        if size > 1:
+            logger.info(f"{module_name} 每次请求合并生成 {size} 天")
+    chunks = [days[i : i + size] for i in range(0, len(days), size)]
+
+    if concurrency <= 1 or len(chunks) <= 1:
+        results = [entry for chunk in chunks for entry in await generate_chunk(chunk)]
+    else:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(chunk: List[int]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await generate_chunk(chunk)
+
+        chunk_results = await asyncio.gather(*(bounded(chunk) for chunk in chunks))
+        results = [entry for entries in chunk_results for entry in entries]
     logger.info(f"{module_name} 按天生成完成，共 {len(results)} 天")
     return results
 
@@ -12,11 +12,16 @@ import json
 import asyncio
 import time
 import traceback
-from functools import wraps
+from functools import wraps, partial
 from enum import Enum
 from app.tools.openai_client import openai_client
 from app.core.config import settings
+from app.core.plan_events import report_plan_progress
+from app.core.concurrency import run_limited
+from app.services.llm_response_cache import llm_cache_key, llm_response_cache
+from app.services.collection_scheduler import SectionFeed
 from app.services.plan_generation import (
+    DayScope,
     calculate_date,
     extract_price_value,
     generate_daily_entries,
@@ -180,9 +185,14 @@ class PlanGenerator:
         processed_data: Dict[str, Any], 
         plan: Any,
         preferences: Optional[Dict[str, Any]] = None,
-        raw_data: Optional[Dict[str, Any]] = None
+        raw_data: Optional[Dict[str, Any]] = None,
+        section_feed: Optional[SectionFeed] = None,
     ) -> List[Dict[str, Any]]:
-        """生成多个旅行方案"""
+        """生成多个旅行方案
+
+        传入 section_feed 时与数据收集流式衔接：processed_data/raw_data 可为空，
+        模块化LLM生成的各模块在所需分段就绪后立即开始，其余路径等待全部分段。
+        """
         try:
             # logger.warning(f"preferences={preferences}")
             preferences = self.data_processor.normalize_preferences(preferences)
@@ -190,7 +200,12 @@ class PlanGenerator:
 
             destination_scope = await self._detect_destination_scope(plan)
             is_international = destination_scope == "international"
-            processed_data = self._adjust_processed_data_for_scope(processed_data, is_international)
+            if section_feed is not None and getattr(plan, "duration_days", 0) > self.max_segment_days:
+                # 分段生成需要完整数据
+                processed_data, raw_data = await self._await_section_data(section_feed, is_international)
+                section_feed = None
+            elif section_feed is None:
+                processed_data = self._adjust_processed_data_for_scope(processed_data, is_international)
             if is_international:
                 logger.info("目的地判定为海外，将降低高德餐饮/住宿权重，优先使用小红书数据")
 
@@ -233,6 +248,7 @@ class PlanGenerator:
                             preferences,
                             raw_data,
                             is_international=is_international,
+                            section_feed=section_feed,
                         ),
                         timeout=600.0  # 600秒超时
                     )
@@ -247,6 +263,8 @@ class PlanGenerator:
                 logger.warning(f"LLM生成方案失败，使用传统方法: {e}")
             
             # 降级到传统方法
+            if section_feed is not None:
+                processed_data, raw_data = await self._await_section_data(section_feed, is_international)
             return await self._generate_traditional_plans(
                 processed_data,
                 plan,
@@ -305,6 +323,13 @@ class PlanGenerator:
             logger.warning(f"LLM目的地范围判定失败: {exc}")
         return None
 
+    async def _await_section_data(
+        self, section_feed: SectionFeed, is_international: bool
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """等待全部数据分段就绪，返回按目的地范围调整后的清洗数据与原始数据"""
+        processed_data, raw_data = await section_feed.wait_all()
+        return self._adjust_processed_data_for_scope(processed_data, is_international), raw_data
+
     def _adjust_processed_data_for_scope(
         self, processed_data: Optional[Dict[str, Any]], is_international: bool
     ) -> Dict[str, Any]:
@@ -435,19 +460,38 @@ class PlanGenerator:
         max_tokens: int,
         temperature: float,
         log_context: str,
+        cache_module: Optional[str] = None,
     ) -> Optional[Any]:
-        response = await openai_client.generate_text(
+        # 相同模型、提示词与参数的响应可直接复用（需开启 LLM_CACHE_ENABLED）
+        cache_key = None
+        if cache_module and llm_response_cache.enabled():
+            cache_key = llm_cache_key(openai_client.model, system_prompt, user_prompt, temperature, max_tokens)
+            cached = await llm_response_cache.get(cache_module, cache_key)
+            if cached is not None:
+                try:
+                    parsed = json.loads(self.data_processor.clean_llm_response(cached))
+                    logger.debug(f"{log_context} 命中LLM响应缓存")
+                    return parsed
+                except json.JSONDecodeError:
+                    logger.warning(f"{log_context} 缓存的LLM响应无法解析，重新请求")
+
+        # 各模块并发按天生成时共享同一 LLM 并发上限
+        response = await run_limited("llm", openai_client.generate_text(
             prompt=user_prompt,
             system_prompt=system_prompt,
             max_tokens=max_tokens,
             temperature=temperature,
-        )
+        ))
         cleaned_response = self.data_processor.clean_llm_response(response)
         try:
-            return json.loads(cleaned_response)
+            parsed = json.loads(cleaned_response)
         except json.JSONDecodeError:
             logger.warning(f"{log_context} JSON解析失败，原始返回：{cleaned_response}")
             return None
+        # 只缓存可解析的响应
+        if cache_key:
+            await llm_response_cache.set(cache_module, cache_key, openai_client.model, response)
+        return parsed
 
     async def _generate_traditional_plans(
         self,
@@ -1357,8 +1401,12 @@ class PlanGenerator:
         raw_data: Optional[Dict[str, Any]] = None,
         *,
         is_international: bool = False,
+        section_feed: Optional[SectionFeed] = None,
     ) -> List[Dict[str, Any]]:
-        """使用模块化LLM生成旅行方案"""
+        """使用模块化LLM生成旅行方案
+
+        传入 section_feed 时为流式模式：processed_data/raw_data 由分段交付，各模块只等待自己用到的分段。
+        """
         try:
             logger.info("开始模块化生成旅行方案")
             
@@ -1386,19 +1434,21 @@ class PlanGenerator:
                 logger.error(f"{module_name} 重试耗尽，将返回空结果")
                 return {"success": False, "data": [], "error": last_error}
 
+            # 每个模块声明所需的数据分段；流式模式下模块在这些分段就绪后立即开始，不等待其余收集任务
             module_tasks = [
                 {
                     "key": "accommodation",
                     "name": "住宿方案",
                     # 住宿为空不再阻塞整体方案，允许使用其他模块或占位
                     "critical": False,
-                    "coro": run_with_retry(
+                    "sections": ("hotels", "flights", "xiaohongshu_notes"),
+                    "run": lambda data, raw: run_with_retry(
                         self._generate_accommodation_plans,
-                        processed_data.get('hotels', []),
-                        processed_data.get('flights', []),
+                        data.get('hotels', []),
+                        data.get('flights', []),
                         plan,
                         preferences,
-                        raw_data,
+                        raw,
                         is_international=is_international,
                         attempts=3,
                         delay=1.0,
@@ -1409,12 +1459,13 @@ class PlanGenerator:
                     "key": "dining",
                     "name": "餐饮方案",
                     "critical": False,
-                    "coro": run_with_retry(
+                    "sections": ("restaurants", "xiaohongshu_notes"),
+                    "run": lambda data, raw: run_with_retry(
                         self._generate_dining_plans,
-                        processed_data.get('restaurants', []),
+                        data.get('restaurants', []),
                         plan,
                         preferences,
-                        raw_data,
+                        raw,
                         is_international=is_international,
                         attempts=3,
                         delay=1.0,
@@ -1425,12 +1476,13 @@ class PlanGenerator:
                     "key": "transportation",
                     "name": "交通方案",
                     "critical": False,
-                    "coro": run_with_retry(
+                    "sections": ("transportation", "xiaohongshu_notes"),
+                    "run": lambda data, raw: run_with_retry(
                         self._generate_transportation_plans,
-                        processed_data.get('transportation', []),
+                        data.get('transportation', []),
                         plan,
                         preferences,
-                        raw_data,
+                        raw,
                         is_international=is_international,
                         attempts=3,
                         delay=1.0,
@@ -1441,12 +1493,13 @@ class PlanGenerator:
                     "key": "attraction",
                     "name": "景点方案",
                     "critical": True,
-                    "coro": run_with_retry(
+                    "sections": ("attractions", "xiaohongshu_notes"),
+                    "run": lambda data, raw: run_with_retry(
                         self._generate_attraction_plans,
-                        processed_data.get('attractions', []),
+                        data.get('attractions', []),
                         plan,
                         preferences,
-                        raw_data,
+                        raw,
                         is_international=is_international,
                         attempts=3,
                         delay=1.0,
@@ -1455,8 +1508,26 @@ class PlanGenerator:
                 },
             ]
 
-            coro_list = [item["coro"] for item in module_tasks]
-            results = await asyncio.gather(*coro_list)
+            async def run_and_report(item: Dict[str, Any]):
+                if section_feed is not None:
+                    module_data, module_raw = await section_feed.wait(item["sections"])
+                    module_data = self._adjust_processed_data_for_scope(module_data, is_international)
+                    logger.info(f"{item['name']} 所需数据已就绪，开始生成")
+                else:
+                    module_data, module_raw = processed_data, raw_data
+                result = await item["run"](module_data, module_raw)
+                await report_plan_progress(
+                    "llm_module",
+                    total=len(module_tasks),
+                    module=item["key"],
+                    success=bool(result.get("success")) if isinstance(result, dict) else False,
+                )
+                return result
+
+            results = await asyncio.gather(*(run_and_report(item) for item in module_tasks))
+            if section_feed is not None:
+                # 组装需要完整数据
+                processed_data, raw_data = await self._await_section_data(section_feed, is_international)
             for item, result in zip(module_tasks, results):
                 item["result"] = result
                 item["data"] = result.get("data", []) if isinstance(result, dict) else []
@@ -1505,6 +1576,7 @@ class PlanGenerator:
                 plan,
                 is_international=is_international,
             )
+            await report_plan_progress("assembling", plan_count=len(assembled_plans or []))
             
             if not assembled_plans:
                 logger.error("方案组装失败，返回空列表")
@@ -1517,6 +1589,8 @@ class PlanGenerator:
             logger.error(f"模块化生成方案失败: {e}")
             # 如果模块化生成失败，回退到原始方法
             logger.info("回退到原始LLM生成方法")
+            if section_feed is not None:
+                processed_data, raw_data = await self._await_section_data(section_feed, is_international)
             return await self._generate_plans_with_llm_fallback(
                 processed_data,
                 plan,
@@ -2198,29 +2272,29 @@ class PlanGenerator:
                 raw_data.get("xiaohongshu_notes", []) if raw_data else [], plan.destination
             )
 
-            def build_prompts(day: int, date_str: str, daily_budget: Optional[float]):
+            def day_budget_info(day: int, daily_budget: Optional[float]) -> str:
                 # 对于住宿，如果是第一天，预算可以包含航班费用；其他天主要是酒店
                 if day == 1 and daily_budget:
                     # 第一天可以包含航班费用，预算可以稍高
-                    budget_info = f"{daily_budget * 1.5:.0f}元（含航班）"
-                else:
-                    budget_info = (
-                        f"{daily_budget:.0f}元" if isinstance(daily_budget, (int, float)) else "未指定"
-                    )
+                    return f"{daily_budget * 1.5:.0f}元（含航班）"
+                return f"{daily_budget:.0f}元" if isinstance(daily_budget, (int, float)) else "未指定"
+
+            def build_prompts(day: int, date_str: str, daily_budget: Optional[float], scope: DayScope):
+                budget_info = day_budget_info(day, daily_budget)
                 intl_hint = ""
                 if is_international:
                     intl_hint = (
                         "\n注意：目的地为海外，如下方航班/酒店数据为空或可能不准确，请重点依据小红书真实体验，并提醒用户抵达后再确认住宿信息。"
                     )
                 system_prompt = (
-                    "你是一位住宿规划师，请针对某一天给出航班（如有）与酒店安排，"
+                    f"你是一位住宿规划师，请针对{scope.subject}给出航班（如有）与酒店安排，"
                     "需结合真实航班/酒店数据输出结构化结果。"
                 )
                 user_prompt = f"""
-请为如下旅行生成第 {day} 天（日期：{date_str or '未提供'}）的住宿安排：
+请为如下旅行生成{scope.label}的住宿安排：
 - 目的地：{plan.destination}
 - 人数：{(preferences or {}).get('travelers', getattr(plan, 'travelers', 1))}
-- 当日预算：{budget_info}
+- 当日预算：{scope.per_day(budget_info)}
 - 年龄群体：{', '.join((preferences or {}).get('ageGroups', [])) if (preferences or {}).get('ageGroups') else '未指定'}
 - 饮食偏好：{', '.join((preferences or {}).get('foodPreferences', [])) if (preferences or {}).get('foodPreferences') else '无特殊偏好'}
 - 饮食禁忌：{', '.join((preferences or {}).get('dietaryRestrictions', [])) if (preferences or {}).get('dietaryRestrictions') else '无'}
@@ -2238,9 +2312,9 @@ class PlanGenerator:
 
 {intl_hint}
 
-请返回JSON对象，包含字段{{
-  "day": {day},
-  "date": "{date_str}",
+{scope.json_intro()}，包含字段{{
+  "day": {scope.day_value},
+  "date": "{scope.date_value}",
   "flight": {{}},
   "hotel": {{}},
   "daily_cost": 参考费用,
@@ -2263,11 +2337,16 @@ class PlanGenerator:
                 start_date=getattr(plan, "start_date", None),
                 per_day_budget=per_day_accommodation_budget,
                 build_prompts=build_prompts,
-                llm_requester=self._request_llm_json,
+                llm_requester=partial(self._request_llm_json, cache_module="accommodation"),
+                concurrency=settings.PLAN_DAILY_CONCURRENCY,
                 fallback_builder=lambda d, date: build_simple_accommodation_day(
                     d, date, hotels_data
                 ),
                 post_process=post_process,
+                chunk_days=settings.PLAN_DAILY_CHUNK_DAYS,
+                token_budget=settings.OPENAI_MAX_TOKENS,
+                context_window=settings.OPENAI_CONTEXT_WINDOW,
+                describe_day=lambda d, date, budget: f"当日预算 {day_budget_info(d, budget)}",
             )
             if not daily_entries:
                 return []
@@ -2324,21 +2403,22 @@ class PlanGenerator:
                 raw_data.get("xiaohongshu_notes", []) if raw_data else [], plan.destination
             )
 
-            def build_prompts(day: int, date_str: str, daily_budget: Optional[float]):
-                budget_info = (
-                    f"{daily_budget:.0f}元" if isinstance(daily_budget, (int, float)) else "未指定"
-                )
+            def budget_text(daily_budget: Optional[float]) -> str:
+                return f"{daily_budget:.0f}元" if isinstance(daily_budget, (int, float)) else "未指定"
+
+            def build_prompts(day: int, date_str: str, daily_budget: Optional[float], scope: DayScope):
+                budget_info = budget_text(daily_budget)
                 intl_hint = ""
                 if is_international:
                     intl_hint = (
                         "\n注意：目的地为海外，小红书美食体验是主要依据。若餐厅数据缺失，请结合笔记与通用经验推荐，并提示用户现场确认具体商家。"
                     )
                 system_prompt = (
-                    "你是一位美食规划师，请针对某一天制定详细的早餐/午餐/晚餐安排，"
+                    f"你是一位美食规划师，请针对{scope.subject}制定详细的早餐/午餐/晚餐安排，"
                     "需结合真实餐厅数据与小红书体验，输出结构化结果。"
                 )
                 user_prompt = f"""
-请为如下旅行生成第 {day} 天（日期：{date_str or '未提供'}）的餐饮方案：
+请为如下旅行生成{scope.label}的餐饮方案：
 - 目的地：{plan.destination}
 - 当日预算：{budget_info}
 - 人数：{(preferences or {}).get('travelers', getattr(plan, 'travelers', 1))}
@@ -2354,8 +2434,8 @@ class PlanGenerator:
 
 {intl_hint}
 
-请返回JSON对象，字段与示例一致：{{
-  "day": {day},
+{scope.json_intro()}，字段与示例一致：{{
+  "day": {scope.day_value},
   "meals": [
     {{
       "type": "早餐/午餐/晚餐",
@@ -2386,11 +2466,16 @@ class PlanGenerator:
                 start_date=getattr(plan, "start_date", None),
                 per_day_budget=per_day_budget,
                 build_prompts=build_prompts,
-                llm_requester=self._request_llm_json,
+                llm_requester=partial(self._request_llm_json, cache_module="dining"),
+                concurrency=settings.PLAN_DAILY_CONCURRENCY,
                 fallback_builder=lambda d, date: build_simple_dining_plan(
                     d, date, restaurants_data
                 ),
                 post_process=post_process,
+                chunk_days=settings.PLAN_DAILY_CHUNK_DAYS,
+                token_budget=settings.OPENAI_MAX_TOKENS,
+                context_window=settings.OPENAI_CONTEXT_WINDOW,
+                describe_day=lambda d, date, budget: f"当日预算 {budget_text(budget)}",
             )
 
         except Exception as e:
@@ -2420,7 +2505,13 @@ class PlanGenerator:
             per_day_budget = self.budget_calculator.get_per_day_budget(plan)
             logger.warning(f"计算后的每日交通预算: {per_day_budget}")
             
-            def build_prompts(day: int, date_str: str, daily_budget: Optional[float]):
+            def describe_day(day: int, date_str: str, daily_budget: Optional[float]) -> str:
+                stage_meta = self._build_transport_stage_instruction(
+                    self._determine_transport_stage(day, total_days), origin_city, destination_city
+                )
+                return f"行程阶段 {stage_meta['label']}。{stage_meta['prompt']}"
+
+            def build_prompts(day: int, date_str: str, daily_budget: Optional[float], scope: DayScope):
                 stage = self._determine_transport_stage(day, total_days)
                 stage_meta = self._build_transport_stage_instruction(
                     stage, origin_city, destination_city
@@ -2434,12 +2525,12 @@ class PlanGenerator:
                         "\n注意：目的地为海外，如缺乏可靠交通数据，可根据小红书笔记和常规经验给出交通建议，并提醒用户参考当地最新信息。"
                     )
                 system_prompt = (
-                    "你是一位交通规划师，请针对某一天提供详细的城市内交通安排，"
+                    f"你是一位交通规划师，请针对{scope.subject}提供详细的城市内交通安排，"
                     "包含路线、费用和注意事项。"
                 )
                 user_prompt = f"""
-请为如下旅行生成第 {day} 天（日期：{date_str or '未提供'}）的交通方案：
-- 行程阶段：{stage_meta['label']}
+请为如下旅行生成{scope.label}的交通方案：
+- 行程阶段：{scope.per_day(stage_meta['label'])}
 - 出发地：{origin_city}
 - 目的地：{plan.destination}
 - 出行方式偏好：{plan.transportation or '未指定'}
@@ -2449,7 +2540,7 @@ class PlanGenerator:
 - 活动偏好：{', '.join((preferences or {}).get('activity_preference', [])) if (preferences or {}).get('activity_preference') else '未指定'}
 
 行程阶段要求：
-{stage_meta['prompt']}
+{scope.per_day(stage_meta['prompt'])}
 
 {intl_hint}
 
@@ -2459,9 +2550,9 @@ class PlanGenerator:
 小红书真实交通攻略：
 {notes_str}
 
-请输出严格的JSON对象（禁止附加说明文字）：{{
-  "day": {day},
-  "date": "{date_str}",
+{scope.json_intro(strict=True)}：{{
+  "day": {scope.day_value},
+  "date": "{scope.date_value}",
   "primary_routes": [
     {{
       "type": "交通方式",
@@ -2506,7 +2597,8 @@ class PlanGenerator:
                 start_date=getattr(plan, "start_date", None),
                 per_day_budget=per_day_budget,
                 build_prompts=build_prompts,
-                llm_requester=self._request_llm_json,
+                llm_requester=partial(self._request_llm_json, cache_module="transport"),
+                concurrency=settings.PLAN_DAILY_CONCURRENCY,
                 fallback_builder=lambda d, date: build_simple_transportation_plan(
                     d,
                     date,
@@ -2516,6 +2608,10 @@ class PlanGenerator:
                     destination=destination_city,
                 ),
                 post_process=post_process,
+                chunk_days=settings.PLAN_DAILY_CHUNK_DAYS,
+                token_budget=settings.OPENAI_MAX_TOKENS,
+                context_window=settings.OPENAI_CONTEXT_WINDOW,
+                describe_day=describe_day,
             )
 
         except Exception as e:
@@ -2541,17 +2637,18 @@ class PlanGenerator:
                 raw_data.get("xiaohongshu_notes", []) if raw_data else [], plan.destination
             )
 
-            def build_prompts(day: int, date_str: str, daily_budget: Optional[float]):
-                budget_info = (
-                    f"{daily_budget:.0f}元" if isinstance(daily_budget, (int, float)) else "未指定"
-                )
+            def budget_text(daily_budget: Optional[float]) -> str:
+                return f"{daily_budget:.0f}元" if isinstance(daily_budget, (int, float)) else "未指定"
+
+            def build_prompts(day: int, date_str: str, daily_budget: Optional[float], scope: DayScope):
+                budget_info = budget_text(daily_budget)
                 intl_hint = ""
                 if is_international:
                     intl_hint = (
                         "\n注意：目的地为海外，请优先结合小红书体验与真实景点数据，若缺少官方数据，请说明信息来源并提示用户现场确认。"
                     )
                 system_prompt = (
-                    "你是一位资深景点规划师，请针对某一天制定详细的景点游览安排，"
+                    f"你是一位资深景点规划师，请针对{scope.subject}制定详细的景点游览安排，"
                     "需以小红书用户的真实体验为主，结合参考景点数据，输出结构化结果。\n"
                     "具体要求：\n"
                     "1. 必须以小红书数据为主，优先选择小红书中用户真实分享的景点和体验；\n"
@@ -2563,7 +2660,7 @@ class PlanGenerator:
                     "7. 不要凭空捏造不存在的地点，优先使用小红书数据中的景点信息。"
                 )
                 user_prompt = f"""
-请为如下旅行生成第 {day} 天（日期：{date_str or '未提供'}）的景点游览方案：
+请为如下旅行生成{scope.label}的景点游览方案：
 - 目的地：{plan.destination}
 - 当日预算：{budget_info}
 - 人数：{(preferences or {}).get('travelers', getattr(plan, 'travelers', 1))}
@@ -2586,9 +2683,9 @@ class PlanGenerator:
 2. 景点定位数据仅作为补充参考，当小红书数据不足时可以参考，但不能依赖这些数据作为主要依据；
 3. 确保推荐的景点来自小红书用户的真实分享，保证行程的真实性和可操作性。
 
-请返回JSON对象，字段与示例一致，estimated_cost根据已知信息估算：{{
-  "day": {day},
-  "date": "{date_str}",
+{scope.json_intro()}，字段与示例一致，estimated_cost根据已知信息估算：{{
+  "day": {scope.day_value},
+  "date": "{scope.date_value}",
   "schedule": [...],
   "attractions": [...],
   "estimated_cost": 100,
@@ -2610,11 +2707,16 @@ class PlanGenerator:
                 start_date=getattr(plan, "start_date", None),
                 per_day_budget=per_day_budget,
                 build_prompts=build_prompts,
-                llm_requester=self._request_llm_json,
+                llm_requester=partial(self._request_llm_json, cache_module="attractions"),
+                concurrency=settings.PLAN_DAILY_CONCURRENCY,
                 fallback_builder=lambda d, date: build_simple_attraction_plan(
                     d, date, attractions_data
                 ),
                 post_process=post_process,
+                chunk_days=settings.PLAN_DAILY_CHUNK_DAYS,
+                token_budget=settings.OPENAI_MAX_TOKENS,
+                context_window=settings.OPENAI_CONTEXT_WINDOW,
+                describe_day=lambda d, date, budget: f"当日预算 {budget_text(budget)}",
             )
 
         except Exception as e:
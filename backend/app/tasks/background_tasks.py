@@ -14,14 +14,17 @@ def data_refresh_task():
     """数据刷新任务"""
     try:
         logger.info("开始执行数据刷新任务")
-        
-        # 这里应该调用数据刷新逻辑
-        # 由于这是Celery任务，我们需要重新实现数据刷新逻辑
-        
-        return {
-            "status": "success",
-            "message": "数据刷新完成"
-        }
+
+        from app.services.cache_warmer import CacheWarmer
+
+        async def run_warmer():
+            warmer = CacheWarmer()
+            try:
+                return await warmer.run_once()
+            finally:
+                await warmer.data_collector.close()
+
+        return run_coro(run_warmer())
         
     except Exception as e:
         logger.error(f"数据刷新任务失败: {e}")
@@ -36,14 +39,11 @@ def cache_cleanup_task():
         
         from app.core.redis import clear_cache_pattern_sync
         
-        # 清理过期的缓存
+        # 清理过期的缓存（酒店/景点/餐厅/天气由 cached_fetch 管理，自带过期时间，
+        # 不再整体清除，否则会抹掉缓存预热的数据）
         patterns = [
             "flights:*",
-            "hotels:*",
-            "attractions:*", 
-            "restaurants:*",
             "transportation:*",
-            "weather:*"
         ]
         
         total_cleared = 0
@@ -8,10 +8,13 @@ from app.services.agent_service import AgentService
 from app.core.database import async_session
 from loguru import logger
 from app.core.async_loop import run_coro
+from app.services.llm_response_cache import llm_cache_bypass
 
 
 @celery_app.task(bind=True)
-def generate_travel_plans_task(self, plan_id: int, preferences: dict = None, requirements: dict = None):
+def generate_travel_plans_task(
+    self, plan_id: int, preferences: dict = None, requirements: dict = None, bypass_cache: bool = False
+):
     """生成旅行方案任务"""
     try:
         logger.info(f"开始执行生成旅行方案任务，计划ID: {plan_id}")
@@ -33,10 +36,11 @@ def generate_travel_plans_task(self, plan_id: int, preferences: dict = None, req
                     meta={"current": 20, "total": 100, "status": "收集数据中..."}
                 )
                 
-                # 生成方案
-                success = await agent_service.generate_travel_plans(
-                    plan_id, preferences, requirements
-                )
+                # 生成方案（bypass_cache 时不读取 LLM 响应缓存）
+                with llm_cache_bypass(bypass_cache):
+                    success = await agent_service.generate_travel_plans(
+                        plan_id, preferences, requirements
+                    )
                 
                 if success:
                     self.update_state(
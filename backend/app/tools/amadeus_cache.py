@@ -0,0 +1,209 @@
+"""
+Amadeus 访问令牌与城市 IATA 代码的跨进程共享缓存
+MCPClient 随 AgentService / DataCollector 按请求或任务创建，实例上的令牌和代码缓存无法复用；
+这里把两者放到 Redis（令牌按 expires_in 过期）并在进程内再缓存一份：
+- 令牌：同一凭据只有拿到 Redis 锁的 worker 请求新令牌，其余 worker 等待其写回；进程内并发调用先合并
+- IATA 代码：LLM 识别结果按城市共享，跨进程合并同一城市的识别请求，识别失败的城市短期内不再重复调用 LLM
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis, acquire_lock, release_lock, lock_exists, get_cache, set_cache
+from app.core.singleflight import SingleFlight, redis_single_flight
+
+# 请求新令牌的函数，返回 (access_token, expires_in 秒)
+TokenFetcher = Callable[[], Awaitable[Optional[Tuple[str, int]]]]
+
+
+def _credential_id() -> str:
+    """按凭据区分令牌键（不在键中暴露 client_id 原文）"""
+    return hashlib.sha256(settings.AMADEUS_CLIENT_ID.encode("utf-8")).hexdigest()[:16]
+
+
+class AmadeusTokenCache:
+    """Amadeus OAuth 令牌共享缓存（进程内 L1 + Redis，按凭据加锁刷新）"""
+
+    def __init__(self):
+        # 凭据标识 -> (令牌, 过期时间戳)
+        self._local: Dict[str, Tuple[str, float]] = {}
+        self._flight = SingleFlight("amadeus_token")
+        self.fetch_count = 0
+
+    @staticmethod
+    def _token_key(credential: str) -> str:
+        return f"amadeus:token:{credential}"
+
+    def _get_local(self, credential: str) -> Optional[str]:
+        entry = self._local.get(credential)
+        if entry and time.time() < entry[1]:
+            return entry[0]
+        return None
+
+    async def _get_shared(self, client, credential: str) -> Optional[str]:
+        """读取 Redis 中的令牌，并按剩余有效期写入 L1"""
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.get(self._token_key(credential))
+            pipe.ttl(self._token_key(credential))
+            token, ttl = await pipe.execute()
+        if not token or ttl is None or ttl <= 0:
+            return None
+        token = token.decode() if isinstance(token, bytes) else token
+        self._local[credential] = (token, time.time() + ttl)
+        return token
+
+    async def get_token(self, fetch: TokenFetcher) -> Optional[str]:
+        """获取有效令牌：L1 -> Redis -> 加锁请求新令牌"""
+        credential = _credential_id()
+        token = self._get_local(credential)
+        if token:
+            return token
+        return await self._flight.do(credential, lambda: self._get_or_refresh(credential, fetch))
+
+    async def _store(self, client, credential: str, token: str, expires_in: int):
+        # 提前过期，避免拿到即将失效的令牌
+        ttl = max(int(expires_in) - settings.AMADEUS_TOKEN_REFRESH_MARGIN, 1)
+        self._local[credential] = (token, time.time() + ttl)
+        try:
+            await client.set(self._token_key(credential), token, ex=ttl)
+        except Exception as e:
+            logger.warning(f"写入共享Amadeus令牌失败: {e}")
+
+    async def _fetch(self, fetch: TokenFetcher) -> Optional[Tuple[str, int]]:
+        self.fetch_count += 1
+        result = await fetch()
+        if not result or not result[0]:
+            return None
+        return result
+
+    async def _get_or_refresh(self, credential: str, fetch: TokenFetcher) -> Optional[str]:
+        try:
+            client = await get_redis()
+            token = await self._get_shared(client, credential)
+            if token:
+                return token
+        except Exception as e:
+            logger.warning(f"Redis不可用，Amadeus令牌仅在进程内缓存: {e}")
+            result = await self._fetch(fetch)
+            if not result:
+                return None
+            ttl = max(int(result[1]) - settings.AMADEUS_TOKEN_REFRESH_MARGIN, 1)
+            self._local[credential] = (result[0], time.time() + ttl)
+            return result[0]
+
+        lock_key = f"{self._token_key(credential)}:lock"
+        deadline = time.monotonic() + settings.AMADEUS_TOKEN_LOCK_TTL
+        while True:
+            lock_token = await acquire_lock(lock_key, ttl=settings.AMADEUS_TOKEN_LOCK_TTL)
+            if lock_token:
+                try:
+                    # 抢到锁后再查一次，前一个持锁方可能刚写回
+                    token = await self._get_shared(client, credential)
+                    if token:
+                        return token
+                    result = await self._fetch(fetch)
+                    if not result:
+                        return None
+                    await self._store(client, credential, result[0], result[1])
+                    logger.info("已获取并共享新的Amadeus访问令牌")
+                    return result[0]
+                finally:
+                    await release_lock(lock_key, lock_token)
+
+            # 其他 worker 正在请求令牌，等待其写回
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+                token = await self._get_shared(client, credential)
+                if token:
+                    return token
+                if not await lock_exists(lock_key):
+                    break
+            else:
+                logger.warning("等待共享Amadeus令牌超时，自行请求")
+                result = await self._fetch(fetch)
+                if not result:
+                    return None
+                await self._store(client, credential, result[0], result[1])
+                return result[0]
+
+    async def invalidate(self, token: Optional[str] = None):
+        """令牌被拒绝（401）时作废；传入令牌时只删除仍是该令牌的共享值，避免误删其他 worker 刚刷新的令牌"""
+        credential = _credential_id()
+        entry = self._local.get(credential)
+        if token is None or (entry and entry[0] == token):
+            self._local.pop(credential, None)
+        try:
+            if token is None:
+                client = await get_redis()
+                await client.delete(self._token_key(credential))
+            else:
+                await release_lock(self._token_key(credential), token)
+        except Exception as e:
+            logger.warning(f"作废共享Amadeus令牌失败: {e}")
+
+
+class IataCodeCache:
+    """城市 IATA 代码共享缓存（进程内 L1 + Redis，跨进程合并同一城市的识别请求）"""
+
+    def __init__(self):
+        # 城市 -> IATA 代码；只保存识别成功的结果
+        self.local: Dict[str, str] = {}
+        self._flight = SingleFlight("iata_code")
+
+    @staticmethod
+    def _normalize(city: str) -> str:
+        return "".join(str(city or "").split()).lower()
+
+    @staticmethod
+    def _code_key(normalized: str) -> str:
+        return f"iata:code:{normalized}"
+
+    @staticmethod
+    def _negative_key(normalized: str) -> str:
+        return f"iata:miss:{normalized}"
+
+    async def get_code(self, city: str, resolve: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """获取城市 IATA 代码：L1 -> Redis -> 合并调用 resolve（如 LLM 识别）"""
+        normalized = self._normalize(city)
+        if not normalized:
+            return None
+        if normalized in self.local:
+            return self.local[normalized]
+        return await self._flight.do(normalized, lambda: self._get_or_resolve(city, normalized, resolve))
+
+    async def _get_or_resolve(
+        self,
+        city: str,
+        normalized: str,
+        resolve: Callable[[], Awaitable[Optional[str]]],
+    ) -> Optional[str]:
+        code = await get_cache(self._code_key(normalized))
+        if code:
+            self.local[normalized] = code
+            return code
+        if await get_cache(self._negative_key(normalized)):
+            logger.debug(f"城市IATA代码近期识别失败，跳过: {city}")
+            return None
+
+        code = await redis_single_flight(
+            self._code_key(normalized),
+            resolve,
+            result_ttl=settings.IATA_CODE_CACHE_TTL,
+            lock_ttl=30.0,
+            wait_timeout=30.0,
+        )
+        if code:
+            self.local[normalized] = code
+            await set_cache(self._code_key(normalized), code, ttl=settings.IATA_CODE_CACHE_TTL)
+        else:
+            await set_cache(self._negative_key(normalized), 1, ttl=settings.IATA_CODE_NEGATIVE_TTL)
+        return code
+
+
+amadeus_token_cache = AmadeusTokenCache()
+iata_code_cache = IataCodeCache()
@@ -10,6 +10,7 @@ import httpx
 import re
 from typing import Dict, Any, List, Optional
 from app.core.config import settings
+from app.core.http_clients import shared_http_client
 
 # 获取API密钥
 api_key = os.getenv('BAIDU_MAPS_API_KEY', settings.BAIDU_MAPS_API_KEY)
@@ -67,7 +68,7 @@ async def map_directions(
                 "from": "lx_skyroam"
             }
             
-            async with httpx.AsyncClient(timeout=30.0, proxies={}) as client:
+            async with shared_http_client(api_url) as client:
                 geocode_response = await client.get(geocode_url, params=geocode_params)
                 geocode_response.raise_for_status()
                 geocode_result = geocode_response.json()
@@ -89,7 +90,7 @@ async def map_directions(
                 "from": "lx_skyroam"
             }
             
-            async with httpx.AsyncClient(timeout=30.0, proxies={}) as client:
+            async with shared_http_client(api_url) as client:
                 geocode_response = await client.get(geocode_url, params=geocode_params)
                 geocode_response.raise_for_status()
                 geocode_result = geocode_response.json()
@@ -128,7 +129,7 @@ async def map_directions(
                 "from": "lx_skyroam"
             }
         
-        async with httpx.AsyncClient(timeout=30.0, verify=False, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -207,7 +208,7 @@ async def map_search_places(
             else:
                 params["region"] = region
         
-        async with httpx.AsyncClient(timeout=30.0, verify=False, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -251,7 +252,7 @@ async def map_geocode(address: str, is_china: str = "true") -> Dict[str, Any]:
             "from": "lx_skyroam"
         }
         
-        async with httpx.AsyncClient(timeout=30.0, verify=False, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -298,7 +299,7 @@ async def map_reverse_geocode(latitude: float, longitude: float) -> Dict[str, An
             "from": "lx_skyroam"
         }
         
-        async with httpx.AsyncClient(timeout=30.0, verify=False, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -346,7 +347,7 @@ async def map_weather(location: str = "", district_id: str = "", is_china: str =
         else:
             params["location"] = location
         
-        async with httpx.AsyncClient(timeout=30.0, verify=False, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
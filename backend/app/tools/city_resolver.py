@@ -12,6 +12,104 @@ from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 from app.core.config import settings
 
 
+# 常见地名（景区、商圈等）到所属城市的映射
+LANDMARK_CITY_MAPPING: Dict[str, str] = {
+    "千岛湖": "杭州",
+    "西湖": "杭州",
+    "西溪湿地": "杭州",
+    "天安门": "北京",
+    "故宫": "北京",
+    "长城": "北京",
+    "外滩": "上海",
+    "东方明珠": "上海",
+    "小蛮腰": "广州",
+    "珠江": "广州",
+    "大雁塔": "西安",
+    "兵马俑": "西安",
+    "夫子庙": "南京",
+    "中山陵": "南京",
+    "拙政园": "苏州",
+    "虎丘": "苏州",
+    "鼓浪屿": "厦门",
+    "南普陀": "厦门",
+    "黄鹤楼": "武汉",
+    "东湖": "武汉",
+    "橘子洲": "长沙",
+    "岳麓山": "长沙",
+    "趵突泉": "济南",
+    "大明湖": "济南",
+    "五大道": "天津",
+    "海河": "天津",
+    "天坛": "北京",
+    "颐和园": "北京",
+    "圆明园": "北京",
+    "什刹海": "北京",
+    "王府井": "北京",
+    "三里屯": "北京",
+    "陆家嘴": "上海",
+    "南京路": "上海",
+    "豫园": "上海",
+    "田子坊": "上海",
+    "新天地": "上海",
+    "珠江新城": "广州",
+    "天河城": "广州",
+    "上下九": "广州",
+    "北京路": "广州",
+    "春熙路": "成都",
+    "宽窄巷子": "成都",
+    "锦里": "成都",
+    "大熊猫基地": "成都",
+    "解放碑": "重庆",
+    "洪崖洞": "重庆",
+    "朝天门": "重庆",
+    "磁器口": "重庆",
+    "钟楼": "西安",
+    "回民街": "西安",
+    "华清宫": "西安",
+    "芙蓉园": "西安",
+    "总统府": "南京",
+    "雨花台": "南京",
+    "玄武湖": "南京",
+    "鸡鸣寺": "南京",
+    "留园": "苏州",
+    "狮子林": "苏州",
+    "寒山寺": "苏州",
+    "周庄": "苏州",
+    "曾厝垵": "厦门",
+    "环岛路": "厦门",
+    "厦门大学": "厦门",
+    "南普陀寺": "厦门",
+    "户部巷": "武汉",
+    "江汉路": "武汉",
+    "武汉大学": "武汉",
+    "黄鹤楼公园": "武汉",
+    "坡子街": "长沙",
+    "太平街": "长沙",
+    "湖南大学": "长沙",
+    "岳麓书院": "长沙",
+    "泉城广场": "济南",
+    "千佛山": "济南",
+    "黑虎泉": "济南",
+    "芙蓉街": "济南",
+    "古文化街": "天津",
+    "天津之眼": "天津",
+    "意式风情街": "天津",
+    "瓷房子": "天津"
+}
+
+
+def resolve_landmark_city(destination: str, allow_contains: bool = True) -> Optional[str]:
+    """按本地映射解析地名所属城市（先直接匹配，再包含匹配），不发起网络请求"""
+    if destination in LANDMARK_CITY_MAPPING:
+        return LANDMARK_CITY_MAPPING[destination]
+    if not allow_contains:
+        return None
+    for key, value in LANDMARK_CITY_MAPPING.items():
+        if key in destination:
+            return value
+    return None
+
+
 class CityResolver:
     """城市名解析器"""
     
@@ -21,89 +119,7 @@ class CityResolver:
         self.api_key = settings.AMAP_API_KEY
         
         # 常见地名映射（作为备用）
-        self.city_mapping = {
-            "千岛湖": "杭州",
-            "西湖": "杭州", 
-            "西溪湿地": "杭州",
-            "天安门": "北京",
-            "故宫": "北京",
-            "长城": "北京",
-            "外滩": "上海",
-            "东方明珠": "上海",
-            "小蛮腰": "广州",
-            "珠江": "广州",
-            "大雁塔": "西安",
-            "兵马俑": "西安",
-            "夫子庙": "南京",
-            "中山陵": "南京",
-            "拙政园": "苏州",
-            "虎丘": "苏州",
-            "鼓浪屿": "厦门",
-            "南普陀": "厦门",
-            "黄鹤楼": "武汉",
-            "东湖": "武汉",
-            "橘子洲": "长沙",
-            "岳麓山": "长沙",
-            "趵突泉": "济南",
-            "大明湖": "济南",
-            "五大道": "天津",
-            "海河": "天津",
-            "天坛": "北京",
-            "颐和园": "北京",
-            "圆明园": "北京",
-            "什刹海": "北京",
-            "王府井": "北京",
-            "三里屯": "北京",
-            "陆家嘴": "上海",
-            "南京路": "上海",
-            "豫园": "上海",
-            "田子坊": "上海",
-            "新天地": "上海",
-            "珠江新城": "广州",
-            "天河城": "广州",
-            "上下九": "广州",
-            "北京路": "广州",
-            "春熙路": "成都",
-            "宽窄巷子": "成都",
-            "锦里": "成都",
-            "大熊猫基地": "成都",
-            "解放碑": "重庆",
-            "洪崖洞": "重庆",
-            "朝天门": "重庆",
-            "磁器口": "重庆",
-            "钟楼": "西安",
-            "回民街": "西安",
-            "华清宫": "西安",
-            "芙蓉园": "西安",
-            "总统府": "南京",
-            "雨花台": "南京",
-            "玄武湖": "南京",
-            "鸡鸣寺": "南京",
-            "留园": "苏州",
-            "狮子林": "苏州",
-            "寒山寺": "苏州",
-            "周庄": "苏州",
-            "曾厝垵": "厦门",
-            "环岛路": "厦门",
-            "厦门大学": "厦门",
-            "南普陀寺": "厦门",
-            "户部巷": "武汉",
-            "江汉路": "武汉",
-            "武汉大学": "武汉",
-            "黄鹤楼公园": "武汉",
-            "坡子街": "长沙",
-            "太平街": "长沙",
-            "湖南大学": "长沙",
-            "岳麓书院": "长沙",
-            "泉城广场": "济南",
-            "千佛山": "济南",
-            "黑虎泉": "济南",
-            "芙蓉街": "济南",
-            "古文化街": "天津",
-            "天津之眼": "天津",
-            "意式风情街": "天津",
-            "瓷房子": "天津"
-        }
+        self.city_mapping = LANDMARK_CITY_MAPPING
     
     async def resolve_city(self, destination: str) -> str:
         """
@@ -198,16 +214,7 @@ class CityResolver:
     
     def _resolve_with_mapping(self, destination: str) -> Optional[str]:
         """使用本地映射解析城市名"""
-        # 直接匹配
-        if destination in self.city_mapping:
-            return self.city_mapping[destination]
-        
-        # 包含匹配
-        for key, value in self.city_mapping.items():
-            if key in destination:
-                return value
-        
-        return None
+        return resolve_landmark_city(destination)
     
     async def close(self):
         """关闭HTTP客户端"""
@@ -0,0 +1,162 @@
+"""
+地理编码请求合并
+- 请求级上下文：一次方案生成内同一地址只查询一次（geocode_scope）
+- 进程内合并：并发请求同一规范化地址时只发起一次上游调用
+- Redis 合并：Celery 多个 worker 之间共享进行中的地理编码结果
+- 批量地理编码：去重后一次 MGET 读取共享结果，未命中的有限并发回源，结果一次 pipeline 写回
+"""
+
+import asyncio
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_cache_many, set_cache_many
+from app.core.singleflight import SingleFlight, redis_single_flight, single_flight_result_key
+
+_geocode_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("geocode_scope", default=None)
+_geocode_flight = SingleFlight("geocode")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_address(address: str, city: str = "") -> str:
+    """规范化地址（去空白、统一大小写），作为合并与缓存的键"""
+    addr = _WHITESPACE_RE.sub("", str(address or "")).lower()
+    city_norm = _WHITESPACE_RE.sub("", str(city or "")).lower()
+    return f"{addr}|{city_norm}" if city_norm else addr
+
+
+@contextmanager
+def geocode_scope():
+    """开启请求级地理编码上下文
+
+    在该上下文内创建的任务共享同一份结果字典（asyncio 任务会复制上下文，但字典为同一对象）。
+    """
+    token = _geocode_scope.set({})
+    try:
+        yield
+    finally:
+        _geocode_scope.reset(token)
+
+
+async def coalesced_geocode(
+    address: str,
+    city: str,
+    fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+) -> Optional[Dict[str, Any]]:
+    """按规范化地址合并地理编码请求
+
+    Args:
+        address: 地址
+        city: 城市（可选）
+        fetch: 实际发起地理编码的协程函数
+    """
+    key = normalize_address(address, city)
+    scope = _geocode_scope.get()
+    if scope is not None and key in scope:
+        logger.debug(f"地理编码命中请求级上下文: {address}")
+        return scope[key]
+
+    async def leader():
+        if settings.GEOCODE_SHARED_INFLIGHT_ENABLED:
+            return await redis_single_flight(
+                f"geocode:{key}",
+                fetch,
+                result_ttl=settings.GEOCODE_SHARED_RESULT_TTL,
+                lock_ttl=settings.GEOCODE_INFLIGHT_LOCK_TTL,
+                wait_timeout=settings.GEOCODE_INFLIGHT_WAIT_TIMEOUT,
+            )
+        return await fetch()
+
+    result = await _geocode_flight.do(key, leader)
+    # 仅记录成功结果，失败时允许同一请求内的后续调用重试
+    if scope is not None and result:
+        scope[key] = result
+    return result
+
+
+async def batch_coalesced_geocode(
+    addresses: List[str],
+    city: str,
+    fetch: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+    concurrency: Optional[int] = None,
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """批量地理编码
+
+    1. 按规范化地址去重，先查请求级上下文
+    2. 剩余地址一次 MGET 读取共享结果（与单个地理编码共用同一组键）
+    3. 未命中的地址以有限并发回源（仍经过进程内合并，与并发的单个请求共享结果）
+    4. 新结果一次 pipeline 写回
+
+    Args:
+        addresses: 地址列表（可重复）
+        city: 城市（可选）
+        fetch: 单个地址的回源协程函数
+        concurrency: 回源并发数，默认 GEOCODE_BATCH_CONCURRENCY
+
+    Returns:
+        {原始地址: 结果}，失败的地址对应 None
+    """
+    unique: Dict[str, str] = {}
+    for address in addresses:
+        if address and str(address).strip():
+            unique.setdefault(normalize_address(address, city), address)
+    resolved: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    scope = _geocode_scope.get()
+    if scope is not None:
+        for key in unique:
+            if key in scope:
+                resolved[key] = scope[key]
+
+    pending = [key for key in unique if key not in resolved]
+    if pending:
+        redis_keys = {key: single_flight_result_key(f"geocode:{key}") for key in pending}
+        cached = await get_cache_many(list(redis_keys.values()))
+        for key, redis_key in redis_keys.items():
+            if cached.get(redis_key):
+                resolved[key] = cached[redis_key]
+
+    misses = [key for key in unique if key not in resolved]
+    if misses:
+        semaphore = asyncio.Semaphore(max(concurrency or settings.GEOCODE_BATCH_CONCURRENCY, 1))
+
+        async def resolve(key: str):
+            address = unique[key]
+            async with semaphore:
+                try:
+                    return key, await _geocode_flight.do(key, lambda: fetch(address))
+                except Exception as e:
+                    logger.warning(f"批量地理编码失败: {address}, 错误: {e}")
+                    return key, None
+
+        fetched = dict(await asyncio.gather(*(resolve(key) for key in misses)))
+        resolved.update(fetched)
+        write_back = {
+            single_flight_result_key(f"geocode:{key}"): value
+            for key, value in fetched.items()
+            if value
+        }
+        if write_back:
+            await set_cache_many(write_back, ttl=settings.GEOCODE_SHARED_RESULT_TTL)
+
+    if scope is not None:
+        for key, value in resolved.items():
+            if value:
+                scope[key] = value
+
+    logger.debug(
+        f"批量地理编码: 输入 {len(addresses)} 条，去重后 {len(unique)} 条，"
+        f"缓存命中 {len(unique) - len(misses)} 条，回源 {len(misses)} 条"
+    )
+    return {address: resolved.get(normalize_address(address, city)) for address in addresses if address}
+
+
+def geocode_coalescing_stats() -> Dict[str, Any]:
+    """进程内合并统计"""
+    return _geocode_flight.stats()
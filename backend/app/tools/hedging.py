@@ -0,0 +1,156 @@
+"""
+地图请求对冲（hedged requests）
+主提供商在其观测到的 p90 延迟内未返回时，向下一个提供商发送同样的请求，
+采用先返回的有效结果并取消另一个。对冲次数受每分钟预算限制（Redis 计数，跨进程共享）。
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.tools.provider_health import provider_health
+
+
+class HedgeStats:
+    """对冲计数（进程内）"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, operation: str, event: str):
+        with self._lock:
+            counters = self._counters.setdefault(operation, {})
+            counters[event] = counters.get(event, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {}
+            for operation, counters in self._counters.items():
+                item = dict(counters)
+                sent = item.get("hedge_sent", 0)
+                item["hedge_win_ratio"] = round(item.get("hedge_won", 0) / sent, 4) if sent else None
+                operations[operation] = item
+        return {
+            "enabled": bool(settings.MAP_HEDGING_ENABLED),
+            "budget_per_minute": settings.MAP_HEDGE_BUDGET_PER_MINUTE,
+            "operations": operations,
+        }
+
+
+hedge_stats = HedgeStats()
+
+_local_budget_lock = threading.Lock()
+_local_budget = {"minute": 0, "used": 0}
+
+
+async def _take_hedge_budget() -> bool:
+    """占用一次对冲预算（Redis 不可用时退回进程内计数）"""
+    limit = settings.MAP_HEDGE_BUDGET_PER_MINUTE
+    if limit <= 0:
+        return False
+    minute = int(time.time() // 60)
+    try:
+        client = await get_redis()
+        key = f"hedge:budget:{minute}"
+        used = await client.incr(key)
+        if used == 1:
+            await client.expire(key, 120)
+        return used <= limit
+    except Exception as e:
+        logger.debug(f"对冲预算计数使用进程内回退: {e}")
+        with _local_budget_lock:
+            if _local_budget["minute"] != minute:
+                _local_budget["minute"] = minute
+                _local_budget["used"] = 0
+            _local_budget["used"] += 1
+            return _local_budget["used"] <= limit
+
+
+def _hedge_delay(provider: str, operation: str) -> float:
+    """对冲等待时间：主提供商最近样本的 p90 延迟，样本不足时使用默认值"""
+    p90 = provider_health.latency_percentile(provider, operation, 0.9)
+    delay = settings.MAP_HEDGE_DEFAULT_DELAY if p90 is None else p90
+    return max(delay, settings.MAP_HEDGE_MIN_DELAY)
+
+
+async def _cancel(task: asyncio.Task):
+    if not task.done():
+        task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+async def hedged_call(
+    operation: str,
+    providers: List[str],
+    call: Callable[[str], Awaitable[Any]],
+) -> Tuple[Any, List[str], Optional[Exception]]:
+    """对前两个提供商执行对冲调用
+
+    Args:
+        operation: 操作名（与 provider_health 中的统计对应）
+        providers: 已排序的提供商列表，使用前两个
+        call: 按提供商发起请求的协程函数，无结果时返回空值
+
+    Returns:
+        (结果, 已尝试的提供商, 最后一个错误)；结果为空时调用方继续按顺序回退
+    """
+    primary = providers[0]
+    secondary = providers[1] if len(providers) > 1 else None
+    tasks: Dict[asyncio.Task, str] = {asyncio.create_task(call(primary)): primary}
+    attempted = [primary]
+    last_error: Optional[Exception] = None
+    hedged = False
+
+    try:
+        delay = _hedge_delay(primary, operation)
+        pending = set(tasks)
+        while pending:
+            timeout = None if hedged or secondary is None else delay
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # 主提供商超过 p90 仍未返回，尝试发送对冲请求
+                hedged = True
+                if await _take_hedge_budget():
+                    logger.debug(f"发送对冲请求[{operation}]: {primary} 超过 {delay:.2f}s，追加 {secondary}")
+                    hedge_stats.incr(operation, "hedge_sent")
+                    task = asyncio.create_task(call(secondary))
+                    tasks[task] = secondary
+                    attempted.append(secondary)
+                    pending.add(task)
+                else:
+                    hedge_stats.incr(operation, "budget_exhausted")
+                continue
+
+            for task in done:
+                provider = tasks[task]
+                try:
+                    result = task.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"{provider} {operation} 失败: {e}")
+                    continue
+                if result:
+                    if hedged and len(attempted) > 1:
+                        hedge_stats.incr(operation, "hedge_won" if provider == secondary else "primary_won")
+                    return result, attempted, last_error
+
+        # 均失败或无结果（包括主提供商在对冲前就失败），交回调用方按顺序回退剩余提供商
+        return None, attempted, last_error
+    finally:
+        for task in tasks:
+            await _cancel(task)
+
+
+def get_hedge_stats() -> Dict[str, Any]:
+    """对冲请求统计"""
+    return hedge_stats.snapshot()
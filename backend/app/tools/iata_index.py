@@ -0,0 +1,236 @@
+"""
+离线城市/机场 IATA 代码索引
+数据来自同目录下的 iata_locations.json（城市与机场的名称、别名、拼音、国家），进程内加载一次后建立索引：
+- 精确：名称、别名、拼音、IATA 代码本身，以及去掉省份前缀与“市/地区”后缀的行政区划写法
+- 前缀：输入是某个名称的前缀（"乌鲁木" -> URC、"hangzh" -> HGH），或以某个中文名称开头（"杭州西湖" -> HGH）；
+  名称后紧跟路名时不算（"南京西路" 在上海，不对应 NKG）
+- 模糊：拉丁字母写法按编辑距离与英文名称/别名匹配（"hangzou" -> HGH）；安装 pypinyin 时中文输入转为拼音后
+  与拼音精确匹配（"杭洲" -> HGH）。拼音空间里未收录的城市很多（锦州 jinzhou 与济州 jizhou 只差一个字母），
+  因此拼音不参与编辑距离匹配
+多个候选对应不同代码时视为无法确定，交由调用方的后备路径（LLM 识别）处理。
+"""
+
+import bisect
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from loguru import logger
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # pragma: no cover
+    lazy_pinyin = None
+
+DATASET_PATH = Path(__file__).resolve().parent / "iata_locations.json"
+
+_NOISE_RE = re.compile(r"[\s'’\-_.,，、·()（）]+")
+_PROVINCE_PREFIX_RE = re.compile(r"^.{2,}?(?:省|自治区|特别行政区)")
+_ADMIN_SUFFIX_RE = re.compile(r"(?:市|地区|自治州)$")
+_CODE_RE = re.compile(r"^[a-z]{3}$")
+# 城市名后接方位 + 路/街等，是以城市命名的道路（南京西路、北京路），不指向该城市
+_STREET_RE = re.compile(r"^[东西南北中]?(?:路|街|大街|大道|巷|弄)")
+
+# 前缀匹配的最短输入长度（拉丁字母 / 中文）
+_MIN_PREFIX_ASCII = 3
+_MIN_PREFIX_CJK = 2
+
+
+@dataclass
+class IataLocation:
+    """数据集中的一个城市或机场"""
+    code: str
+    type: str
+    name: str
+    country: str
+    pinyin: str = ""
+    aliases: List[str] = field(default_factory=list)
+    city: Optional[str] = None
+
+
+@dataclass
+class IataMatch:
+    """索引查询结果；method 为 exact / admin / code / prefix / contains / fuzzy / pinyin"""
+    code: str
+    method: str
+    location: IataLocation
+
+
+def _normalize(text: str) -> str:
+    return _NOISE_RE.sub("", str(text or "")).lower()
+
+
+def _strip_admin(text: str) -> str:
+    """去掉省份前缀与行政区划后缀：浙江省杭州市 -> 杭州"""
+    stripped = _PROVINCE_PREFIX_RE.sub("", text) or text
+    return _ADMIN_SUFFIX_RE.sub("", stripped) or stripped
+
+
+def _within_distance(a: str, b: str, limit: int) -> bool:
+    """编辑距离是否不超过 limit（按行提前终止）"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+def _deletions(text: str, depth: int) -> Set[str]:
+    """删除至多 depth 个字符得到的全部变体（含原文）"""
+    variants = {text}
+    frontier = {text}
+    for _ in range(depth):
+        frontier = {item[:i] + item[i + 1:] for item in frontier for i in range(len(item))}
+        variants |= frontier
+    return variants
+
+
+def _fuzzy_limit(length: int) -> int:
+    """允许的编辑距离：过短的写法不做模糊匹配，避免误命中"""
+    if length < 5:
+        return 0
+    return 1 if length < 9 else 2
+
+
+class IataIndex:
+    """城市/机场 IATA 代码离线索引"""
+
+    def __init__(self, locations: List[IataLocation]):
+        self.locations = locations
+        # 名称/别名 -> 候选
+        self._names: Dict[str, List[IataLocation]] = {}
+        # 拼音 -> 候选
+        self._pinyin_keys: Dict[str, List[IataLocation]] = {}
+        self._codes: Dict[str, IataLocation] = {}
+        for location in locations:
+            keys = {_normalize(location.name), _normalize(_strip_admin(location.name))}
+            keys.update(_normalize(alias) for alias in location.aliases)
+            for key in filter(None, keys):
+                self._names.setdefault(key, []).append(location)
+            if location.pinyin:
+                self._pinyin_keys.setdefault(_normalize(location.pinyin), []).append(location)
+            # 城市条目优先作为代码本身的查询结果
+            code = location.code.lower()
+            if code not in self._codes or location.type == "city":
+                self._codes[code] = location
+        self._sorted_keys = sorted(set(self._names) | set(self._pinyin_keys))
+        # 英文名称/别名的删除变体 -> 名称：编辑距离不超过 d 的两个写法各删除至多 d 个字符后必有公共变体，
+        # 查询时只需校验共享变体的少量候选，不必逐个计算编辑距离
+        self._deletion_index: Dict[str, Set[str]] = {}
+        max_limit = _fuzzy_limit(1 << 16)
+        for key in self._names:
+            if key.isascii() and len(key) >= 4:
+                for variant in _deletions(key, max_limit):
+                    self._deletion_index.setdefault(variant, set()).add(key)
+        # 中文名称，用于“以某个名称开头”的匹配
+        self._cjk_names = {k for k in self._names if not k.isascii()}
+        self._cjk_max_len = max((len(k) for k in self._cjk_names), default=0)
+
+    @classmethod
+    def from_file(cls, path: Path = DATASET_PATH) -> "IataIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        locations = [IataLocation(**item) for item in data.get("locations", [])]
+        logger.debug(f"已加载IATA离线数据集: {len(locations)} 条, 来源: {path}")
+        return cls(locations)
+
+    @staticmethod
+    def _unique(candidates: List[IataLocation], method: str) -> Optional[IataMatch]:
+        """候选全部指向同一代码时返回；城市与其机场同时命中时以城市条目为准"""
+        codes: Set[str] = {c.code for c in candidates}
+        if len(codes) != 1:
+            return None
+        location = next((c for c in candidates if c.type == "city"), candidates[0])
+        return IataMatch(code=location.code, method=method, location=location)
+
+    def _candidates(self, key: str) -> List[IataLocation]:
+        # 名称/别名优先于拼音（"bali" 是巴厘岛的英文名，也是巴黎的拼音）
+        return self._names.get(key) or self._pinyin_keys.get(key) or []
+
+    def _exact(self, key: str) -> Optional[IataMatch]:
+        candidates = self._candidates(key)
+        return self._unique(candidates, "exact") if candidates else None
+
+    def _prefix(self, key: str) -> Optional[IataMatch]:
+        if len(key) < (_MIN_PREFIX_ASCII if key.isascii() else _MIN_PREFIX_CJK):
+            return None
+        candidates: List[IataLocation] = []
+        start = bisect.bisect_left(self._sorted_keys, key)
+        for name in self._sorted_keys[start:]:
+            if not name.startswith(key):
+                break
+            candidates.extend(self._candidates(name))
+        return self._unique(candidates, "prefix") if candidates else None
+
+    def _contains(self, key: str) -> Optional[IataMatch]:
+        """输入以某个中文名称开头（"杭州西湖" -> 杭州），取最长的名称；其后是路名时不匹配"""
+        if key.isascii():
+            return None
+        for length in range(min(len(key) - 1, self._cjk_max_len), _MIN_PREFIX_CJK - 1, -1):
+            if key[:length] in self._cjk_names:
+                if _STREET_RE.match(key[length:]):
+                    return None
+                return self._unique(self._names[key[:length]], "contains")
+        return None
+
+    def _fuzzy(self, key: str) -> Optional[IataMatch]:
+        limit = _fuzzy_limit(len(key))
+        if not limit:
+            return None
+        names: Set[str] = set()
+        for variant in _deletions(key, limit):
+            names |= self._deletion_index.get(variant, set())
+        candidates: List[IataLocation] = []
+        for name in names:
+            if _within_distance(key, name, limit):
+                candidates.extend(self._names[name])
+        return self._unique(candidates, "fuzzy") if candidates else None
+
+    def _pinyin(self, key: str) -> Optional[IataMatch]:
+        if lazy_pinyin is None or key.isascii():
+            return None
+        romanized = "".join(lazy_pinyin(_strip_admin(key)))
+        if not romanized.isascii():
+            return None
+        candidates = self._pinyin_keys.get(romanized)
+        return self._unique(candidates, "pinyin") if candidates else None
+
+    def lookup(self, query: str) -> Optional[IataMatch]:
+        """按 精确 -> 行政区划写法 -> IATA 代码 -> 前缀 -> 包含 -> 模糊/拼音 的顺序查询"""
+        key = _normalize(query)
+        if not key:
+            return None
+        match = self._exact(key)
+        if match:
+            return match
+        stripped = _normalize(_strip_admin(str(query).strip()))
+        if stripped and stripped != key:
+            match = self._exact(stripped)
+            if match:
+                match.method = "admin"
+                return match
+            key = stripped
+        if _CODE_RE.match(key) and key in self._codes:
+            location = self._codes[key]
+            return IataMatch(code=location.code, method="code", location=location)
+        return (
+            self._prefix(key)
+            or self._contains(key)
+            or (self._fuzzy(key) if key.isascii() else self._pinyin(key))
+        )
+
+    def resolve(self, query: str) -> Optional[str]:
+        """返回 IATA 代码；无法确定时返回 None"""
+        match = self.lookup(query)
+        return match.code if match else None
+
+
+iata_index = IataIndex.from_file()
@@ -0,0 +1,306 @@
+"""
+LLM 请求调度（跨进程令牌桶）
+Celery 各 worker 与 Web 进程共用 Redis 中的两个令牌桶：每分钟请求数（RPM）与每分钟 token 数（TPM），
+每次调用前按提示词估算 + max_tokens 预占 token，调用结束后按实际用量退还多占的部分（调用失败时整笔退还）。
+- 优先级：interactive（对话等用户在线等待的请求）高于 background（后台方案生成）。
+  后台请求需为交互请求保留一部分余量，且有交互请求在排队时让行
+- 接口返回 429 时清空桶，让所有进程一起退避，而不是各自重试
+- 排队等待时间按优先级统计（进程内 + Redis 汇总）
+Redis 不可用时不做限制，直接放行。
+"""
+
+import asyncio
+import hashlib
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.tokens import estimate_tokens
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+_STATS_KEY = "llm:scheduler:stats"
+# 单次等待的最长睡眠秒数，到点后重新检查（其他进程退还的 token 可能让请求提前放行）
+_MAX_POLL_INTERVAL = 1.0
+# 后台请求因交互请求排队而让行时的重试间隔（秒）
+_YIELD_INTERVAL = 0.2
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default=PRIORITY_BACKGROUND)
+
+# KEYS[1]=令牌桶哈希 KEYS[2]=排队中的交互请求（有序集合，分值为过期时间毫秒）
+# ARGV: rpm, tpm, 预占 token, 保留比例, 是否后台请求
+# 返回需要等待的毫秒数，0 表示已放行并扣减
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = math.min(tonumber(ARGV[3]), tpm)
+local reserve = tonumber(ARGV[4])
+local background = ARGV[5] == '1'
+if background then
+  redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+  if redis.call('ZCARD', KEYS[2]) > 0 then
+    return -1
+  end
+end
+local state = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts')
+local req = tonumber(state[1]) or rpm
+local tok = tonumber(state[2]) or tpm
+local ts = tonumber(state[3]) or now
+local elapsed = math.max(now - ts, 0)
+req = math.min(rpm, req + elapsed * rpm / 60000)
+tok = math.min(tpm, tok + elapsed * tpm / 60000)
+local need_req = 1
+local need_tok = cost
+if background then
+  need_req = math.min(need_req + rpm * reserve, math.max(rpm, 1))
+  need_tok = math.min(need_tok + tpm * reserve, tpm)
+end
+local wait = 0
+if rpm > 0 and req < need_req then
+  wait = math.max(wait, (need_req - req) * 60000 / rpm)
+end
+if tpm > 0 and tok < need_tok then
+  wait = math.max(wait, (need_tok - tok) * 60000 / tpm)
+end
+if wait == 0 then
+  if rpm > 0 then req = req - 1 end
+  if tpm > 0 then tok = tok - cost end
+end
+redis.call('HSET', KEYS[1], 'req', tostring(req), 'tok', tostring(tok), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 120000)
+return math.ceil(wait)
+"""
+
+# ARGV: tpm, 退还 token 数
+_REFUND_SCRIPT = """
+local tok = tonumber(redis.call('HGET', KEYS[1], 'tok'))
+if tok == nil then
+  return 0
+end
+tok = math.min(tonumber(ARGV[1]), tok + tonumber(ARGV[2]))
+redis.call('HSET', KEYS[1], 'tok', tostring(tok))
+return 1
+"""
+
+# 收到 429 后清空两个桶，按正常速率重新填充
+_DRAIN_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('HSET', KEYS[1], 'req', '0', 'tok', '0', 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 120000)
+return 1
+"""
+
+
+@contextmanager
+def llm_priority(priority: str):
+    """上下文内的 LLM 请求使用指定优先级（interactive / background）"""
+    token = _priority.set(priority if priority in PRIORITIES else PRIORITY_BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+    """调用前估算本次请求占用的 token：提示词 + 输出上限（与服务端 TPM 的计算方式一致）"""
+    prompt = sum(estimate_tokens(str(message.get("content") or "")) + 4 for message in messages)
+    return prompt + max(int(max_tokens or 0), 0)
+
+
+class SchedulerStats:
+    """排队等待统计（进程内）"""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {}
+        self._recent: Dict[str, Deque[float]] = {}
+        self._window = window
+
+    def record(self, priority: str, waited: float, timed_out: bool = False):
+        with self._lock:
+            counters = self._counters.setdefault(
+                priority, {"requests": 0, "throttled": 0, "timeouts": 0, "wait_seconds": 0.0, "max_wait": 0.0}
+            )
+            counters["requests"] += 1
+            counters["wait_seconds"] += waited
+            counters["max_wait"] = max(counters["max_wait"], waited)
+            if waited > 0:
+                counters["throttled"] += 1
+            if timed_out:
+                counters["timeouts"] += 1
+            self._recent.setdefault(priority, deque(maxlen=self._window)).append(waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            result = {}
+            for priority, counters in self._counters.items():
+                item = dict(counters)
+                requests = item["requests"]
+                item["avg_wait"] = round(item["wait_seconds"] / requests, 4) if requests else None
+                recent = sorted(self._recent.get(priority) or [])
+                item["p95_wait"] = round(recent[min(int(len(recent) * 0.95), len(recent) - 1)], 4) if recent else None
+                item["wait_seconds"] = round(item["wait_seconds"], 3)
+                item["max_wait"] = round(item["max_wait"], 3)
+                result[priority] = item
+            return result
+
+
+class LLMScheduler:
+    """跨进程 LLM 限速（RPM + TPM 令牌桶）"""
+
+    def __init__(self):
+        self.stats = SchedulerStats()
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.LLM_SCHEDULER_ENABLED) and (
+            settings.LLM_RPM_LIMIT > 0 or settings.LLM_TPM_LIMIT > 0
+        )
+
+    @staticmethod
+    def current_priority() -> str:
+        return _priority.get()
+
+    @staticmethod
+    def _bucket_key(scope: str) -> str:
+        # 同一 API 地址 + 模型共用一个桶
+        return f"llm:bucket:{hashlib.sha1(scope.encode('utf-8')).hexdigest()[:16]}"
+
+    @staticmethod
+    def _waiting_key(scope: str) -> str:
+        return f"{LLMScheduler._bucket_key(scope)}:interactive"
+
+    @staticmethod
+    def _reserve() -> float:
+        # 至多保留一半，保证后台请求总能推进
+        return min(max(float(settings.LLM_INTERACTIVE_RESERVE), 0.0), 0.5)
+
+    async def acquire(self, scope: str, tokens: int, priority: Optional[str] = None) -> float:
+        """等待令牌桶放行，返回排队秒数；超过 LLM_SCHEDULER_MAX_WAIT 后直接放行"""
+        if not self.enabled():
+            return 0.0
+        priority = priority or self.current_priority()
+        background = priority != PRIORITY_INTERACTIVE
+        started = time.perf_counter()
+        deadline = started + max(float(settings.LLM_SCHEDULER_MAX_WAIT), 0.0)
+        client = None
+        waiter: Optional[str] = None
+        throttled = timed_out = False
+        try:
+            while True:
+                try:
+                    client = client or await get_redis()
+                    wait_ms = int(await client.eval(
+                        _TAKE_SCRIPT, 2, self._bucket_key(scope), self._waiting_key(scope),
+                        int(settings.LLM_RPM_LIMIT), int(settings.LLM_TPM_LIMIT), int(tokens),
+                        self._reserve(), 1 if background else 0,
+                    ))
+                except Exception as e:
+                    logger.debug(f"LLM限速不可用，直接放行: {e}")
+                    break
+                if wait_ms == 0:
+                    break
+                now = time.perf_counter()
+                if now >= deadline:
+                    timed_out = True
+                    logger.warning(f"LLM请求排队超过 {settings.LLM_SCHEDULER_MAX_WAIT}s，直接放行（{priority}）")
+                    break
+                if not background and waiter is None:
+                    waiter = uuid.uuid4().hex
+                    expires = (time.time() + float(settings.LLM_SCHEDULER_MAX_WAIT) + 5) * 1000
+                    await client.zadd(self._waiting_key(scope), {waiter: expires})
+                throttled = True
+                delay = _YIELD_INTERVAL if wait_ms < 0 else wait_ms / 1000
+                # 加少量抖动，避免多个进程同一时刻重试
+                await asyncio.sleep(min(delay * (1 + random.random() * 0.1), _MAX_POLL_INTERVAL, deadline - now))
+        finally:
+            if waiter is not None:
+                try:
+                    await client.zrem(self._waiting_key(scope), waiter)
+                except Exception as e:
+                    logger.debug(f"移除LLM排队标记失败: {e}")
+        waited = time.perf_counter() - started if throttled else 0.0
+        await self._record(priority, waited, timed_out)
+        return waited
+
+    async def refund(self, scope: str, reserved: int, used: Optional[int]):
+        """按实际用量退还多预占的 token"""
+        if not self.enabled() or settings.LLM_TPM_LIMIT <= 0 or used is None:
+            return
+        unused = int(reserved) - int(used)
+        if unused <= 0:
+            return
+        try:
+            client = await get_redis()
+            await client.eval(_REFUND_SCRIPT, 1, self._bucket_key(scope), int(settings.LLM_TPM_LIMIT), unused)
+        except Exception as e:
+            logger.debug(f"退还LLM令牌失败: {e}")
+
+    async def report_rate_limited(self, scope: str):
+        """接口返回 429：清空令牌桶，所有进程按填充速率一起退避"""
+        if not self.enabled():
+            return
+        try:
+            client = await get_redis()
+            await client.eval(_DRAIN_SCRIPT, 1, self._bucket_key(scope))
+            logger.warning("LLM接口限流（429），已清空共享令牌桶")
+        except Exception as e:
+            logger.debug(f"清空LLM令牌桶失败: {e}")
+
+    async def _record(self, priority: str, waited: float, timed_out: bool):
+        self.stats.record(priority, waited, timed_out)
+        try:
+            client = await get_redis()
+            pipe = client.pipeline()
+            pipe.hincrby(_STATS_KEY, f"{priority}:requests", 1)
+            if waited > 0:
+                pipe.hincrby(_STATS_KEY, f"{priority}:throttled", 1)
+                pipe.hincrbyfloat(_STATS_KEY, f"{priority}:wait_seconds", round(waited, 3))
+            if timed_out:
+                pipe.hincrby(_STATS_KEY, f"{priority}:timeouts", 1)
+            await pipe.execute()
+        except Exception as e:
+            logger.debug(f"记录LLM排队统计失败: {e}")
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """排队统计：本进程明细 + 所有进程汇总"""
+        shared: Dict[str, Dict[str, float]] = {}
+        try:
+            client = await get_redis()
+            raw = await client.hgetall(_STATS_KEY)
+            for field, value in (raw or {}).items():
+                field = field.decode() if isinstance(field, bytes) else field
+                value = value.decode() if isinstance(value, bytes) else value
+                priority, _, name = field.partition(":")
+                number = float(value)
+                shared.setdefault(priority, {})[name] = int(number) if number.is_integer() else round(number, 3)
+        except Exception as e:
+            logger.debug(f"读取LLM排队统计失败: {e}")
+        for item in shared.values():
+            requests = item.get("requests", 0)
+            item["avg_wait"] = round(item.get("wait_seconds", 0) / requests, 4) if requests else None
+        return {
+            "enabled": self.enabled(),
+            "rpm_limit": settings.LLM_RPM_LIMIT,
+            "tpm_limit": settings.LLM_TPM_LIMIT,
+            "interactive_reserve": self._reserve(),
+            "process": self.stats.snapshot(),
+            "shared": shared,
+        }
+
+
+llm_scheduler = LLMScheduler()
@@ -6,12 +6,14 @@ MCP (Model Control Protocol) 客户端
 import asyncio
 import os
 from typing import List, Dict, Any, Optional
-from datetime import date, datetime
+from datetime import date
 from loguru import logger
 import httpx
 import json
 
 from app.core.config import settings
+from app.tools.amadeus_cache import amadeus_token_cache, iata_code_cache
+from app.tools.iata_index import iata_index
 
 
 class MCPClient:
@@ -28,10 +30,9 @@ class MCPClient:
             proxies={}  # 禁用代理
         )
         self.base_url = "https://api.example.com"  # 示例API地址
-        self._amadeus_token = None
-        self._token_expires_at = None
         self.session = None
-        self.city_code_cache = {}  # 城市代码缓存
+        # 城市代码缓存（进程内共享，另有 Redis 跨进程共享，见 app.tools.amadeus_cache）
+        self.city_code_cache = iata_code_cache.local
     
     async def get_flights(
         self, 
@@ -68,14 +69,16 @@ class MCPClient:
             return []
     
     async def _get_amadeus_token(self) -> Optional[str]:
-        """获取Amadeus API访问令牌"""
+        """获取Amadeus API访问令牌（跨进程共享，过期或被拒绝时才由一个 worker 请求新令牌）"""
+        try:
+            return await amadeus_token_cache.get_token(self._request_amadeus_token)
+        except Exception as e:
+            logger.error(f"获取共享Amadeus API令牌异常: {e}")
+            return None
+
+    async def _request_amadeus_token(self) -> Optional[tuple]:
+        """向Amadeus请求新的访问令牌，返回 (令牌, 有效秒数)"""
         try:
-            # 检查现有令牌是否有效
-            if self._amadeus_token and self._token_expires_at:
-                if datetime.now().timestamp() < self._token_expires_at:
-                    logger.info("使用现有的有效令牌")
-                    return self._amadeus_token
-            
             logger.info("开始获取新的Amadeus API令牌...")
             
             # 获取新令牌
@@ -104,12 +107,11 @@ class MCPClient:
             
             if response.status_code == 200:
                 token_data = response.json()
-                self._amadeus_token = token_data.get("access_token")
-                expires_in = token_data.get("expires_in", 3600)  # 默认1小时
-                self._token_expires_at = datetime.now().timestamp() + expires_in - 60  # 提前1分钟过期
+                access_token = token_data.get("access_token")
+                expires_in = int(token_data.get("expires_in", 3600))  # 默认1小时
                 
                 logger.info("成功获取Amadeus API访问令牌")
-                return self._amadeus_token
+                return (access_token, expires_in) if access_token else None
             else:
                 logger.error(f"获取Amadeus API令牌失败: {response.status_code}")
                 logger.error(f"响应内容: {response.text}")
@@ -180,7 +182,7 @@ class MCPClient:
                 return []
             elif response.status_code == 401:
                 logger.error("Amadeus API认证失败，令牌可能已过期")
-                self._amadeus_token = None  # 清除无效令牌
+                await amadeus_token_cache.invalidate(token)  # 作废共享的无效令牌
                 return []
             else:
                 logger.error(f"Amadeus API错误: {response.status_code} - {response.text}")
@@ -432,13 +434,12 @@ class MCPClient:
     
 
     async def _get_city_code_with_llm(self, city: str) -> Optional[str]:
-        """使用LLM获取城市IATA代码"""
+        """使用LLM获取城市IATA代码（结果跨进程共享，同一城市并发识别只调用一次LLM）"""
+        return await iata_code_cache.get_code(city, lambda: self._recognize_city_code_with_llm(city))
+
+    async def _recognize_city_code_with_llm(self, city: str) -> Optional[str]:
+        """调用LLM识别城市IATA代码（不经过缓存）"""
         try:
-            # 检查缓存
-            if city in self.city_code_cache:
-                logger.info(f"从缓存获取城市代码: {city} -> {self.city_code_cache[city]}")
-                return self.city_code_cache[city]
-            
             # 导入OpenAI客户端
             from app.tools.openai_client import openai_client
             
@@ -499,7 +500,6 @@ IATA代码是国际航空运输协会制定的三字母机场代码，用于标
                     
                     # 只有置信度足够高才缓存和返回
                     if confidence >= 0.8:
-                        self.city_code_cache[city] = iata_code
                         logger.info(f"LLM识别城市代码: {city} -> {iata_code} (置信度: {confidence})")
                         return iata_code
                     else:
@@ -518,162 +518,25 @@ IATA代码是国际航空运输协会制定的三字母机场代码，用于标
             return None
 
     def _get_city_code(self, city: str) -> Optional[str]:
-        """获取城市代码（保留原有硬编码映射作为后备）"""
-        city_codes = {
-            # 中国大陆主要城市
-            "北京": "PEK",
-            "上海": "PVG", 
-            "广州": "CAN",
-            "深圳": "SZX",
-            "成都": "CTU",
-            "杭州": "HGH",
-            "南京": "NKG",
-            "武汉": "WUH",
-            "西安": "XIY",
-            "重庆": "CKG",
-            "厦门": "XMN",
-            "青岛": "TAO",
-            "大连": "DLC",
-            "昆明": "KMG",
-            "长沙": "CSX",
-            "沈阳": "SHE",
-            "哈尔滨": "HRB",
-            "长春": "CGQ",
-            "石家庄": "SJW",
-            "太原": "TYN",
-            "呼和浩特": "HET",
-            "兰州": "LHW",
-            "西宁": "XNN",
-            "银川": "INC",
-            "乌鲁木齐": "URC",
-            "拉萨": "LXA",
-            "天津": "TSN",
-            "济南": "TNA",
-            "郑州": "CGO",
-            "合肥": "HFE",
-            "南昌": "KHN",
-            "福州": "FOC",
-            "海口": "HAK",
-            "三亚": "SYX",
-            "南宁": "NNG",
-            "贵阳": "KWE",
-            "桂林": "KWL",
-            
-            # 港澳台
-            "香港": "HKG",
-            "台北": "TPE",
-            "高雄": "KHH",
-            "澳门": "MFM",
-            
-            # 亚洲主要城市
-            "东京": "NRT",
-            "大阪": "KIX",
-            "首尔": "ICN",
-            "釜山": "PUS",
-            "曼谷": "BKK",
-            "新加坡": "SIN",
-            "吉隆坡": "KUL",
-            "雅加达": "CGK",
-            "马尼拉": "MNL",
-            "胡志明市": "SGN",
-            "河内": "HAN",
-            "金边": "PNH",
-            "仰光": "RGN",
-            "达卡": "DAC",
-            "加德满都": "KTM",
-            "科伦坡": "CMB",
-            "德里": "DEL",
-            "孟买": "BOM",
-            "班加罗尔": "BLR",
-            "迪拜": "DXB",
-            "多哈": "DOH",
-            "阿布扎比": "AUH",
-            "科威特": "KWI",
-            "利雅得": "RUH",
-            "特拉维夫": "TLV",
-            
-            # 欧洲主要城市
-            "伦敦": "LHR",
-            "巴黎": "CDG",
-            "法兰克福": "FRA",
-            "阿姆斯特丹": "AMS",
-            "苏黎世": "ZUR",
-            "维也纳": "VIE",
-            "罗马": "FCO",
-            "米兰": "MXP",
-            "马德里": "MAD",
-            "巴塞罗那": "BCN",
-            "莫斯科": "SVO",
-            "圣彼得堡": "LED",
-            "伊斯坦布尔": "IST",
-            "雅典": "ATH",
-            "布拉格": "PRG",
-            "华沙": "WAW",
-            "布达佩斯": "BUD",
-            "斯德哥尔摩": "ARN",
-            "哥本哈根": "CPH",
-            "奥斯陆": "OSL",
-            "赫尔辛基": "HEL",
-            
-            # 北美主要城市
-            "纽约": "JFK",
-            "洛杉矶": "LAX",
-            "芝加哥": "ORD",
-            "旧金山": "SFO",
-            "西雅图": "SEA",
-            "波士顿": "BOS",
-            "华盛顿": "DCA",
-            "迈阿密": "MIA",
-            "拉斯维加斯": "LAS",
-            "多伦多": "YYZ",
-            "温哥华": "YVR",
-            "蒙特利尔": "YUL",
-            
-            # 大洋洲主要城市
-            "悉尼": "SYD",
-            "墨尔本": "MEL",
-            "布里斯班": "BNE",
-            "珀斯": "PER",
-            "奥克兰": "AKL",
-            
-            # 非洲主要城市
-            "开罗": "CAI",
-            "约翰内斯堡": "JNB",
-            "开普敦": "CPT",
-            "卡萨布兰卡": "CMN",
-            "内罗毕": "NBO",
-            
-            # 南美主要城市
-            "圣保罗": "GRU",
-            "里约热内卢": "GIG",
-            "布宜诺斯艾利斯": "EZE",
-            "利马": "LIM",
-            "圣地亚哥": "SCL"
-        }
-        
-        # 首先尝试精确匹配
-        if city in city_codes:
-            return city_codes[city]
-        
-        # 尝试模糊匹配（去除空格和常见后缀）
-        city_clean = city.replace(" ", "").replace("市", "").replace("省", "")
-        for key, code in city_codes.items():
-            if key.replace(" ", "") == city_clean:
-                return code
-        
-        # 如果都没有匹配，记录警告并返回None
+        """从离线IATA索引获取城市代码（精确/前缀/模糊/拼音匹配）"""
+        match = iata_index.lookup(city)
+        if match:
+            if match.method != "exact":
+                logger.debug(f"离线IATA索引{match.method}匹配: {city} -> {match.location.name} ({match.code})")
+            return match.code
+
         logger.warning(f"未找到城市 '{city}' 的IATA代码")
         return None
 
     async def get_city_code(self, city: str) -> Optional[str]:
         """获取城市IATA代码（智能版本）"""
-        # 首先尝试硬编码映射（快速且可靠）
+        # 首先查询离线索引（快速且可靠）
         code = self._get_city_code(city)
         if code:
             return code
         
-        # 如果硬编码映射失败，尝试使用LLM
-        logger.info(f"硬编码映射未找到 '{city}'，尝试使用LLM识别")
+        # 离线索引无法确定时，才使用LLM识别
+        logger.info(f"离线IATA索引未找到 '{city}'，尝试使用LLM识别")
         llm_code = await self._get_city_code_with_llm(city)
         if llm_code:
             return llm_code
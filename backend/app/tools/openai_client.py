@@ -1,13 +1,73 @@
 """
 OpenAI客户端工具
 支持自定义API地址和配置
+AsyncOpenAI 按 (base_url, api_key) 复用，长连接池按事件循环隔离：
+Web 进程在 lifespan 关闭时释放，Celery 任务在 run_coro 结束时释放。
 """
 
 import openai
-from typing import Optional, Dict, Any, List, AsyncGenerator
+import httpx
+import weakref
+from typing import Optional, Dict, Any, List, AsyncGenerator, Tuple
 from loguru import logger
 import asyncio
 from app.core.config import settings
+from app.core.tokens import estimate_tokens
+from app.tools.llm_scheduler import llm_scheduler, estimate_request_tokens
+
+_async_clients_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[Optional[str], str], openai.AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_openai(api_key: str, base_url: Optional[str], timeout: float) -> openai.AsyncOpenAI:
+    """获取当前事件循环中 (base_url, api_key) 对应的共享 AsyncOpenAI 客户端"""
+    loop = asyncio.get_running_loop()
+    clients = _async_clients_by_loop.get(loop)
+    if clients is None:
+        clients = {}
+        _async_clients_by_loop[loop] = clients
+    key = (base_url, api_key)
+    client = clients.get(key)
+    if client is None or client.is_closed():
+        max_connections = max(settings.OPENAI_HTTP_MAX_CONNECTIONS, 1)
+        client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            http_client=httpx.AsyncClient(
+                timeout=httpx.Timeout(timeout, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=min(settings.OPENAI_HTTP_MAX_KEEPALIVE, max_connections),
+                    keepalive_expiry=settings.OPENAI_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            ),
+        )
+        clients[key] = client
+        logger.debug(f"创建共享OpenAI客户端: {base_url or 'https://api.openai.com/v1'}")
+    return client
+
+
+async def close_openai_clients():
+    """关闭当前事件循环中的全部共享 AsyncOpenAI 客户端"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    clients = _async_clients_by_loop.pop(loop, None) or {}
+    for (base_url, _), client in clients.items():
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"关闭共享OpenAI客户端失败: {base_url}, 错误: {e}")
+    if clients:
+        logger.debug(f"已关闭 {len(clients)} 个共享OpenAI客户端")
+
+
+def reset_openai_clients():
+    """丢弃继承自父进程的客户端引用（Celery prefork 子进程启动时调用）"""
+    _async_clients_by_loop.clear()
 
 
 class OpenAIClient:
@@ -224,63 +284,125 @@ class OpenAIClient:
             logger.error(f"优化旅行计划失败: {e}")
             raise
     
+    def _get_async_client(self) -> openai.AsyncOpenAI:
+        return get_async_openai(
+            api_key=self.api_key,
+            base_url=self.api_base if self.api_base != "https://api.openai.com/v1" else None,
+            timeout=float(self.timeout),
+        )
+
+    def _rate_scope(self) -> str:
+        return f"{self.api_base}|{self.model}"
+
     async def _call_api(
         self, 
         messages: List[Dict[str, str]], 
+        priority: Optional[str] = None,
         **kwargs
     ) -> Any:
-        """调用OpenAI API"""
+        """调用OpenAI API（priority 为 interactive / background，默认取当前上下文）"""
+        max_tokens = kwargs.get('max_tokens', self.max_tokens)
+        scope = self._rate_scope()
+        reserved = estimate_request_tokens(messages, max_tokens)
+        acquired = False
+        # 实际用量；调用失败（超时、5xx、连接错误、取消）时为 0，整笔退还预占的 token
+        used: Optional[int] = 0
         try:
-            # 使用异步客户端
-            client = openai.AsyncOpenAI(
-                api_key=self.api_key,
-                base_url=self.api_base if self.api_base != "https://api.openai.com/v1" else None,
-                timeout=self.timeout
-            )
+            # 跨进程 RPM/TPM 限速
+            await llm_scheduler.acquire(scope, reserved, priority)
+            acquired = True
+
+            # 使用共享的异步客户端（复用连接池）
+            client = self._get_async_client()
             
             response = await client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                max_tokens=kwargs.get('max_tokens', self.max_tokens),
+                max_tokens=max_tokens,
                 temperature=kwargs.get('temperature', self.temperature),
                 **{k: v for k, v in kwargs.items() if k not in ['max_tokens', 'temperature']}
             )
+
+            used = getattr(getattr(response, "usage", None), "total_tokens", None)
+            if used is None:
+                # 接口未返回用量时按提示词 + 输出内容估算
+                content = "".join(
+                    getattr(getattr(choice, "message", None), "content", None) or ""
+                    for choice in (getattr(response, "choices", None) or [])
+                )
+                used = estimate_request_tokens(messages, 0) + estimate_tokens(content)
             
             return response
             
+        except openai.RateLimitError as e:
+            # 令牌桶已清空，不再退还
+            used = None
+            await llm_scheduler.report_rate_limited(scope)
+            logger.error(f"调用OpenAI API失败（限流）: {e}")
+            raise
         except Exception as e:
             logger.error(f"调用OpenAI API失败: {e}")
             raise
+        finally:
+            if acquired:
+                await llm_scheduler.refund(scope, reserved, used)
     
     async def _call_api_stream(
         self, 
         messages: List[Dict[str, str]], 
+        priority: Optional[str] = None,
         **kwargs
     ):
-        """调用OpenAI流式API"""
+        """调用OpenAI流式API（流结束或出错后，按提示词 + 已输出内容估算用量并退还多占的 token）"""
+        max_tokens = kwargs.get('max_tokens', self.max_tokens)
+        scope = self._rate_scope()
+        reserved = estimate_request_tokens(messages, max_tokens)
+        acquired = rate_limited = False
+        streamed: List[str] = []
+        reported: Optional[int] = None
         try:
-            # 使用异步客户端
-            client = openai.AsyncOpenAI(
-                api_key=self.api_key,
-                base_url=self.api_base if self.api_base != "https://api.openai.com/v1" else None,
-                timeout=self.timeout
-            )
+            # 跨进程 RPM/TPM 限速
+            await llm_scheduler.acquire(scope, reserved, priority)
+            acquired = True
+
+            # 使用共享的异步客户端（复用连接池）
+            client = self._get_async_client()
             
             stream = await client.chat.completions.create(
                 model=self.model,
                 messages=messages,
-                max_tokens=kwargs.get('max_tokens', self.max_tokens),
+                max_tokens=max_tokens,
                 temperature=kwargs.get('temperature', self.temperature),
                 stream=True,
                 **{k: v for k, v in kwargs.items() if k not in ['max_tokens', 'temperature', 'stream']}
             )
             
             async for chunk in stream:
+                # 部分服务会在最后一个分片中返回用量
+                total = getattr(getattr(chunk, "usage", None), "total_tokens", None)
+                if total is not None:
+                    reported = total
+                for choice in getattr(chunk, "choices", None) or []:
+                    content = getattr(getattr(choice, "delta", None), "content", None)
+                    if content:
+                        streamed.append(content)
                 yield chunk
             
+        except openai.RateLimitError as e:
+            rate_limited = True
+            await llm_scheduler.report_rate_limited(scope)
+            logger.error(f"调用OpenAI流式API失败（限流）: {e}")
+            raise
         except Exception as e:
             logger.error(f"调用OpenAI流式API失败: {e}")
             raise
+        finally:
+            # 429 时令牌桶已清空，不再退还
+            if acquired and not rate_limited:
+                used = reported
+                if used is None:
+                    used = estimate_request_tokens(messages, 0) + estimate_tokens("".join(streamed))
+                await llm_scheduler.refund(scope, reserved, used)
     
     def _summarize_data(self, data: Dict[str, Any]) -> str:
         """总结数据"""
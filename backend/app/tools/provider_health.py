@@ -0,0 +1,195 @@
+"""
+地图提供商健康度跟踪
+按（提供商, 操作）记录 EWMA 延迟与错误率、最近延迟样本和熔断状态，
+供 UnifiedMapService 动态调整提供商顺序并跳过熔断中的提供商。
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.circuit_breaker import CircuitBreaker
+
+
+class ProviderStats:
+    """单个（提供商, 操作）的滚动统计"""
+
+    def __init__(self, provider: str, operation: str):
+        self.provider = provider
+        self.operation = operation
+        self.ewma_latency: Optional[float] = None  # 秒
+        self.ewma_error: float = 0.0  # 0~1
+        self.samples = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.latencies: Deque[float] = deque(maxlen=max(settings.MAP_PROVIDER_LATENCY_WINDOW, 1))
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.MAP_PROVIDER_CIRCUIT_FAILURES,
+            recovery_timeout=settings.MAP_PROVIDER_CIRCUIT_RECOVERY,
+            success_threshold=1,
+        )
+
+    def observe(self, latency: float, ok: bool, error: Optional[str] = None, cancelled: bool = False):
+        alpha = settings.MAP_PROVIDER_EWMA_ALPHA
+        if cancelled:
+            # 被取消的调用（如对冲请求失败方）真实延迟不低于已耗时，作为删失样本只能抬高 EWMA 延迟；
+            # 不计入延迟分位数样本，也不影响错误率与熔断
+            if self.ewma_latency is None or latency > self.ewma_latency:
+                self.ewma_latency = (
+                    latency if self.ewma_latency is None
+                    else alpha * latency + (1 - alpha) * self.ewma_latency
+                )
+            return
+        self.samples += 1
+        self.latencies.append(latency)
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = alpha * latency + (1 - alpha) * self.ewma_latency
+        self.ewma_error = alpha * (0.0 if ok else 1.0) + (1 - alpha) * self.ewma_error
+        if ok:
+            # CLOSED 状态下的成功也清零连续失败数，熔断器只统计连续失败
+            self.breaker.on_success()
+            self.breaker.reset_failures()
+        else:
+            self.failures += 1
+            self.last_error = error
+            self.breaker.on_failure()
+
+    def score(self) -> Optional[float]:
+        """路由评分（越小越好）：EWMA 延迟 + 错误率 × 惩罚秒数；样本不足时返回 None"""
+        if self.samples < settings.MAP_PROVIDER_MIN_SAMPLES or self.ewma_latency is None:
+            return None
+        return self.ewma_latency + self.ewma_error * settings.MAP_PROVIDER_ERROR_PENALTY
+
+    def percentile(self, q: float) -> Optional[float]:
+        """最近样本的延迟分位数（秒）"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        p50 = self.percentile(0.5)
+        p90 = self.percentile(0.9)
+        score = self.score()
+        return {
+            "provider": self.provider,
+            "samples": self.samples,
+            "failures": self.failures,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "ewma_error_rate": round(self.ewma_error, 4),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p90_ms": round(p90 * 1000, 1) if p90 is not None else None,
+            "score": round(score, 4) if score is not None else None,
+            "circuit": self.breaker.get_state(),
+            "last_error": self.last_error,
+        }
+
+
+class ProviderHealthTracker:
+    """进程内提供商健康度注册表（线程安全，Web 进程与 Celery worker 各自独立统计）"""
+
+    def __init__(self):
+        self._stats: Dict[Tuple[str, str], ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, provider: str, operation: str) -> ProviderStats:
+        key = (provider, operation)
+        stats = self._stats.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(key, ProviderStats(provider, operation))
+        return stats
+
+    def record(
+        self,
+        provider: str,
+        operation: str,
+        latency: float,
+        ok: bool,
+        error: Optional[str] = None,
+        cancelled: bool = False,
+    ):
+        stats = self._get(provider, operation)
+        with self._lock:
+            previous_state = stats.breaker.get_state()
+            stats.observe(latency, ok, error, cancelled)
+            state = stats.breaker.get_state()
+        if state != previous_state:
+            logger.warning(f"地图提供商熔断状态变化: {provider}/{operation} {previous_state} -> {state}")
+
+    async def track(self, provider: str, operation: str, coro: Awaitable[Any]) -> Any:
+        """执行一次上游调用并记录耗时与成败（异常视为失败并继续抛出）"""
+        started = time.perf_counter()
+        try:
+            result = await coro
+        except asyncio.CancelledError:
+            self.record(provider, operation, time.perf_counter() - started, True, cancelled=True)
+            raise
+        except Exception as e:
+            self.record(provider, operation, time.perf_counter() - started, False, str(e)[:200])
+            raise
+        self.record(provider, operation, time.perf_counter() - started, True)
+        return result
+
+    def is_available(self, provider: str, operation: str) -> bool:
+        """熔断器是否允许调用（OPEN 超过恢复时间后转为 HALF_OPEN 放行探测请求）"""
+        stats = self._get(provider, operation)
+        with self._lock:
+            return stats.breaker.call_allowed()
+
+    def latency_percentile(self, provider: str, operation: str, q: float) -> Optional[float]:
+        stats = self._stats.get((provider, operation))
+        if stats is None or stats.samples < settings.MAP_PROVIDER_MIN_SAMPLES:
+            return None
+        with self._lock:
+            return stats.percentile(q)
+
+    def rank(self, operation: str, providers: List[str]) -> List[str]:
+        """按评分排序提供商并剔除熔断中的提供商
+
+        样本不足的提供商按先验延迟参与排序：健康的主提供商保持在前，
+        主提供商变慢后未探测过的提供商自然前移获得探测机会；
+        评分相同时保持配置顺序；全部熔断时退回配置顺序，避免直接失败。
+        """
+        if not settings.MAP_PROVIDER_ROUTING_ENABLED:
+            return list(providers)
+        available = [p for p in providers if self.is_available(p, operation)]
+        if not available:
+            return list(providers)
+
+        def sort_key(item: Tuple[int, str]):
+            index, provider = item
+            stats = self._stats.get((provider, operation))
+            score = stats.score() if stats is not None else None
+            return (settings.MAP_PROVIDER_PRIOR_LATENCY if score is None else score, index)
+
+        ranked = [p for _, p in sorted(enumerate(available), key=sort_key)]
+        if ranked != list(providers):
+            logger.debug(f"地图提供商动态顺序[{operation}]: {ranked}")
+        return ranked
+
+    def snapshot(self, providers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """按操作汇总的健康度与当前排名"""
+        with self._lock:
+            items = list(self._stats.values())
+        operations: Dict[str, Any] = {}
+        for stats in items:
+            operations.setdefault(stats.operation, {"providers": {}})["providers"][stats.provider] = stats.to_dict()
+        if providers:
+            for operation, data in operations.items():
+                data["ranking"] = self.rank(operation, providers)
+        return {
+            "routing_enabled": bool(settings.MAP_PROVIDER_ROUTING_ENABLED),
+            "operations": operations,
+        }
+
+
+provider_health = ProviderHealthTracker()
@@ -10,6 +10,7 @@ import re
 from typing import Dict, Any, List, Optional
 from loguru import logger
 from app.core.config import settings
+from app.core.http_clients import shared_http_client
 
 # 获取API密钥
 api_key = os.getenv('TIANDITU_API_KEY', getattr(settings, 'TIANDITU_API_KEY', ''))
@@ -105,7 +106,7 @@ async def map_geocode(address: str) -> Dict[str, Any]:
             "tk": api_key
         }
         
-        async with httpx.AsyncClient(timeout=30.0, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -180,7 +181,7 @@ async def map_directions(
                 "tk": api_key
             }
         
-        async with httpx.AsyncClient(timeout=30.0, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             
@@ -301,7 +302,7 @@ async def map_search_places(
             "tk": api_key
         }
         
-        async with httpx.AsyncClient(timeout=30.0, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             result = response.json()
@@ -356,7 +357,7 @@ async def map_static_image(
             "tk": api_key
         }
         
-        async with httpx.AsyncClient(timeout=30.0, proxies={}) as client:
+        async with shared_http_client(api_url) as client:
             response = await client.get(url, params=params)
             response.raise_for_status()
             return response.content
@@ -6,6 +6,11 @@
 from typing import Dict, Any, List, Optional
 from loguru import logger
 from app.core.config import settings
+from app.core.concurrency import run_limited
+from app.tools.geocode_context import coalesced_geocode, batch_coalesced_geocode
+from app.tools.provider_health import provider_health
+from app.tools.hedging import hedged_call, get_hedge_stats
+from app.services.geo_knowledge_store import geo_knowledge_store
 
 # 导入各地图服务
 from app.tools.baidu_maps_integration import (
@@ -22,61 +27,137 @@ from app.tools.tianditu_maps_integration import (
 )
 
 
+def get_provider_order() -> List[str]:
+    """配置的提供商顺序（主提供商在第一位，其后为回退顺序）"""
+    primary_provider = settings.MAP_PROVIDER
+    # 解析回退顺序字符串（逗号分隔）
+    fallback_str = settings.MAP_PROVIDER_FALLBACK
+    fallback_list = [p.strip() for p in fallback_str.split(",") if p.strip()]
+    
+    # 确保主提供商在第一位
+    if primary_provider in fallback_list:
+        fallback_list.remove(primary_provider)
+    return [primary_provider] + fallback_list
+
+
+def get_map_provider_health() -> Dict[str, Any]:
+    """提供商健康度与各操作的当前动态排名"""
+    order = get_provider_order()
+    snapshot = provider_health.snapshot(order)
+    snapshot["configured_order"] = order
+    snapshot["hedging"] = get_hedge_stats()
+    return snapshot
+
+
 class UnifiedMapService:
     """统一地图服务，支持多提供商回退"""
     
     def __init__(self):
         self.amap_client = AmapMCPClient()
-        # 获取回退顺序，确保主提供商在第一位
-        primary_provider = settings.MAP_PROVIDER
-        # 解析回退顺序字符串（逗号分隔）
-        fallback_str = settings.MAP_PROVIDER_FALLBACK
-        fallback_list = [p.strip() for p in fallback_str.split(",") if p.strip()]
-        
-        # 确保主提供商在第一位
-        if primary_provider in fallback_list:
-            fallback_list.remove(primary_provider)
-        self.provider_order = [primary_provider] + fallback_list
+        # 获取回退顺序，确保主提供商在第一位（实际调用顺序按健康度动态调整）
+        self.provider_order = get_provider_order()
         
         logger.info(f"地图服务提供商顺序: {self.provider_order}")
     
     async def geocode(self, address: str, city: str = "") -> Optional[Dict[str, Any]]:
         """
         地理编码 - 地址转坐标
-        支持多提供商回退
+        同一规范化地址的并发请求会合并为一次上游调用（请求级上下文 + 进程内 + Redis）
+        合并层未命中时先读地理知识库（Postgres），仍未命中或已过期才调用地图提供商
+        """
+        return await coalesced_geocode(
+            address,
+            city,
+            lambda: self._geocode_read_through(address, city),
+        )
+
+    async def batch_geocode(
+        self,
+        addresses: List[str],
+        city: str = "",
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        批量地理编码
+        去重后一次 MGET 读取共享缓存，未命中的地址以有限并发回源，新结果一次 pipeline 写回
+        
+        Returns:
+            {原始地址: 统一格式结果}，失败的地址对应 None
+        """
+        return await batch_coalesced_geocode(
+            addresses,
+            city,
+            lambda address: self._geocode_read_through(address, city),
+            concurrency=concurrency,
+        )
+
+    async def fill_missing_coordinates(self, items: List[Dict[str, Any]], city: str = "") -> List[Dict[str, Any]]:
+        """为缺少坐标的条目（酒店/景点/餐厅等）批量补全 coordinates，原地修改并返回"""
+        targets = []
+        for item in items:
+            coordinates = item.get("coordinates") or {}
+            if isinstance(coordinates, dict) and coordinates.get("lat") and coordinates.get("lng"):
+                continue
+            address = item.get("address")
+            if not address or address == "地址未知":
+                address = item.get("name")
+            if address:
+                targets.append((item, str(address)))
+        if not targets:
+            return items
+        
+        results = await self.batch_geocode([address for _, address in targets], city)
+        filled = 0
+        for item, address in targets:
+            result = results.get(address)
+            if result and result.get("latitude") and result.get("longitude"):
+                item["coordinates"] = {"lat": result["latitude"], "lng": result["longitude"]}
+                filled += 1
+        logger.info(f"批量补全坐标: {filled}/{len(targets)} 条")
+        return items
+
+    async def _geocode_read_through(self, address: str, city: str = "") -> Optional[Dict[str, Any]]:
+        """地理编码回源：地理知识库 -> 地图提供商（结果写回知识库，上游失败时使用过期数据兜底）"""
+        stored, fresh = await geo_knowledge_store.get_geocode(address, city)
+        if stored and fresh:
+            logger.debug(f"地理编码命中地理知识库: {address}")
+            return stored
+        
+        result = await self._geocode_with_fallback(address, city)
+        if result:
+            await geo_knowledge_store.save_geocode(address, city, result)
+            return result
+        
+        if stored:
+            logger.warning(f"地图提供商地理编码失败，使用地理知识库中的过期数据: {address}")
+            return stored
+        return None
+
+    async def _geocode_with_fallback(self, address: str, city: str = "") -> Optional[Dict[str, Any]]:
+        """
+        地理编码 - 地址转坐标
+        支持多提供商回退（按提供商健康度动态排序，跳过熔断中的提供商）
+        开启对冲时，主提供商超过其 p90 延迟未返回则同时请求下一个提供商
         """
         last_error = None
+        providers = provider_health.rank("geocode", self.provider_order)
+        
+        if settings.MAP_HEDGING_ENABLED and len(providers) > 1:
+            result, attempted, last_error = await hedged_call(
+                "geocode",
+                providers,
+                lambda provider: self._geocode_via(provider, address, city),
+            )
+            if result:
+                return result
+            providers = [p for p in providers if p not in attempted]
         
-        for provider in self.provider_order:
+        for provider in providers:
             try:
                 logger.debug(f"尝试使用 {provider} 进行地理编码: {address}")
-                
-                if provider == "amap":
-                    result = await self.amap_client.geocode(address, city)
-                    if result:
-                        return self._normalize_geocode_result(result, "amap")
-                
-                elif provider == "baidu":
-                    result = await baidu_geocode(address)
-                    if result and result.get("status") == 0:
-                        location = result.get("result", {}).get("location", {})
-                        if location:
-                            return self._normalize_geocode_result({
-                                "lng": location.get("lng"),
-                                "lat": location.get("lat"),
-                                "formatted_address": result.get("result", {}).get("formatted_address", address)
-                            }, "baidu")
-                
-                elif provider == "tianditu":
-                    result = await tianditu_geocode(address)
-                    if result and result.get("status") == "0":
-                        location = result.get("location", {})
-                        if location:
-                            return self._normalize_geocode_result({
-                                "lng": float(location.get("lon", 0)),
-                                "lat": float(location.get("lat", 0)),
-                                "formatted_address": location.get("keyWord", address)
-                            }, "tianditu")
+                result = await self._geocode_via(provider, address, city)
+                if result:
+                    return result
                 
             except Exception as e:
                 last_error = e
@@ -85,6 +166,41 @@ class UnifiedMapService:
         
         logger.error(f"所有地图提供商地理编码都失败: {address}, 最后错误: {last_error}")
         return None
+
+    async def _call(self, provider: str, operation: str, coro):
+        """调用上游：受提供商并发限制，并记录耗时与成败（不含排队等待时间）"""
+        return await run_limited(provider, provider_health.track(provider, operation, coro))
+
+    async def _geocode_via(self, provider: str, address: str, city: str = "") -> Optional[Dict[str, Any]]:
+        """使用指定提供商进行地理编码，无结果时返回 None"""
+        if provider == "amap":
+            result = await self._call("amap", "geocode", self.amap_client.geocode(address, city))
+            if result:
+                return self._normalize_geocode_result(result, "amap")
+        
+        elif provider == "baidu":
+            result = await self._call("baidu", "geocode", baidu_geocode(address))
+            if result and result.get("status") == 0:
+                location = result.get("result", {}).get("location", {})
+                if location:
+                    return self._normalize_geocode_result({
+                        "lng": location.get("lng"),
+                        "lat": location.get("lat"),
+                        "formatted_address": result.get("result", {}).get("formatted_address", address)
+                    }, "baidu")
+        
+        elif provider == "tianditu":
+            result = await self._call("tianditu", "geocode", tianditu_geocode(address))
+            if result and result.get("status") == "0":
+                location = result.get("location", {})
+                if location:
+                    return self._normalize_geocode_result({
+                        "lng": float(location.get("lon", 0)),
+                        "lat": float(location.get("lat", 0)),
+                        "formatted_address": location.get("keyWord", address)
+                    }, "tianditu")
+        
+        return None
     
     async def search_places_around(
         self,
@@ -96,7 +212,7 @@ class UnifiedMapService:
     ) -> List[Dict[str, Any]]:
         """
         周边搜索
-        支持多提供商回退
+        先读地理知识库（Postgres），未命中或已过期时调用地图提供商并写回，上游失败时使用过期数据兜底
         
         Args:
             location: 中心点坐标 "经度,纬度"
@@ -105,75 +221,52 @@ class UnifiedMapService:
             radius: 搜索半径（米）
             count: 返回数量
         """
+        stored, fresh = await geo_knowledge_store.get_poi_search(location, keywords, types, radius, count)
+        if stored and fresh:
+            logger.debug(f"周边搜索命中地理知识库: {keywords} @ {location}")
+            return stored
+        
+        places = await self._search_places_with_fallback(location, keywords, types, radius, count)
+        if places:
+            await geo_knowledge_store.save_poi_search(location, keywords, types, radius, count, places)
+            return places
+        
+        if stored:
+            logger.warning(f"地图提供商周边搜索失败，使用地理知识库中的过期数据: {keywords} @ {location}")
+            return stored
+        return []
+
+    async def _search_places_with_fallback(
+        self,
+        location: str,
+        keywords: str,
+        types: str,
+        radius: int,
+        count: int
+    ) -> List[Dict[str, Any]]:
+        """
+        周边搜索（直接调用地图提供商）
+        支持多提供商回退（按提供商健康度动态排序，跳过熔断中的提供商），可选对冲请求
+        """
         last_error = None
+        providers = provider_health.rank("search_places", self.provider_order)
         
-        for provider in self.provider_order:
+        if settings.MAP_HEDGING_ENABLED and len(providers) > 1:
+            places, attempted, last_error = await hedged_call(
+                "search_places",
+                providers,
+                lambda provider: self._search_places_via(provider, location, keywords, types, radius, count),
+            )
+            if places:
+                return places
+            providers = [p for p in providers if p not in attempted]
+        
+        for provider in providers:
             try:
                 logger.debug(f"尝试使用 {provider} 进行周边搜索: {keywords} @ {location}, types={types}")
-                
-                if provider == "amap":
-                    places = await self.amap_client.search_places_around(
-                        location=location,
-                        keywords=keywords,
-                        types=types,
-                        radius=radius,
-                        offset=count
-                    )
-                    if places:
-                        return [self._normalize_place_result(p, "amap") for p in places]
-                
-                elif provider == "baidu":
-                    result = await baidu_search_places(
-                        query=keywords or "景点",
-                        location=location,
-                        radius=str(radius),
-                        tag=types
-                    )
-                    if result and result.get("status") == 0:
-                        items = result.get("result", {}).get("items", [])
-                        if items:
-                            return [self._normalize_place_result(item, "baidu") for item in items[:count]]
-                
-                elif provider == "tianditu":
-                    # 天地图：优先使用类型编码，关键词作为补充
-                    from app.tools.tianditu_maps_integration import get_tianditu_type_code
-                    
-                    # 将高德/百度的类型编码转换为天地图编码
-                    tianditu_type = None
-                    if types:
-                        # 高德/百度到天地图的类型编码映射
-                        # 高德：110000=风景名胜, 050000=餐饮服务, 100000=住宿服务
-                        # 天地图：110xxx=餐饮, 120xxx=住宿, 需要查找景点编码
-                        type_mapping = {
-                            "110000": "180400",  # 风景名胜 - 天地图可能没有对应编码，需要关键词搜索
-                            "050000": "110100",  # 餐饮服务 -> 餐馆
-                            "100000": "120100",  # 住宿服务 -> 商业性住宿
-                            "140700": "160205",  # 科教文化服务（博物馆等）
-                        }
-                        tianditu_type = type_mapping.get(types)
-                        
-                        # 如果映射为None，尝试从关键词推断
-                        if tianditu_type is None and keywords:
-                            tianditu_type = get_tianditu_type_code(keywords)
-                    
-                    # 如果没有类型编码，尝试从关键词推断
-                    if not tianditu_type and keywords:
-                        tianditu_type = get_tianditu_type_code(keywords)
-                    
-                    # 调用天地图API
-                    # 策略：如果有类型编码，优先使用类型编码（关键词可选）
-                    #       如果没有类型编码，必须使用关键词
-                    result = await tianditu_search_places(
-                        location=location,
-                        radius=radius,
-                        count=count,
-                        data_types=tianditu_type,  # 优先使用类型编码
-                        keywords=keywords if (keywords and not tianditu_type) or (keywords and tianditu_type) else ""  # 有类型编码时关键词作为补充，无类型编码时关键词必需
-                    )
-                    if result and result.get("status", {}).get("infocode") == 1000:
-                        pois = result.get("pois", [])
-                        if pois:
-                            return [self._normalize_place_result(poi, "tianditu") for poi in pois[:count]]
+                places = await self._search_places_via(provider, location, keywords, types, radius, count)
+                if places:
+                    return places
                 
             except Exception as e:
                 last_error = e
@@ -182,6 +275,82 @@ class UnifiedMapService:
         
         logger.warning(f"所有地图提供商周边搜索都失败，最后错误: {last_error}")
         return []
+
+    async def _search_places_via(
+        self,
+        provider: str,
+        location: str,
+        keywords: str,
+        types: str,
+        radius: int,
+        count: int
+    ) -> List[Dict[str, Any]]:
+        """使用指定提供商进行周边搜索，无结果时返回空列表"""
+        if provider == "amap":
+            places = await self._call("amap", "search_places", self.amap_client.search_places_around(
+                location=location,
+                keywords=keywords,
+                types=types,
+                radius=radius,
+                offset=count
+            ))
+            if places:
+                return [self._normalize_place_result(p, "amap") for p in places]
+        
+        elif provider == "baidu":
+            result = await self._call("baidu", "search_places", baidu_search_places(
+                query=keywords or "景点",
+                location=location,
+                radius=str(radius),
+                tag=types
+            ))
+            if result and result.get("status") == 0:
+                items = result.get("result", {}).get("items", [])
+                if items:
+                    return [self._normalize_place_result(item, "baidu") for item in items[:count]]
+        
+        elif provider == "tianditu":
+            # 天地图：优先使用类型编码，关键词作为补充
+            from app.tools.tianditu_maps_integration import get_tianditu_type_code
+            
+            # 将高德/百度的类型编码转换为天地图编码
+            tianditu_type = None
+            if types:
+                # 高德/百度到天地图的类型编码映射
+                # 高德：110000=风景名胜, 050000=餐饮服务, 100000=住宿服务
+                # 天地图：110xxx=餐饮, 120xxx=住宿, 需要查找景点编码
+                type_mapping = {
+                    "110000": "180400",  # 风景名胜 - 天地图可能没有对应编码，需要关键词搜索
+                    "050000": "110100",  # 餐饮服务 -> 餐馆
+                    "100000": "120100",  # 住宿服务 -> 商业性住宿
+                    "140700": "160205",  # 科教文化服务（博物馆等）
+                }
+                tianditu_type = type_mapping.get(types)
+                
+                # 如果映射为None，尝试从关键词推断
+                if tianditu_type is None and keywords:
+                    tianditu_type = get_tianditu_type_code(keywords)
+            
+            # 如果没有类型编码，尝试从关键词推断
+            if not tianditu_type and keywords:
+                tianditu_type = get_tianditu_type_code(keywords)
+            
+            # 调用天地图API
+            # 策略：如果有类型编码，优先使用类型编码（关键词可选）
+            #       如果没有类型编码，必须使用关键词
+            result = await self._call("tianditu", "search_places", tianditu_search_places(
+                location=location,
+                radius=radius,
+                count=count,
+                data_types=tianditu_type,  # 优先使用类型编码
+                keywords=keywords if (keywords and not tianditu_type) or (keywords and tianditu_type) else ""  # 有类型编码时关键词作为补充，无类型编码时关键词必需
+            ))
+            if result and result.get("status", {}).get("infocode") == 1000:
+                pois = result.get("pois", [])
+                if pois:
+                    return [self._normalize_place_result(poi, "tianditu") for poi in pois[:count]]
+        
+        return []
     
     async def get_directions(
         self,
@@ -191,45 +360,16 @@ class UnifiedMapService:
     ) -> List[Dict[str, Any]]:
         """
         路线规划
-        支持多提供商回退
+        支持多提供商回退（按提供商健康度动态排序，跳过熔断中的提供商）
         """
         last_error = None
         
-        for provider in self.provider_order:
+        for provider in provider_health.rank("directions", self.provider_order):
             try:
                 logger.debug(f"尝试使用 {provider} 进行路线规划: {origin} -> {destination}")
-                
-                if provider == "amap":
-                    routes = await self.amap_client.get_directions(
-                        origin=origin,
-                        destination=destination,
-                        mode=mode
-                    )
-                    if routes:
-                        return routes
-                
-                elif provider == "baidu":
-                    result = await baidu_directions(
-                        origin=origin,
-                        destination=destination,
-                        model=mode
-                    )
-                    if result and result.get("status") == 0:
-                        routes = result.get("result", {}).get("routes", [])
-                        if routes:
-                            return [self._normalize_route_result(route, "baidu", mode) for route in routes[:3]]
-                
-                elif provider == "tianditu":
-                    result = await tianditu_directions(
-                        origin=origin,
-                        destination=destination,
-                        mode=mode
-                    )
-                    if result and result.get("status") == "0":
-                        # 天地图返回XML格式，需要解析
-                        # 这里简化处理，实际应该解析XML
-                        logger.warning("天地图路线规划返回XML格式，暂不支持解析")
-                        continue
+                routes = await self._directions_via(provider, origin, destination, mode)
+                if routes:
+                    return routes
                 
             except Exception as e:
                 last_error = e
@@ -238,6 +378,47 @@ class UnifiedMapService:
         
         logger.warning(f"所有地图提供商路线规划都失败，最后错误: {last_error}")
         return []
+
+    async def _directions_via(
+        self,
+        provider: str,
+        origin: str,
+        destination: str,
+        mode: str
+    ) -> List[Dict[str, Any]]:
+        """使用指定提供商进行路线规划，无结果时返回空列表"""
+        if provider == "amap":
+            routes = await self._call("amap", "directions", self.amap_client.get_directions(
+                origin=origin,
+                destination=destination,
+                mode=mode
+            ))
+            if routes:
+                return routes
+        
+        elif provider == "baidu":
+            result = await self._call("baidu", "directions", baidu_directions(
+                origin=origin,
+                destination=destination,
+                model=mode
+            ))
+            if result and result.get("status") == 0:
+                routes = result.get("result", {}).get("routes", [])
+                if routes:
+                    return [self._normalize_route_result(route, "baidu", mode) for route in routes[:3]]
+        
+        elif provider == "tianditu":
+            result = await self._call("tianditu", "directions", tianditu_directions(
+                origin=origin,
+                destination=destination,
+                mode=mode
+            ))
+            if result and result.get("status") == "0":
+                # 天地图返回XML格式，需要解析
+                # 这里简化处理，实际应该解析XML
+                logger.warning("天地图路线规划返回XML格式，暂不支持解析")
+        
+        return []
     
     def _normalize_geocode_result(self, result: Dict[str, Any], provider: str) -> Dict[str, Any]:
         """统一地理编码结果格式"""
@@ -17,6 +17,13 @@ from app.core.logging_config import setup_logging
 from app.core.database import init_db
 from app.api.v1.api import api_router
 from app.core.redis import init_redis
+from app.core.local_cache import (
+    start_cache_invalidation_listener,
+    stop_cache_invalidation_listener,
+    get_local_cache_stats,
+)
+from app.core.http_clients import close_http_clients
+from app.tools.openai_client import close_openai_clients
 from app.services.background_tasks import start_background_tasks
 from app.core.rate_limit import RateLimitMiddleware
 
@@ -35,6 +42,9 @@ async def lifespan(app: FastAPI):
     # 初始化Redis
     await init_redis()
     logger.info("✅ Redis初始化完成")
+
+    # 启动L1缓存失效订阅
+    start_cache_invalidation_listener()
     
     # 启动后台任务
     await start_background_tasks()
@@ -44,6 +54,9 @@ async def lifespan(app: FastAPI):
     
     # 关闭时清理
     logger.info("🛑 关闭 LX SkyRoam Agent...")
+    stop_cache_invalidation_listener()
+    await close_http_clients()
+    await close_openai_clients()
     logger.info("✅ 应用关闭完成")
 
 
@@ -100,7 +113,8 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "LX SkyRoam Agent",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "local_cache": get_local_cache_stats()
     }
 
 
@@ -0,0 +1,149 @@
+"""
+缓存值编解码基准测试
+对比旧版 json.dumps 文本与各编解码组合（orjson / msgpack × 不压缩 / zlib / zstd）在典型缓存数据上的
+体积与编解码耗时：POI 列表、静态地图图片（base64 嵌入 JSON）、文本方案、单条地理编码结果。
+未安装的库（msgpack、zstandard）对应的组合会被跳过。
+
+Usage:
+    python -m backend.scripts.benchmark_cache_codec [--rounds 200]
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.core import cache_codec as codec_module
+from app.core.cache_codec import CacheCodec
+
+_NAMES = ["西湖", "灵隐寺", "雷峰塔", "西溪湿地", "宋城", "河坊街", "龙井村", "九溪烟树", "断桥残雪", "苏堤春晓"]
+_CATEGORIES = ["风景名胜", "博物馆", "公园广场", "寺庙道观", "特色街区"]
+
+
+def _poi_list(count: int = 60) -> List[Dict[str, Any]]:
+    rng = random.Random(42)
+    items = []
+    for i in range(count):
+        name = f"{rng.choice(_NAMES)}{i}"
+        items.append({
+            "id": f"amap_B0FFG{rng.randint(10000, 99999)}",
+            "name": name,
+            "category": rng.choice(_CATEGORIES),
+            "description": f"{name}是杭州著名的旅游景点，适合全家出游，建议游玩时间2-3小时。",
+            "price": rng.choice(["免费", "45元", "80元", "120元"]),
+            "rating": round(rng.uniform(3.5, 5.0), 1),
+            "address": f"浙江省杭州市西湖区{rng.choice(_NAMES)}路{rng.randint(1, 300)}号",
+            "coordinates": {"lat": 30.2 + rng.random() * 0.1, "lng": 120.1 + rng.random() * 0.1},
+            "opening_hours": "08:00-17:30",
+            "phone": f"0571-{rng.randint(80000000, 89999999)}",
+            "source": "高德地图API",
+        })
+    return items
+
+
+def _static_map() -> Dict[str, Any]:
+    # PNG 本身已压缩，用随机字节近似其熵
+    content = os.urandom(60 * 1024)
+    return {"content": base64.b64encode(content).decode("utf-8"), "type": "image/png"}
+
+
+def _text_plan() -> Dict[str, Any]:
+    rng = random.Random(7)
+    days = []
+    for day in range(1, 6):
+        lines = [f"第{day}天：杭州深度游"]
+        for slot in ("上午", "中午", "下午", "晚上"):
+            lines.append(
+                f"{slot}：前往{rng.choice(_NAMES)}，游览约两小时，推荐步行或乘坐公交{rng.randint(1, 99)}路，"
+                f"人均花费约{rng.randint(30, 200)}元，注意提前在官方渠道预约门票。"
+            )
+        days.append("\n".join(lines))
+    return {"plan_id": 1024, "text": "\n\n".join(days), "max_chars": 8000}
+
+
+def _geocode() -> Dict[str, Any]:
+    return {
+        "destination": "浙江省杭州市",
+        "latitude": 30.274084,
+        "longitude": 120.15507,
+        "location_string": "120.15507,30.274084",
+        "provider": "amap",
+        "formatted_address": "浙江省杭州市",
+        "city": "杭州市",
+        "district": "",
+        "province": "浙江省",
+    }
+
+
+DATASETS: Dict[str, Callable[[], Any]] = {
+    "poi_list": _poi_list,
+    "static_map": _static_map,
+    "text_plan": _text_plan,
+    "geocode": _geocode,
+}
+
+
+def _timeit(func: Callable[[], Any], rounds: int) -> float:
+    """单次调用平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def _variants() -> List[Tuple[str, Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    variants = [(
+        "legacy json",
+        lambda value: json.dumps(value, ensure_ascii=False).encode("utf-8"),
+        lambda raw: json.loads(raw),
+    )]
+    serializers = ["orjson"] + (["msgpack"] if codec_module.msgpack is not None else [])
+    compressions = ["none", "zlib"] + (["zstd"] if codec_module.zstandard is not None else [])
+    for serializer in serializers:
+        for compression in compressions:
+            codec = CacheCodec(serializer=serializer, compression=compression, compress_min_bytes=1024)
+            variants.append((f"{serializer}+{compression}", codec.encode, CacheCodec.decode))
+    return variants
+
+
+def run(rounds: int):
+    variants = _variants()
+    header = f"{'dataset':<12}{'codec':<18}{'bytes':>10}{'saved':>9}{'encode_us':>12}{'decode_us':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, factory in DATASETS.items():
+        value = factory()
+        baseline = None
+        for label, encode, decode in variants:
+            encoded = encode(value)
+            assert decode(encoded) == value, f"{label} 解码结果与原值不一致: {name}"
+            size = len(encoded)
+            baseline = baseline or size
+            saved = 1 - size / baseline
+            encode_us = _timeit(lambda: encode(value), rounds)
+            decode_us = _timeit(lambda: decode(encoded), rounds)
+            print(f"{name:<12}{label:<18}{size:>10}{saved:>8.1%}{encode_us:>12.1f}{decode_us:>12.1f}")
+        print()
+    if codec_module.msgpack is None or codec_module.zstandard is None:
+        print("提示：未安装 msgpack / zstandard 的组合已跳过（pip install msgpack zstandard）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存值编解码基准测试")
+    parser.add_argument("--rounds", type=int, default=200, help="每项测量的重复次数")
+    args = parser.parse_args()
+    run(max(args.rounds, 1))
+
+
+if __name__ == "__main__":
+    main()
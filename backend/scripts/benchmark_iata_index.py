@@ -0,0 +1,107 @@
+"""
+城市 IATA 代码查询基准测试
+对比旧版查询方式（每次调用构建内联字典，只做精确匹配与去“市/省”后缀匹配，未命中即调用 LLM）
+与离线 IATA 索引在一组典型目的地输入上的单次查询耗时，以及索引命中后可省去的 LLM 调用次数。
+旧版字典以数据集中的城市条目近似（规模与原内联映射相当）。
+
+Usage:
+    python -m backend.scripts.benchmark_iata_index [--rounds 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.tools import iata_index as index_module
+from app.tools.iata_index import iata_index
+
+QUERIES: List[str] = [
+    # 中文城市名与行政区划写法
+    "北京", "上海", "杭州市", "浙江省杭州市", "广西壮族自治区桂林市", "温州", "西双版纳", "乌鲁木齐",
+    # 英文/拼音
+    "Hangzhou", "Beijing", "Tokyo", "New York", "Zurich", "Xi'an", "hong kong", "chengdu",
+    # 机场与 IATA 代码
+    "大兴机场", "上海虹桥", "PEK", "pvg", "羽田",
+    # 前缀与包含
+    "乌鲁木", "hangzh", "杭州西湖", "三亚湾", "北京大兴",
+    # 拼写错误
+    "hangzou", "Barcelonna", "Singapor", "Amsterdm",
+    # 同音错字（需要 pypinyin）
+    "杭洲", "城都",
+    # 数据集未收录或无法确定
+    "苏州", "西湖", "绍兴", "taizhou",
+]
+
+
+def _legacy_codes() -> Dict[str, str]:
+    return {loc.name: loc.code for loc in iata_index.locations if loc.type == "city"}
+
+
+def legacy_lookup(city: str) -> Optional[str]:
+    """旧版查询方式：每次调用构建映射字典"""
+    city_codes = _legacy_codes()
+    if city in city_codes:
+        return city_codes[city]
+    city_clean = city.replace(" ", "").replace("市", "").replace("省", "")
+    for key, code in city_codes.items():
+        if key.replace(" ", "") == city_clean:
+            return code
+    return None
+
+
+def _timeit(func: Callable[[str], Optional[str]], query: str, rounds: int) -> float:
+    """单次调用平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(query)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def run(rounds: int):
+    header = f"{'query':<24}{'legacy':>8}{'index':>8}{'method':>10}{'legacy_us':>12}{'index_us':>11}"
+    print(header)
+    print("-" * len(header))
+    legacy_total = index_total = 0.0
+    legacy_misses = index_misses = 0
+    methods: Counter = Counter()
+    for query in QUERIES:
+        legacy_code = legacy_lookup(query)
+        match = iata_index.lookup(query)
+        legacy_us = _timeit(legacy_lookup, query, rounds)
+        index_us = _timeit(iata_index.resolve, query, rounds)
+        legacy_total += legacy_us
+        index_total += index_us
+        legacy_misses += legacy_code is None
+        index_misses += match is None
+        methods[match.method if match else "miss"] += 1
+        print(
+            f"{query:<24}{legacy_code or '-':>8}{(match.code if match else '-'):>8}"
+            f"{(match.method if match else '-'):>10}{legacy_us:>12.2f}{index_us:>11.2f}"
+        )
+    count = len(QUERIES)
+    print()
+    print(f"平均耗时: 旧版 {legacy_total / count:.2f}us, 索引 {index_total / count:.2f}us")
+    print(f"需要调用 LLM 的查询: 旧版 {legacy_misses}/{count}, 索引 {index_misses}/{count}, "
+          f"省去 {legacy_misses - index_misses} 次")
+    print("索引匹配方式: " + ", ".join(f"{k}={v}" for k, v in methods.most_common()))
+    if index_module.lazy_pinyin is None:
+        print("提示：未安装 pypinyin，同音错字查询不会命中（pip install pypinyin）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="城市 IATA 代码查询基准测试")
+    parser.add_argument("--rounds", type=int, default=2000, help="每项测量的重复次数")
+    args = parser.parse_args()
+    run(max(args.rounds, 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+缓存值编解码测试：2 字节头部、旧版 JSON 兼容与各组合的往返
+"""
+
+import json
+
+import pytest
+
+from app.core.cache_codec import (
+    CODEC_VERSION,
+    COMPRESSION_NONE,
+    COMPRESSION_ZLIB,
+    COMPRESSION_ZSTD,
+    SERIALIZER_JSON,
+    SERIALIZER_MSGPACK,
+    CacheCodec,
+    msgpack,
+    zstandard,
+)
+
+VALUE = {
+    "city": "杭州",
+    "items": [{"name": "西湖", "rating": 4.8, "tags": ["景点", "免费"]}] * 50,
+    "count": 50,
+    "ok": True,
+    "missing": None,
+}
+
+
+def test_header_version_and_flags():
+    raw = CacheCodec(serializer="json", compression="none").encode({"a": 1})
+    assert raw[0] == CODEC_VERSION == 0x01
+    assert raw[1] == SERIALIZER_JSON | COMPRESSION_NONE
+    assert json.loads(raw[2:]) == {"a": 1}
+
+
+def test_small_values_are_not_compressed():
+    raw = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=1024).encode({"a": 1})
+    assert raw[1] & 0xF0 == COMPRESSION_NONE
+
+
+def test_large_values_are_compressed():
+    raw = CacheCodec(serializer="json", compression="zlib", compress_min_bytes=64).encode(VALUE)
+    assert raw[1] == SERIALIZER_JSON | COMPRESSION_ZLIB
+    assert CacheCodec.decode(raw) == VALUE
+
+
+@pytest.mark.parametrize("legacy", [
+    json.dumps(VALUE, ensure_ascii=False),
+    json.dumps(VALUE, ensure_ascii=False).encode("utf-8"),
+    b"[1, 2, 3]",
+    b"1",
+])
+def test_legacy_json_entries_decode(legacy):
+    assert CacheCodec.decode(legacy) == json.loads(legacy)
+
+
+@pytest.mark.parametrize("serializer", ["json", "orjson", "msgpack"])
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_round_trip(serializer, compression):
+    if serializer == "msgpack" and msgpack is None:
+        pytest.skip("msgpack 未安装")
+    if compression == "zstd" and zstandard is None:
+        pytest.skip("zstandard 未安装")
+    codec = CacheCodec(serializer=serializer, compression=compression, compress_min_bytes=0)
+    raw = codec.encode(VALUE)
+    assert raw[0] == CODEC_VERSION
+    expected_serializer = SERIALIZER_MSGPACK if serializer == "msgpack" else SERIALIZER_JSON
+    assert raw[1] & 0x0F == expected_serializer
+    expected_compression = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+    assert raw[1] & 0xF0 == expected_compression[compression]
+    # 解码只依赖头部，与当前编解码器配置无关
+    assert CacheCodec(serializer="json", compression="none").decode(raw) == VALUE
+
+
+def test_unknown_flags_are_rejected():
+    with pytest.raises(ValueError):
+        CacheCodec.decode(bytes((CODEC_VERSION, SERIALIZER_JSON | 0x70)) + b"{}")
+    with pytest.raises(ValueError):
+        CacheCodec.decode(bytes((CODEC_VERSION, 0x0F)) + b"{}")
@@ -0,0 +1,109 @@
+"""
+按天生成的多天合并测试：合并天数估算、多天响应拆分与合并提示词
+"""
+
+import pytest
+
+from app.core import tokens
+from app.services.plan_generation import daily
+from app.services.plan_generation.daily import (
+    CHUNK_OUTPUT_MARGIN,
+    DayScope,
+    append_day_list,
+    choose_chunk_size,
+    extract_day_entry,
+    record_output_tokens,
+    split_day_entries,
+)
+
+DAYS = [(1, "2026-05-01"), (2, "2026-05-02"), (3, "2026-05-03")]
+
+
+@pytest.fixture(autouse=True)
+def _reset_output_average(monkeypatch):
+    monkeypatch.setattr(daily, "_output_tokens_per_day", {})
+
+
+def test_single_day_never_chunks():
+    assert choose_chunk_size("景点方案", 100, 500, 4000, 1) == 1
+
+
+def test_chunk_limited_by_output_budget():
+    # 每天预计 500 * 1.3 = 650 token，4000 的上限最多容纳 6 天
+    assert choose_chunk_size("景点方案", 100, 500, 4000, 10) == int(4000 // (500 * CHUNK_OUTPUT_MARGIN))
+    assert choose_chunk_size("景点方案", 100, 500, 4000, 3) == 3
+
+
+def test_chunk_limited_by_context_window():
+    size = choose_chunk_size("景点方案", 3000, 500, None, 10, context_window=5000)
+    assert size == int((5000 - 3000) // (500 * CHUNK_OUTPUT_MARGIN))
+
+
+def test_chunk_is_at_least_one_day():
+    assert choose_chunk_size("景点方案", 100, 5000, 1000, 5) == 1
+    assert choose_chunk_size("景点方案", 9000, 500, None, 5, context_window=8000) == 1
+
+
+def test_chunk_uses_observed_output_size(monkeypatch):
+    monkeypatch.setattr(daily, "estimate_tokens", lambda text: 200)
+    record_output_tokens("餐饮方案", [{"day": 1}])
+    # 观测到每天约 200 token 后，不再按 1000 的 max_tokens 估算
+    assert choose_chunk_size("餐饮方案", 100, 1000, 2000, 10) == int(2000 // (200 * CHUNK_OUTPUT_MARGIN))
+    assert choose_chunk_size("住宿方案", 100, 1000, 2000, 10) == 1
+
+
+def test_split_matches_elements_by_day_field():
+    parsed = [{"day": 3, "v": "c"}, {"day": "1", "v": "a"}, {"day": 2, "v": "b"}]
+    entries = split_day_entries(parsed, DAYS, extract_day_entry)
+    assert {day: entry["v"] for day, entry in entries.items()} == {1: "a", 2: "b", 3: "c"}
+    assert entries[1]["day"] == 1
+    assert entries[1]["date"] == "2026-05-01"
+
+
+def test_split_falls_back_to_position_without_day_fields():
+    entries = split_day_entries([{"v": "a"}, {"v": "b"}], DAYS, extract_day_entry)
+    assert {day: entry["v"] for day, entry in entries.items()} == {1: "a", 2: "b"}
+
+
+def test_split_accepts_days_wrapper_and_single_object():
+    wrapped = split_day_entries({"days": [{"day": 2, "v": "b"}]}, DAYS, extract_day_entry)
+    assert list(wrapped) == [2]
+    single = split_day_entries({"day": 1, "v": "a"}, DAYS, extract_day_entry)
+    assert list(single) == [1]
+
+
+def test_split_omits_missing_and_invalid_days():
+    parsed = [{"day": 1, "v": "a"}, "garbage", {"day": 9, "v": "z"}]
+    assert list(split_day_entries(parsed, DAYS, extract_day_entry)) == [1]
+    assert split_day_entries("not json", DAYS, extract_day_entry) == {}
+
+
+def test_day_scope_wording():
+    single = DayScope.single(2, "2026-05-02")
+    assert not single.is_chunk
+    assert single.subject == "某一天"
+    assert single.day_value == "2"
+    assert single.per_day("300元") == "300元"
+    assert single.json_intro() == "请返回JSON对象"
+
+    chunk = DayScope(tuple(DAYS))
+    assert chunk.is_chunk
+    assert "某一天" not in chunk.subject
+    assert chunk.label == "第 1 天至第 3 天（日期：2026-05-01 至 2026-05-03）"
+    assert chunk.per_day("300元") != "300元"
+    assert "JSON数组" in chunk.json_intro()
+    assert "3 个元素" in chunk.json_intro(strict=True)
+
+
+def test_append_day_list_describes_every_day():
+    prompt = append_day_list("基础提示词", DAYS, 300.0, lambda day, date, budget: f"预算 {budget:.0f}元")
+    assert prompt.startswith("基础提示词")
+    for day, date_str in DAYS:
+        assert f"- 第 {day} 天（日期：{date_str}）：预算 300元" in prompt
+
+
+def test_token_estimate_falls_back_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(tokens, "tiktoken", None)
+    monkeypatch.setattr(tokens, "_encodings", {})
+    assert tokens.estimate_tokens("杭州西湖") == 4 + 0 + 1
+    assert tokens.estimate_tokens("abcdefgh") == 2 + 1
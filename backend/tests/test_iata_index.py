@@ -0,0 +1,62 @@
+"""
+离线 IATA 索引测试：精确/别名/行政区划/代码/前缀/包含/模糊匹配
+"""
+
+import pytest
+
+from app.tools.iata_index import IataIndex, IataLocation, iata_index
+
+
+@pytest.mark.parametrize("query, code, method", [
+    ("杭州", "HGH", "exact"),
+    ("Hangzhou", "HGH", "exact"),
+    ("hangzhou", "HGH", "exact"),
+    ("Zurich", "ZRH", "exact"),
+    ("Zürich", "ZRH", "exact"),
+    ("虹桥机场", "SHA", "exact"),
+    ("浙江省杭州市", "HGH", "admin"),
+    ("pek", "PEK", "code"),
+    ("乌鲁木", "URC", "prefix"),
+    ("hangzh", "HGH", "prefix"),
+    ("杭州西湖", "HGH", "contains"),
+    ("南京南站", "NKG", "contains"),
+    ("hangzou", "HGH", "fuzzy"),
+])
+def test_lookup(query, code, method):
+    match = iata_index.lookup(query)
+    assert match is not None
+    assert (match.code, match.method) == (code, method)
+
+
+def test_zurich_resolves_to_zrh():
+    # 旧的映射表把苏黎世写成了 ZUR
+    assert iata_index.resolve("苏黎世") == "ZRH"
+
+
+@pytest.mark.parametrize("query", ["南京西路", "南京路", "北京路", "杭州东路"])
+def test_street_named_after_city_is_not_the_city(query):
+    assert iata_index.resolve(query) is None
+
+
+@pytest.mark.parametrize("query", ["", "   ", "x", "未知的地方"])
+def test_unknown_input(query):
+    assert iata_index.resolve(query) is None
+
+
+def test_ambiguous_candidates_return_none():
+    index = IataIndex([
+        IataLocation(code="AAA", type="city", name="甲城", country="CN", aliases=["Twin"]),
+        IataLocation(code="BBB", type="city", name="乙城", country="CN", aliases=["Twin"]),
+    ])
+    assert index.resolve("Twin") is None
+    assert index.resolve("甲城") == "AAA"
+
+
+def test_city_entry_wins_over_its_airport():
+    index = IataIndex([
+        IataLocation(code="XYZ", type="airport", name="某某机场", country="CN", city="某某", aliases=["Mou"]),
+        IataLocation(code="XYZ", type="city", name="某某", country="CN", aliases=["Mou"]),
+    ])
+    match = index.lookup("Mou")
+    assert match.code == "XYZ"
+    assert match.location.type == "city"
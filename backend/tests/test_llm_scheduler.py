@@ -0,0 +1,157 @@
+"""
+LLM 令牌桶测试：扣减与等待时间、按时间填充、交互请求保留额度、退还与 429 清空
+Lua 脚本在 fakeredis 中执行（需要 fakeredis[lua]）
+"""
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app.core.config import settings  # noqa: E402
+from app.tools import llm_scheduler as scheduler_module  # noqa: E402
+from app.tools.llm_scheduler import (  # noqa: E402
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    _TAKE_SCRIPT,
+    LLMScheduler,
+    estimate_request_tokens,
+)
+
+RPM = 60
+TPM = 1000
+SCOPE = "https://api.example.com/v1|test-model"
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = fakeredis.FakeAsyncRedis()
+
+    async def get_redis():
+        return client
+
+    monkeypatch.setattr(scheduler_module, "get_redis", get_redis)
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_RPM_LIMIT", RPM)
+    monkeypatch.setattr(settings, "LLM_TPM_LIMIT", TPM)
+    monkeypatch.setattr(settings, "LLM_INTERACTIVE_RESERVE", 0.2)
+    monkeypatch.setattr(settings, "LLM_SCHEDULER_MAX_WAIT", 0)
+    return client
+
+
+@pytest.fixture
+def scheduler():
+    return LLMScheduler()
+
+
+async def _take(client, tokens, background=False, reserve=0.2):
+    return int(await client.eval(
+        _TAKE_SCRIPT, 2, LLMScheduler._bucket_key(SCOPE), LLMScheduler._waiting_key(SCOPE),
+        RPM, TPM, tokens, reserve, 1 if background else 0,
+    ))
+
+
+async def _bucket(client):
+    state = await client.hgetall(LLMScheduler._bucket_key(SCOPE))
+    return {key.decode(): float(value) for key, value in state.items()}
+
+
+async def _rewind(client, ms):
+    """把上次填充时间往前拨，模拟经过了 ms 毫秒"""
+    key = LLMScheduler._bucket_key(SCOPE)
+    ts = float(await client.hget(key, "ts"))
+    await client.hset(key, "ts", str(ts - ms))
+
+
+@pytest.mark.asyncio
+async def test_take_deducts_request_and_tokens(redis_client):
+    assert await _take(redis_client, 300) == 0
+    state = await _bucket(redis_client)
+    assert state["tok"] == TPM - 300
+    assert state["req"] == RPM - 1
+
+
+@pytest.mark.asyncio
+async def test_insufficient_tokens_report_wait_without_deducting(redis_client):
+    assert await _take(redis_client, 900) == 0
+    wait_ms = await _take(redis_client, 400)
+    # 缺 300 token，按 1000/分钟 的速率约需 18 秒
+    assert 17000 <= wait_ms <= 18000
+    assert (await _bucket(redis_client))["tok"] == pytest.approx(100, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_bucket_refills_over_time(redis_client):
+    assert await _take(redis_client, TPM) == 0
+    await _rewind(redis_client, 30000)
+    # 30 秒填充一半
+    assert await _take(redis_client, 400) == 0
+    assert (await _bucket(redis_client))["tok"] == pytest.approx(TPM / 2 - 400, abs=1)
+    await _rewind(redis_client, 600000)
+    assert await _take(redis_client, 0) == 0
+    assert (await _bucket(redis_client))["tok"] == pytest.approx(TPM, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_background_keeps_interactive_reserve(redis_client):
+    assert await _take(redis_client, 750) == 0
+    # 剩余 250：后台请求 100 还需保留 20% 的额度（200），需要等待
+    assert await _take(redis_client, 100, background=True) > 0
+    # 交互请求可以动用保留额度
+    assert await _take(redis_client, 100) == 0
+
+
+@pytest.mark.asyncio
+async def test_background_yields_to_waiting_interactive(redis_client):
+    key = LLMScheduler._waiting_key(SCOPE)
+    now_ms = (await redis_client.time())[0] * 1000
+    await redis_client.zadd(key, {"waiter": now_ms + 60000})
+    assert await _take(redis_client, 10, background=True) == -1
+    # 过期的排队标记会被清理
+    await redis_client.zadd(key, {"waiter": now_ms - 1000})
+    assert await _take(redis_client, 10, background=True) == 0
+
+
+@pytest.mark.asyncio
+async def test_acquire_reserves_and_refund_returns_unused(redis_client, scheduler):
+    assert await scheduler.acquire(SCOPE, 600, PRIORITY_INTERACTIVE) == 0.0
+    assert (await _bucket(redis_client))["tok"] == pytest.approx(TPM - 600, abs=1)
+
+    await scheduler.refund(SCOPE, 600, 150)
+    assert (await _bucket(redis_client))["tok"] == pytest.approx(TPM - 150, abs=1)
+
+    # 用量未知时不退还；实际用量超过预占时也不扣减
+    await scheduler.refund(SCOPE, 600, None)
+    await scheduler.refund(SCOPE, 100, 300)
+    assert (await _bucket(redis_client))["tok"] == pytest.approx(TPM - 150, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_failed_call_refund_is_capped_at_capacity(redis_client, scheduler):
+    await scheduler.acquire(SCOPE, 200, PRIORITY_BACKGROUND)
+    await scheduler.refund(SCOPE, 200, 0)
+    await scheduler.refund(SCOPE, 200, 0)
+    assert (await _bucket(redis_client))["tok"] == pytest.approx(TPM, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_refund_without_bucket_is_noop(redis_client, scheduler):
+    await scheduler.refund(SCOPE, 500, 0)
+    assert await redis_client.exists(LLMScheduler._bucket_key(SCOPE)) == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_drains_bucket(redis_client, scheduler):
+    await scheduler.acquire(SCOPE, 100, PRIORITY_INTERACTIVE)
+    await scheduler.report_rate_limited(SCOPE)
+    state = await _bucket(redis_client)
+    assert state["tok"] == 0
+    assert state["req"] == 0
+    assert await _take(redis_client, 1) > 0
+
+
+def test_request_estimate_includes_max_tokens():
+    messages = [{"role": "user", "content": "杭州三日游"}]
+    prompt = estimate_request_tokens(messages, 0)
+    assert prompt > 0
+    assert estimate_request_tokens(messages, 500) == prompt + 500
@@ -0,0 +1,133 @@
+"""
+merge_as_completed 测试：去重合并、补充子查询的 minimum 条件、limit 提前结束与取消
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.concurrency import merge_as_completed
+
+
+async def _items(items, delay=0.0):
+    await asyncio.sleep(delay)
+    return list(items)
+
+
+async def _fail(delay=0.0):
+    await asyncio.sleep(delay)
+    raise RuntimeError("boom")
+
+
+def _name(item):
+    return item["name"]
+
+
+def _places(*names):
+    return [{"name": name} for name in names]
+
+
+@pytest.mark.asyncio
+async def test_merges_in_completion_order_and_dedupes():
+    merged = await merge_as_completed(
+        {
+            "slow": _items(_places("a", "b"), delay=0.05),
+            "fast": _items(_places("b", "c")),
+        },
+        key=_name,
+    )
+    assert [item["name"] for item in merged] == ["b", "c", "a"]
+
+
+@pytest.mark.asyncio
+async def test_failed_source_is_skipped():
+    merged = await merge_as_completed(
+        {"bad": _fail(), "good": _items(_places("a"))},
+        key=_name,
+    )
+    assert merged == _places("a")
+
+
+@pytest.mark.asyncio
+async def test_supplements_skipped_when_minimum_reached():
+    started = []
+
+    def supplement():
+        started.append("mcp")
+        return _items(_places("x"))
+
+    merged = await merge_as_completed(
+        {"map": _items(_places("a", "b"))},
+        key=_name,
+        supplements={"mcp": supplement},
+        minimum=2,
+    )
+    assert [item["name"] for item in merged] == ["a", "b"]
+    assert started == []
+
+
+@pytest.mark.asyncio
+async def test_supplements_start_only_after_primaries_fall_short():
+    events = []
+
+    async def primary():
+        await asyncio.sleep(0.02)
+        events.append("primary done")
+        return _places("a")
+
+    def supplement():
+        events.append("supplement started")
+        return _items(_places("a", "x"))
+
+    merged = await merge_as_completed(
+        {"map": primary()},
+        key=_name,
+        supplements={"mcp": supplement},
+        minimum=2,
+    )
+    assert events == ["primary done", "supplement started"]
+    assert [item["name"] for item in merged] == ["a", "x"]
+
+
+@pytest.mark.asyncio
+async def test_limit_returns_early_and_cancels_pending():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return _places("late")
+
+    merged = await asyncio.wait_for(
+        merge_as_completed(
+            {"fast": _items(_places("a", "b", "c")), "slow": slow()},
+            key=_name,
+            limit=2,
+        ),
+        timeout=1,
+    )
+    assert len(merged) >= 2
+    assert "late" not in [item["name"] for item in merged]
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_merge_cancels_sources():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.ensure_future(merge_as_completed({"slow": slow()}, key=_name))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert cancelled.is_set()